@@ -0,0 +1,56 @@
+'''
+collaboration analytics over synthetic connections with tens of thousands of institutions, the sparse matrices of
+analytics.Collaboration versus the columnar statistics and the nested dicts of counts.json, checking both give the same
+statistics
+run from the root of the repository: python3 bench/bench_analytics.py [--members N] [--institutions N]
+'''
+import argparse, sys, time
+import numpy as np
+import fakeweb
+import columnar, analytics
+from bench_feature import synthetic
+
+parser = argparse.ArgumentParser(description='benchmark the sparse collaboration analytics')
+parser.add_argument('--members', type=int, default=100000, help='number of synthetic faculty members')
+parser.add_argument('--coauthors', type=int, default=10, help='coauthors listed for each member')
+parser.add_argument('--univs', type=int, default=50, help='number of universities')
+parser.add_argument('--institutions', type=int, default=30000, help='number of distinct coauthor institutions')
+
+def deep_size(counts):
+    '''
+    this function estimates the bytes held by counts.json loaded as nested dicts, strings counted once per reference
+    '''
+    size = sys.getsizeof(counts)
+    for univ in counts:
+        size += sys.getsizeof(univ) + sys.getsizeof(counts[univ])
+        size += sum(sys.getsizeof(ins) + sys.getsizeof(cnt) for ins, cnt in counts[univ].items())
+    return size
+
+def timed(func, *args):
+    s_time = time.time()
+    result = func(*args)
+    return time.time()-s_time, result
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    con = synthetic(args.members, args.coauthors, args.univs, args.institutions)
+    members, links = columnar.flatten_connections(con)
+    counts = columnar.compute_counts(links)
+    t_columnar, columnar_stat = timed(columnar.compute_stat, members, counts)
+    t_build, collaboration = timed(analytics.Collaboration, members, counts, links)
+    t_stat, sparse_stat = timed(collaboration.stat)
+    t_jaccard, _ = timed(collaboration.jaccard)
+    t_rank, rank = timed(collaboration.centrality)
+    t_partners, _ = timed(collaboration.top_partners, 10)
+    t_pairs, pairs = timed(collaboration.cooccurrence)
+    print('{} members x {} coauthors, {} universities, {} institutions'.format(
+        args.members, args.coauthors, args.univs, len(collaboration.institutions)))
+    print('counts as nested dicts: {:.1f} MB, as a sparse matrix: {:.1f} MB'.format(
+        deep_size(columnar.counts_to_dict(counts)) / 2**20,
+        sum(a.nbytes for a in (collaboration.counts.data, collaboration.counts.indices, collaboration.counts.indptr))
+        / 2**20))
+    print('build {:.3f} sec, statistics {:.3f} sec (columnar {:.3f} sec), jaccard {:.3f} sec, pagerank {:.3f} sec, '
+          'top partners {:.3f} sec, institution pairs {:.3f} sec ({} pairs)'.format(
+              t_build, t_stat, t_columnar, t_jaccard, t_rank, t_partners, t_pairs, pairs.nnz // 2))
+    print('same statistics: {}, pagerank sums to {:.6f}'.format(
+        np.allclose(sparse_stat.values.astype(float), columnar_stat.values.astype(float), equal_nan=True), rank.sum()))
@@ -0,0 +1,37 @@
+'''
+throughput of collect.find_connections against a local fake google, with growing --concurrency
+run from the root of the repository: python3 bench/bench_concurrency.py [--members N] [--latency SEC]
+'''
+import argparse, json, os, tempfile, time
+import fakeweb
+import util, ratelimit, collect, mirror
+
+parser = argparse.ArgumentParser(description='benchmark concurrent connection finding with a fake http server')
+parser.add_argument('--members', type=int, default=200, help='number of fake faculty members')
+parser.add_argument('--latency', type=float, default=0.05, help='seconds the fake server waits before each response')
+parser.add_argument('--levels', type=str, default='1 2 4 8 16 32', help='concurrency levels to try')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    server = fakeweb.start(args.latency)
+    util.google_sites = [{'region': 'local', 'url': server.url + '/search?&q='}]
+    util.mirror_scheduler = mirror.MirrorScheduler(util.google_sites)
+    util.proxies = None
+    util.configure_session(pool_maxsize=max(map(int, args.levels.split())))
+    # generous limits, we measure the engine here, not the throttling
+    util.rate_limiter = ratelimit.HostRateLimiter({'default': {'rate': 1e6, 'burst': 1e6}})
+    faculty = {'Fake University {}'.format(u): ['member{} test'.format(i) for i in range(u, args.members, 4)]
+               for u in range(4)}
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'connections.json')
+        print('{:>12} {:>10} {:>14} {:>10}'.format('concurrency', 'sec', 'members/sec', 'same'))
+        for level in map(int, args.levels.split()):
+            s_time = time.time()
+            collect.find_connections(faculty, concurrency=level, output=output)
+            elapsed = time.time() - s_time
+            with open(output, 'rb') as f:
+                result = f.read()
+            baseline = baseline or result
+            print('{:>12} {:>10.3f} {:>14.1f} {:>10}'.format(level, elapsed, args.members/elapsed, str(result == baseline)))
+    server.shutdown()
@@ -0,0 +1,96 @@
+'''
+the whole pipeline, collect.py -> feature.py -> vis.py, run as separate command lines against pages replayed by
+replay.py, at growing numbers of faculty members, reporting the wall time, requests per second and peak memory of each
+stage. the pages are first recorded by collect.py --record from the fake web of fakeweb.py, then replayed with latency
+and injected errors, and the connections found from the replay are checked against those of the recording
+run from the root of the repository: python3 bench/bench_e2e.py [--sizes "100 1000"] [--error_rate P]
+'''
+import argparse, json, os, shutil, subprocess, sys, tempfile, time
+import fakeweb
+import replay
+from bench_pinyin import synthetic
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+parser = argparse.ArgumentParser(description='benchmark the pipeline end to end with replayed pages')
+parser.add_argument('--sizes', type=str, default='100 1000', help='numbers of faculty members to try')
+parser.add_argument('--per_univ', type=int, default=50, help='faculty members of each fake university')
+parser.add_argument('--concurrency', type=int, default=8, help='--concurrency of collect.py')
+parser.add_argument('--latency', type=float, default=0.02, help='seconds the replay server waits before each response')
+parser.add_argument('--jitter', type=float, default=0.02, help='at most this many seconds added to --latency')
+parser.add_argument('--error_rate', type=float, default=0.01, help='share of requests answered with 503')
+parser.add_argument('--drop_rate', type=float, default=0.005, help='share of requests whose connection is dropped')
+parser.add_argument('--keep', type=str, default=None, help='keep the working directory of each size under this one')
+
+def prepare(workdir, size, per_univ, server):
+    '''
+    this function lays out a working directory like the repository's, with fake universities whose faculty lists are
+    served by server, and rate limits high enough not to be what is measured
+    '''
+    os.makedirs(os.path.join(workdir, 'config'))
+    os.makedirs(os.path.join(workdir, 'result'))
+    for name in ['user-agent.json', 'search.json', 'parties.json', 'workers.json']:
+        shutil.copy(os.path.join(ROOT, 'config', name), os.path.join(workdir, 'config', name))
+    names = synthetic(size)
+    configs = []
+    for u, start in enumerate(range(0, size, per_univ)):
+        server.faculty[str(u)] = names[start:start+per_univ]
+        configs.append({'university': 'Fake University {}'.format(u), 'alias': 'fu{}'.format(u),
+                        'url': 'http://cs.fu{}.edu.cn/faculty/{}'.format(u, u), 'xpath': '//ul[@id="faculty"]/li/text()'})
+    with open(os.path.join(workdir, 'config', 'institutions.json'), 'w') as f:
+        json.dump(configs, f, ensure_ascii=False)
+    with open(os.path.join(workdir, 'config', 'rate-limit.json'), 'w') as f:
+        json.dump({'default': {'rate': 1e6, 'burst': 1e6}}, f)
+
+def run(script, options, workdir, server):
+    '''
+    this function runs one script of src in workdir, sending its requests to server
+    return value:
+        a tuple (exit code, seconds, requests, peak rss in MB)
+    '''
+    env = dict(os.environ, SCHOLAR_SPIDER_REPLAY=server.url, MPLBACKEND='Agg')
+    requests, s_time = server.requests, time.time()
+    with open(os.path.join(workdir, script.replace('.py', '.log')), 'a') as log:
+        process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'src', script)] + options, cwd=workdir, env=env,
+                                   stdout=log, stderr=subprocess.STDOUT)
+        # wait4 gives the resource usage of this child alone, ru_maxrss is in KB on linux
+        _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return process.returncode, time.time()-s_time, server.requests-requests, usage.ru_maxrss / 1024
+
+def report(size, stage, result):
+    code, elapsed, requests, rss = result
+    print('{:>8} {:>10} {:>10.3f} {:>10} {:>10.1f} {:>12.1f} {:>6}'.format(
+        size, stage, elapsed, requests, requests/elapsed, rss, 'ok' if code == 0 else 'exit {}'.format(code)))
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    web = fakeweb.start(args.latency)
+    web.scholar = 'https://scholar.google.com'
+    collect_options = ['--concurrency', str(args.concurrency)]
+    print('{:>8} {:>10} {:>10} {:>10} {:>10} {:>12} {:>6}'.format('members', 'stage', 'sec', 'requests', 'req/sec',
+                                                                 'peak MB', 'exit'))
+    for size in map(int, args.sizes.split()):
+        workdir = tempfile.mkdtemp(prefix='e2e-{}-'.format(size), dir=args.keep)
+        prepare(workdir, size, args.per_univ, web)
+        archive = os.path.join(workdir, 'fixtures.sqlite')
+        report(size, 'record', run('collect.py', collect_options + ['--record', archive], workdir, web))
+        with open(os.path.join(workdir, 'result', 'connections.json')) as f:
+            recorded = json.load(f)
+        # start over from the pages alone
+        shutil.rmtree(os.path.join(workdir, 'result'))
+        os.makedirs(os.path.join(workdir, 'result'))
+        server = replay.start(archive, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                              drop_rate=args.drop_rate)
+        report(size, 'collect', run('collect.py', collect_options, workdir, server))
+        report(size, 'feature', run('feature.py', ['--count', 'None', '--translator', 'none'], workdir, server))
+        report(size, 'vis', run('vis.py', [], workdir, server))
+        with open(os.path.join(workdir, 'result', 'connections.json')) as f:
+            replayed = json.load(f)
+        print('{:>8} {} pages recorded, {} requests not recorded, same connections as recorded: {}'.format(
+            size, len(server.archive), server.missing, replayed == recorded))
+        server.shutdown()
+        server.archive.close()
+        if args.keep is None:
+            shutil.rmtree(workdir)
+    web.shutdown()
@@ -0,0 +1,66 @@
+'''
+statistics of feature.py over synthetic connections, the nested dict loops versus the columnar pandas path
+run from the root of the repository: python3 bench/bench_feature.py [--members N] [--coauthors K]
+'''
+import argparse, copy, os, random, tempfile, time
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+import fakeweb
+import util, translate, columnar, feature
+
+parser = argparse.ArgumentParser(description='benchmark computing statistics with dicts and with pandas')
+parser.add_argument('--members', type=int, default=100000, help='number of synthetic faculty members')
+parser.add_argument('--coauthors', type=int, default=10, help='coauthors listed for each member')
+parser.add_argument('--univs', type=int, default=50, help='number of universities')
+parser.add_argument('--institutions', type=int, default=5000, help='number of distinct coauthor institutions')
+
+def synthetic(members, coauthors, univs, institutions, seed=202):
+    rng = random.Random(seed)
+    univ_names = ['Synthetic University {}'.format(i) for i in range(univs)]
+    pool = univ_names + ['Institute {} of Something'.format(i) for i in range(institutions-univs)]
+    connections = defaultdict(dict)
+    for i in range(members):
+        univ = univ_names[i % univs]
+        # some members have no coauthor at all, some mostly work with their colleagues
+        n = 0 if rng.random() < .1 else coauthors
+        connections[univ]['member {}'.format(i)] = [univ if rng.random() < .2 else rng.choice(pool) for _ in range(n)]
+    return dict(connections)
+
+def run_dict(con, output):
+    con = copy.deepcopy(con)
+    s_time = time.time()
+    cnt = feature.compute_frequency(con, 10, 1, output=output)
+    stat = defaultdict(defaultdict)
+    stat = feature.compute_member_w_connection(con, stat)
+    stat = feature.compute_connection_stats(cnt, stat)
+    return time.time()-s_time, cnt, pd.DataFrame.from_dict(stat, orient='index')
+
+def run_columnar(con, process):
+    con = copy.deepcopy(con)
+    s_time = time.time()
+    members, links = columnar.flatten_connections(con, 10, process)
+    counts = columnar.compute_counts(links, 1)
+    stat = columnar.compute_stat(members, counts)
+    return time.time()-s_time, columnar.counts_to_dict(counts), stat
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    util.translator = translate.CachedTranslator(translate.IdentityBackend())
+    con = synthetic(args.members, args.coauthors, args.univs, args.institutions)
+    print('{} members x {} coauthors'.format(args.members, args.coauthors))
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'counts.json')
+        process_institutions = util.process_institutions
+        for title in ['with process_institutions', 'statistics only']:
+            util.affiliation_matcher.memo.clear()
+            t_dict, dict_cnt, dict_stat = run_dict(con, output)
+            util.affiliation_matcher.memo.clear()
+            t_columnar, columnar_cnt, columnar_stat = run_columnar(con, util.process_institutions)
+            same = dict_cnt == columnar_cnt and np.allclose(dict_stat.values.astype(float),
+                                                             columnar_stat.values.astype(float))
+            print('{:>26}: dict loops {:.3f} sec, columnar {:.3f} sec, same result: {}'.format(
+                title, t_dict, t_columnar, same))
+            # synthetic institutions are already clean, leave them as they are for the second round
+            util.process_institutions = lambda raw_list: raw_list
+        util.process_institutions = process_institutions
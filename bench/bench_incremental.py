@@ -0,0 +1,81 @@
+'''
+a weekly refresh against a local fake web: crawling every faculty list and searching for every member again, versus
+fetching the lists conditionally with snapshot.FacultySnapshots and searching only for the members who joined,
+checking both end up with the same connections
+run from the root of the repository: python3 bench/bench_incremental.py [--univs N] [--members N] [--churn P]
+'''
+import argparse, json, os, random, tempfile, time
+import fakeweb
+import util, ratelimit, collect, mirror, snapshot
+
+parser = argparse.ArgumentParser(description='benchmark refreshing connections incrementally')
+parser.add_argument('--univs', type=int, default=20, help='number of fake universities')
+parser.add_argument('--members', type=int, default=50, help='faculty members of each university')
+parser.add_argument('--churn', type=float, default=.02, help='share of members who join or leave within a week')
+parser.add_argument('--changed', type=float, default=.25, help='share of universities whose list changes within a week')
+parser.add_argument('--latency', type=float, default=0.02, help='seconds the fake server waits before each response')
+parser.add_argument('--concurrency', type=int, default=8, help='members searched at the same time')
+
+def week(faculty, args, rng, serial):
+    '''
+    this function changes the lists of some universities, members leave and new ones join
+    '''
+    for key in rng.sample(sorted(faculty), max(1, int(len(faculty)*args.changed))):
+        names = [name for name in faculty[key] if rng.random() >= args.churn]
+        names += ['new{}x{} member'.format(serial, i) for i in range(max(1, int(args.members*args.churn)))]
+        faculty[key] = names
+
+def full_refresh(configs, args, output):
+    collection = util.name_to_pinyin(util.extract_name(util.crawl_faculty_list(configs)))
+    searched = sum(map(len, collection.values()))
+    return collect.find_connections(collection, args.concurrency, output=output), searched
+
+def incremental_refresh(configs, args, output, snapshot_file):
+    snapshots = snapshot.FacultySnapshots(snapshot_file)
+    connections = util.load_data(output) if os.path.exists(output) else {}
+    added, removed = collect.faculty_changes(None, snapshots, configs)
+    found = collect.find_connections(added, args.concurrency, output=None)
+    connections = collect.update_connections(connections, found, removed)
+    with open(output, 'w') as con:
+        json.dump(connections, con)
+    snapshots.save()
+    return connections, sum(map(len, added.values()))
+
+def timed(server, func, *args):
+    requests, s_time = server.requests, time.time()
+    result = func(*args)
+    return time.time()-s_time, server.requests-requests, result
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    rng = random.Random(202)
+    server = fakeweb.start(args.latency)
+    util.google_sites = [{'region': 'local', 'url': server.url + '/search?&q='}]
+    util.mirror_scheduler = mirror.MirrorScheduler(util.google_sites)
+    util.proxies = None
+    util.configure_session(pool_maxsize=args.concurrency)
+    util.rate_limiter = ratelimit.HostRateLimiter({'default': {'rate': 1e6, 'burst': 1e6}})
+    server.faculty = {str(u): ['member{}x{} test'.format(u, i) for i in range(args.members)] for u in range(args.univs)}
+    configs = [{'university': 'Fake University {}'.format(u), 'alias': 'fu{}'.format(u),
+                'url': '{}/faculty/{}'.format(server.url, u), 'xpath': '//ul[@id="faculty"]/li/text()'}
+               for u in range(args.univs)]
+    with tempfile.TemporaryDirectory() as tmp:
+        full_output, incremental_output = os.path.join(tmp, 'full.json'), os.path.join(tmp, 'incremental.json')
+        snapshot_file = os.path.join(tmp, 'snapshot.json')
+        # the first crawl is a full one either way
+        full_refresh(configs, args, full_output)
+        incremental_refresh(configs, args, incremental_output, snapshot_file)
+        print('{} universities x {} members, {:.0%} of the lists change each week, {:.0%} of their members'.format(
+            args.univs, args.members, args.changed, args.churn))
+        print('{:>6} {:>10} {:>8} {:>10} {:>16} {:>8} {:>10} {:>16} {:>6}'.format(
+            'week', 'full sec', 'req', 'searched', 'incremental sec', 'req', 'searched', 'volatile pages', 'same'))
+        for serial, volatile in enumerate([False, False, True]):
+            week(server.faculty, args, rng, serial)
+            server.volatile = volatile
+            t_full, r_full, (full, s_full) = timed(server, full_refresh, configs, args, full_output)
+            t_inc, r_inc, (incremental, s_inc) = timed(server, incremental_refresh, configs, args, incremental_output,
+                                                       snapshot_file)
+            same = json.loads(json.dumps(full)) == incremental
+            print('{:>6} {:>10.3f} {:>8} {:>10} {:>16.3f} {:>8} {:>10} {:>16} {:>6}'.format(
+                serial+1, t_full, r_full, s_full, t_inc, r_inc, s_inc, str(volatile), str(same)))
+    server.shutdown()
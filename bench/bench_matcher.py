@@ -0,0 +1,77 @@
+'''
+affiliation matching over a synthetic corpus, the nested keyword scan process_institutions used to do versus
+matcher.AffiliationMatcher, checking both give the same institutions
+run from the root of the repository: python3 bench/bench_matcher.py [--size N]
+'''
+import argparse, random, re, time
+import fakeweb
+import util, matcher
+
+parser = argparse.ArgumentParser(description='benchmark the compiled affiliation matcher')
+parser.add_argument('--size', type=int, default=1000000, help='number of synthetic affiliations')
+
+TITLES = ['professor', 'associate professor', 'phd student', 'researcher', 'lecturer', 'senior engineer', 'postdoc',
+          'Professor of Computer Science', 'Ph.D. candidate at', 'Research Scientist']
+PLACES = ['Nanjing University', 'Tsinghua University', 'Chinese Academy of Sciences', 'Institute of Automation, CAS',
+          'Microsoft Research Asia', 'Google Brain', 'ETH Zurich', 'MIT CSAIL', 'HKUST', 'Alibaba DAMO Academy',
+          'School of Computer Science & Technology', 'Tencent AI Lab', 'Face++ (Megvii)', 'Baidu Research',
+          'University of Science and Technology of China', "King's College London", 'JD.com', 'Shanghai, China',
+          'Department of EE', 'Amazon Web Services (AWS)', 'Huawei Noah\'s Ark Lab', 'State Key Lab of Novel Software']
+
+def legacy(raw_list, interested_parties):
+    '''
+    the keyword scan of process_institutions before the compiled matcher, translation left out
+    '''
+    processed_list = []
+    for idx in range(len(raw_list)):
+        delimiters = [',', '/', ';']
+        entities = [raw_list[idx].lower()]
+        for delimiter in delimiters:
+            sep = []
+            for entity in entities:
+                sep += entity.split(delimiter)
+            entities = sep
+        found = False
+        entities.reverse()
+        for entity in entities:
+            for ins in interested_parties:
+                for party in interested_parties[ins]:
+                    if party in entity:
+                        found = True
+                        if entity: entity = entity.strip()
+                        entity = entity.replace(' & ', ' and ').replace('at ', '')
+                        entity = re.sub(r"[^a-zA-z0-9 -']", '', entity)
+                        processed_list.append(entity if ins != 'single' else party)
+                        break
+                if found:
+                    break
+            if found:
+                break
+    return processed_list
+
+def corpus(size, seed=202):
+    rng = random.Random(seed)
+    delimiters = [', ', ',', ' / ', '/', '; ']
+    ret = []
+    for _ in range(size):
+        parts = [rng.choice(TITLES)] * rng.randint(0, 1) + rng.sample(PLACES, rng.randint(1, 3))
+        ret.append(rng.choice(delimiters).join(parts))
+    return ret
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    affiliations = corpus(args.size)
+    s_time = time.time()
+    before = legacy(affiliations, util.interested_parties)
+    t_legacy = time.time() - s_time
+    timings = {}
+    for name, memo_size in [('compiled matcher', 1<<18), ('without memo', 0)]:
+        compiled = matcher.AffiliationMatcher(util.interested_parties, memo_size=memo_size)
+        s_time = time.time()
+        after = [entity for entity in map(compiled.match, affiliations) if entity is not None]
+        timings[name] = time.time() - s_time
+        print('identical output of {}: {}'.format(name, before == after))
+    print('{} affiliations ({} distinct), {} matched'.format(args.size, len(set(affiliations)), len(after)))
+    print('legacy scan: {:.3f} sec'.format(t_legacy))
+    for name in timings:
+        print('{}: {:.3f} sec, speedup {:.2f}x'.format(name, timings[name], t_legacy/timings[name]))
@@ -0,0 +1,73 @@
+'''
+throughput of fetching and parsing scholar profiles, parsing in the fetching threads versus in a parsepool.ParsePool,
+fetching is simulated by waiting a fixed latency for each page, checking both give the same coauthors
+run from the root of the repository: python3 bench/bench_parsepool.py [--pages DIR] [--fetchers N] [--workers N]
+'''
+import argparse, glob, os, random, time
+from concurrent.futures import ThreadPoolExecutor
+import fakeweb
+import parsepool
+
+parser = argparse.ArgumentParser(description='benchmark parsing pages in a process pool')
+parser.add_argument('--pages', type=str, default=None, help='directory of recorded pages (*.html), default to synthetic \
+                    scholar profiles')
+parser.add_argument('--xpath', type=str, default='//*[@id="gsc_rsb_co"]/ul/li/div/span[2]/span[1]/text()',
+                    help='xpath evaluated on each page, default to the coauthor list of util.parse_scholar')
+parser.add_argument('--count', type=int, default=400, help='number of synthetic pages')
+parser.add_argument('--fetchers', type=int, default=16, help='number of fetching threads')
+parser.add_argument('--latency', type=float, default=0.02, help='seconds each simulated fetch waits')
+parser.add_argument('--workers', type=str, default='1 2 4', help='numbers of parsing processes to try')
+parser.add_argument('--queue', type=int, default=64, help='pages waiting to be parsed at most')
+
+def synthetic(count, seed=202):
+    '''
+    this function renders scholar profiles of about 70 KB, a coauthor sidebar and a table of 100 publications
+    '''
+    rng = random.Random(seed)
+    row = ('<tr class="gsc_a_tr"><td class="gsc_a_t"><a href="/citations?view_op=view_citation&amp;citation_for_view={}"'
+           ' class="gsc_a_at">{}</a><div class="gs_gray">{}</div><div class="gs_gray">{}</div></td><td class="gsc_a_c">'
+           '<a href="https://scholar.google.com/scholar?cites={}" class="gsc_a_ac gs_ibl">{}</a></td><td class="gsc_a_y">'
+           '<span class="gsc_a_h gsc_a_hc gs_ibl">{}</span></td></tr>')
+    pages = []
+    for i in range(count):
+        sidebar = fakeweb.scholar_page('{:012x}'.format(rng.getrandbits(48)))
+        table = ''.join(row.format(rng.getrandbits(32), 'A study of something rather long ' * 4,
+                                   ', '.join('Author {}'.format(rng.randrange(1000)) for _ in range(8)),
+                                   'Proceedings of a conference, ' * 3, rng.getrandbits(32), rng.randrange(1000),
+                                   rng.randrange(2000, 2021)) for _ in range(100))
+        pages.append(sidebar.replace('</body>', '<table id="gsc_a_t"><tbody>{}</tbody></table></body>'.format(table)))
+    return pages
+
+def run(pages, xpath, fetchers, latency, pool=None):
+    # like collect.map_members, the fetching threads hand the pages over without waiting and the caller waits in order
+    def fetch_and_parse(page):
+        time.sleep(latency)
+        if pool is None:
+            return parsepool.parse_inline(page, xpath)
+        return pool.submit(page, xpath)
+    s_time = time.time()
+    with ThreadPoolExecutor(fetchers) as executor:
+        result = [future.result() for future in executor.map(fetch_and_parse, pages)]
+    return time.time()-s_time, result
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    if args.pages:
+        pages = []
+        for filename in sorted(glob.glob(os.path.join(args.pages, '*.html'))):
+            with open(filename, 'rb') as f:
+                pages.append(f.read())
+    else:
+        pages = synthetic(args.count)
+    print('{} pages, {:.1f} KB on average, {} fetchers, {} cpus'.format(
+        len(pages), sum(map(len, pages)) / len(pages) / 1024, args.fetchers, os.cpu_count()))
+    elapsed, baseline = run(pages, args.xpath, args.fetchers, args.latency)
+    print('{:>20} {:>10.3f} sec {:>10.1f} pages/sec'.format('in fetching threads', elapsed, len(pages)/elapsed))
+    for workers in map(int, args.workers.split()):
+        pool = parsepool.ParsePool(workers, args.queue)
+        # start the workers before timing
+        pool.submit(pages[0], args.xpath).result()
+        elapsed, result = run(pages, args.xpath, args.fetchers, args.latency, pool)
+        pool.shutdown()
+        print('{:>20} {:>10.3f} sec {:>10.1f} pages/sec, same: {}'.format(
+            '{} processes'.format(workers), elapsed, len(pages)/elapsed, result == baseline))
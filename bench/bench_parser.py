@@ -0,0 +1,81 @@
+'''
+cpu time to find the scholar profile in google result pages, the BeautifulSoup parse google_search used to do versus
+the href scan of util.find_scholar_url, checking both find the same profiles
+run from the root of the repository: python3 bench/bench_parser.py [--pages DIR] [--count N]
+'''
+import argparse, glob, os, random, time
+from bs4 import BeautifulSoup
+import fakeweb
+import util
+
+parser = argparse.ArgumentParser(description='benchmark extracting scholar links from google result pages')
+parser.add_argument('--pages', type=str, default=None, help='directory of saved result pages (*.html), default to \
+                    synthetic pages shaped like google\'s')
+parser.add_argument('--count', type=int, default=500, help='number of synthetic pages')
+parser.add_argument('--repeat', type=int, default=3, help='times each page is scanned')
+
+def synthetic(count, seed=202):
+    '''
+    this function renders result pages of about 120 KB, inline scripts and styles first, then ten results with their
+    snippets and decorations, a scholar profile among them in most pages
+    '''
+    rng = random.Random(seed)
+    script = '<script nonce="x">(function(){{var a={};window.google={{kEI:"{}"}};}})();</script>'
+    style = '<style>.g{{margin:0 0 {}px}} .r a{{color:#1a0dab}} .st{{line-height:1.58}}</style>'
+    pages = []
+    for i in range(count):
+        head = ''.join(script.format(rng.random(), 'x'*1800) + style.format(j) for j in range(60))
+        results = []
+        for j in range(10):
+            results.append('<div class="g"><div class="r"><a href="/url?q=https://example{0}.com/page{1}&amp;sa=U&amp;'
+                           'ved=2ah">Result {1}</a></div><div class="s"><span class="st">{2}</span><div><a href='
+                           '"/search?q=related:example{0}.com">Similar</a></div></div></div>'.format(
+                               i, j, 'lorem ipsum dolor sit amet ' * 30))
+        if rng.random() < .8:
+            user = ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_')
+                           for _ in range(12))
+            # a link to scholar search comes before the profile, as in "scholarly articles for ..."
+            results.insert(rng.randrange(3), '<div class="g"><a href="https://scholar.google.com/scholar?q=member+{}">'
+                           'Scholarly articles</a></div>'.format(i))
+            results.insert(rng.randrange(4, 11), '<div class="g"><a href="https://scholar.google.com/citations?user={}'
+                           '&amp;hl=zh-CN&amp;oi=ao">Member {} - Google Scholar</a></div>'.format(user, i))
+        footer = ''.join('<a href="/search?q=page&amp;start={}">{}</a>'.format(j*10, j) for j in range(10))
+        pages.append('<html><head>{}</head><body><div id="search">{}</div>{}</body></html>'.format(
+            head, ''.join(results), footer))
+    return pages
+
+def legacy(page):
+    '''
+    the link extraction of google_search before the href scan, skipping links which are not profiles so both
+    are compared on the same profiles
+    '''
+    for link in BeautifulSoup(page, 'html.parser').find_all('a'):
+        url = link.get('href')
+        if url and 'scholar.google.com' in url and 'user=' in url:
+            return url
+    return None
+
+def run(func, pages, repeat):
+    found = [func(page) for page in pages]
+    s_time = time.process_time()
+    for _ in range(repeat):
+        for page in pages:
+            func(page)
+    return (time.process_time()-s_time) / repeat / len(pages), found
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    if args.pages:
+        pages = []
+        for filename in sorted(glob.glob(os.path.join(args.pages, '*.html'))):
+            with open(filename, encoding='utf-8', errors='replace') as f:
+                pages.append(f.read())
+    else:
+        pages = synthetic(args.count)
+    print('{} pages, {:.1f} KB on average'.format(len(pages), sum(map(len, pages)) / len(pages) / 1024))
+    t_legacy, legacy_found = run(legacy, pages, args.repeat)
+    t_scan, scan_found = run(util.find_scholar_url, pages, args.repeat)
+    users = lambda urls: [url and util.scholar_user.search(url).group(1) for url in urls]
+    print('BeautifulSoup: {:.3f} ms/page, href scan: {:.3f} ms/page, {:.0f}x, profiles found: {}, same: {}'.format(
+        t_legacy*1e3, t_scan*1e3, t_legacy/t_scan, sum(url is not None for url in scan_found),
+        users(legacy_found) == users(scan_found)))
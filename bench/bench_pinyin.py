@@ -0,0 +1,55 @@
+'''
+converting a synthetic faculty list of chinese names into pinyin, lazy_pinyin on every name as name_to_pinyin used to
+do versus romanize.Romanizer, cold and with its memo filled, checking where both agree
+run from the root of the repository: python3 bench/bench_pinyin.py [--names N]
+'''
+import argparse, random, time
+from pypinyin import lazy_pinyin
+import fakeweb
+import romanize
+
+parser = argparse.ArgumentParser(description='benchmark converting names into pinyin')
+parser.add_argument('--names', type=int, default=100000, help='number of synthetic names')
+
+SURNAMES = '王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈姚卢姜崔钟谭陆汪范金石廖贾夏韦付方白邹孟熊秦邱江尹薛闫段雷侯龙史陶黎贺顾毛郝龚邵万钱严覃武戴莫孔向汤单'
+GIVEN = '伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉兰萍红建文辉力鹏飞鑫波宁健斌宇浩凯晨博晓峰志国海云雪琳婷欣雨子轩涵梓'
+
+def synthetic(count, seed=202):
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        surname = rng.choice(romanize.compound_surnames) if rng.random() < .02 else rng.choice(SURNAMES)
+        names.append(surname + ''.join(rng.choice(GIVEN) for _ in range(rng.choice([1, 2, 2]))))
+    return names
+
+def legacy(names):
+    '''
+    the conversion of name_to_pinyin before the romanizer, for names in chinese characters
+    '''
+    converted = []
+    for name in names:
+        raw_pinyin = [c for c in lazy_pinyin(name) if c.isalpha()]
+        converted.append(''.join(raw_pinyin[1:]) + ' ' + raw_pinyin[0])
+    return converted
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    names = synthetic(args.names)
+    s_time = time.time()
+    before = legacy(names)
+    t_legacy = time.time() - s_time
+    romanizer = romanize.Romanizer()
+    s_time = time.time()
+    after = romanizer.convert_all(names)
+    t_cold = time.time() - s_time
+    s_time = time.time()
+    romanizer.convert_all(names)
+    t_warm = time.time() - s_time
+    special = [romanize.split_name(name)[0] in romanize.surname_readings or name[:2] in romanize.compound_surnames
+               for name in names]
+    agree = sum(b == a for b, a, s in zip(before, after, special) if not s)
+    print('{} names, {} distinct: lazy_pinyin on each {:.3f} sec, romanizer {:.3f} sec cold, {:.3f} sec memoized'.format(
+        len(names), len(set(names)), t_legacy, t_cold, t_warm))
+    example = next((name, a, b) for name, a, b, s in zip(names, after, before, special) if s)
+    print('same query for {} of {} names with ordinary surnames, {} names with compound or specially read surnames, '
+          'e.g. {} -> "{}" instead of "{}"'.format(agree, len(names)-sum(special), sum(special), *example))
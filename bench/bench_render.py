@@ -0,0 +1,73 @@
+'''
+render time of vis.py over synthetic statistics, a scatter call and an annotation for each institution (as vis.py
+used to plot) versus one scatter call with labels that do not overlap, and versus hexagons aggregating the dots
+run from the root of the repository: MPLBACKEND=Agg python3 bench/bench_render.py [--sizes "100 10000 100000"]
+'''
+import argparse, os, tempfile, time, tracemalloc
+from itertools import cycle
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import fakeweb
+import util, vis
+
+parser = argparse.ArgumentParser(description='benchmark rendering the plots of vis.py')
+parser.add_argument('--sizes', type=str, default='100 10000 100000', help='numbers of institutions to try')
+parser.add_argument('--per_row_max', type=int, default=1000, help='largest size plotted row by row, about a \
+                    minute at 1000 and growing linearly')
+parser.add_argument('--labels', type=int, default=100, help='--labels of vis.py')
+
+fields = ['inner_connection_ratio', 'avg_connection_per_member']
+area = '#member_w_connection'
+
+def synthetic(size, seed=202):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'university': ['Institute {} of Something'.format(i) for i in range(size)],
+                         fields[0]: rng.beta(2, 5, size), fields[1]: rng.lognormal(1, .5, size),
+                         area: rng.integers(1, 200, size)})
+
+def per_row(stat, output):
+    '''
+    this function plots as vis.plot_field_2d used to, a scatter call and an annotation for each row
+    '''
+    fig = plt.figure(figsize=(12, 8))
+    ax = fig.add_subplot()
+    ax.set_xlim(-1.2, 1.2)
+    ax.set_ylim(-1.2, 1.2)
+    x_axis = util.normal_to_m1p1(np.array(stat[fields[0]], dtype=float))
+    y_axis = util.normal_to_m1p1(np.array(stat[fields[1]], dtype=float))
+    sizes = util.normal_to_01(np.array(stat[area], dtype=float)) + 1
+    colors = cycle(vis.palette)
+    for row, x, y, s in zip(stat.iloc[:, 0], x_axis, y_axis, sizes):
+        ax.scatter(x, y, s=s*1600, c=next(colors), marker='o', alpha=.6)
+        ax.annotate(row, (x, y), (x-9e-3*len(row), y+1.6e-1))
+    plt.savefig(output)
+    plt.close(fig)
+
+def timed(func, *args, **kwargs):
+    tracemalloc.start()
+    s_time = time.time()
+    func(*args, **kwargs)
+    elapsed = time.time() - s_time
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    print('{:>8} {:>8} {:>10} {:>10}'.format('points', 'render', 'sec', 'peak MB'))
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'plot.png')
+        # the first figure pays for loading fonts
+        vis.plot_field_2d(synthetic(10), fields, area, output)
+        for size in map(int, args.sizes.split()):
+            stat = synthetic(size)
+            runs = [(render, lambda render=render: vis.plot_field_2d(stat, fields, area, output, render,
+                                                                     max_labels=args.labels))
+                    for render in ['scatter', 'hexbin']]
+            if size <= args.per_row_max:
+                runs.insert(0, ('per row', lambda: per_row(stat, output)))
+            for label, func in runs:
+                print('{:>8} {:>8} {:>10.3f} {:>10.1f}'.format(size, label, *timed(func)))
@@ -0,0 +1,74 @@
+'''
+resolving synthetic institution names with misspellings and abbreviations, the n-gram blocking index of
+resolve.EntityResolver versus comparing each name with every canonical name, checking both resolve the same way
+run from the root of the repository: python3 bench/bench_resolve.py [--names N] [--institutions N]
+'''
+import argparse, random, time
+import fakeweb
+import resolve
+
+parser = argparse.ArgumentParser(description='benchmark resolving institution names')
+parser.add_argument('--names', type=int, default=100000, help='number of names to resolve')
+parser.add_argument('--institutions', type=int, default=20000, help='number of distinct institutions')
+parser.add_argument('--brute_force', type=int, default=2000, help='names resolved by comparing with every canonical \
+                    name, which takes too long for all of them')
+
+WORDS = ['university', 'institute', 'technology', 'science', 'research', 'laboratory', 'college', 'national', 'school',
+         'engineering', 'medical', 'academy', 'normal', 'polytechnic', 'center', 'of', 'and']
+
+def synthetic(names, institutions, seed=202):
+    '''
+    this function makes up institutions from a place name and a few common words, and names of them, some with
+    abbreviations, swapped letters, or in another case
+    '''
+    rng = random.Random(seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    canonical = []
+    for _ in range(institutions):
+        place = ''.join(rng.choice(letters) for _ in range(rng.randrange(5, 10)))
+        canonical.append(' '.join([place] + rng.sample(WORDS, rng.randrange(1, 4))))
+    result = []
+    for _ in range(names):
+        name = rng.choice(canonical)
+        change = rng.random()
+        if change < .2:
+            name = name.replace('university', 'univ.').replace('institute', 'inst.')
+        elif change < .3:
+            i = rng.randrange(len(name)-1)
+            name = name[:i] + name[i+1] + name[i] + name[i+2:]
+        elif change < .4:
+            name = name.title()
+        result.append(name)
+    return result
+
+class BruteForce(resolve.EntityResolver):
+    def nearest(self, key):
+        grams = resolve.ngrams(key, self.n)
+        words = resolve.content_words(key)
+        best, best_score = None, self.threshold
+        for cid, other in enumerate(self.grams):
+            shared = len(grams & other)
+            score = shared / (len(grams) + len(other) - shared)
+            if score >= best_score and resolve.re.findall(r'\d+', key) == self.numbers[cid] and \
+               resolve.same_words(words, self.words[cid]):
+                best, best_score = cid, score
+        return best
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    names = synthetic(args.names, args.institutions)
+    resolver = resolve.EntityResolver()
+    s_time = time.time()
+    resolved = [resolver.resolve(name) for name in names]
+    elapsed = time.time() - s_time
+    print('{} names, {} distinct, resolved to {} institutions in {:.3f} sec with the blocking index'.format(
+        len(names), len(set(names)), len(resolver.names), elapsed))
+    brute = BruteForce()
+    s_time = time.time()
+    brute_resolved = [brute.resolve(name) for name in names[:args.brute_force]]
+    brute_elapsed = time.time() - s_time
+    blocked = resolve.EntityResolver()
+    s_time = time.time()
+    blocked_resolved = [blocked.resolve(name) for name in names[:args.brute_force]]
+    print('first {} names: blocking index {:.3f} sec, every pair {:.3f} sec, same: {}'.format(
+        args.brute_force, time.time()-s_time, brute_elapsed, blocked_resolved == brute_resolved))
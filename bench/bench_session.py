@@ -0,0 +1,31 @@
+'''
+tcp connections opened for fetching scholar profiles from a local server, with a bare requests.get per page
+versus the pooled sessions of util.fetch_page
+run from the root of the repository: python3 bench/bench_session.py [--fetches N]
+'''
+import argparse, time
+import requests
+import fakeweb
+import util
+
+parser = argparse.ArgumentParser(description='benchmark keep-alive connection pooling with a fake http server')
+parser.add_argument('--fetches', type=int, default=1000, help='number of profile pages to fetch')
+
+def run(fetch, server, fetches):
+    connections = server.connections
+    s_time = time.time()
+    for i in range(fetches):
+        fetch('{}/citations?user={:012x}'.format(server.url, i))
+    return server.connections-connections, time.time()-s_time
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    server = fakeweb.start(latency=0)
+    header = util.headers[0]
+    bare = run(lambda url: requests.get(url, headers=header).text, server, args.fetches)
+    pooled = run(lambda url: util.fetch_page(url, header), server, args.fetches)
+    print('{:>8} {:>12} {:>10}'.format('', 'connections', 'sec'))
+    print('{:>8} {:>12} {:>10.3f}'.format('bare', *bare))
+    print('{:>8} {:>12} {:>10.3f}'.format('pooled', *pooled))
+    print('handshakes saved per 1000 fetches: {:.0f}'.format((bare[0]-pooled[0]) * 1000 / args.fetches))
+    server.shutdown()
@@ -0,0 +1,60 @@
+'''
+start-up time of short invocations of the scripts: --help, a recount of a small connections file and a crawl of one
+small university from the fake web, wall time of the whole command and import time measured by python -X importtime,
+with the heaviest imports. point --src at another checkout (e.g. made by git worktree) to compare with it
+run from the root of the repository: python3 bench/bench_startup.py [--repeat N] [--src DIR]
+'''
+import argparse, os, re, statistics, subprocess, sys, tempfile, time
+import fakeweb
+from bench_e2e import ROOT, prepare
+
+parser = argparse.ArgumentParser(description='benchmark the start-up time of the scripts')
+parser.add_argument('--repeat', type=int, default=5, help='runs of each command, the median is reported')
+parser.add_argument('--src', type=str, default=os.path.join(ROOT, 'src'), help='directory of the scripts to time')
+parser.add_argument('--top', type=int, default=3, help='heaviest imports listed for each command')
+
+def commands(src):
+    return [('import util', ['-c', 'import sys; sys.path.insert(0, {!r}); import util'.format(src)]),
+            ('collect --help', [os.path.join(src, 'collect.py'), '--help']),
+            ('feature --help', [os.path.join(src, 'feature.py'), '--help']),
+            ('vis --help', [os.path.join(src, 'vis.py'), '--help']),
+            ('recount', [os.path.join(src, 'feature.py'), '--count', 'None', '--translator', 'none']),
+            ('one university', [os.path.join(src, 'collect.py'), '--range', 'fu0'])]
+
+def imports(stderr, top):
+    '''
+    this function sums the cumulative time of the modules imported at the top level in the output of -X importtime
+    return value:
+        a tuple (total ms, list of the top heaviest (module, ms))
+    '''
+    found = []
+    for line in stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \| (\S.*)$', line)
+        if match and not match.group(2).startswith('_') and match.group(2) not in ('site', 'encodings', 'io'):
+            found.append((match.group(2), int(match.group(1)) / 1000))
+    return sum(ms for _, ms in found), sorted(found, key=lambda item: -item[1])[:top]
+
+def timed(argv, workdir, env):
+    s_time = time.time()
+    subprocess.run([sys.executable] + argv, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.time() - s_time
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    web = fakeweb.start(0)
+    web.scholar = 'https://scholar.google.com'
+    env = dict(os.environ, SCHOLAR_SPIDER_REPLAY=web.url, MPLBACKEND='Agg')
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare(workdir, 5, 5, web)
+        # a connections file to recount, collected from the fake web
+        subprocess.run([sys.executable, os.path.join(args.src, 'collect.py')], cwd=workdir, env=env,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        print('{:>16} {:>10} {:>12}  {}'.format('command', 'wall ms', 'import ms', 'heaviest imports (ms)'))
+        for label, argv in commands(args.src):
+            wall = statistics.median(timed(argv, workdir, env) for _ in range(args.repeat))
+            result = subprocess.run([sys.executable, '-X', 'importtime'] + argv, cwd=workdir, env=env,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            total, heaviest = imports(result.stderr, args.top)
+            print('{:>16} {:>10.0f} {:>12.0f}  {}'.format(label, wall*1000, total,
+                                                         ', '.join('{} {:.0f}'.format(*item) for item in heaviest)))
+    web.shutdown()
@@ -0,0 +1,142 @@
+'''
+a fake web server standing in for google search and google scholar, used by the benchmarks in this directory,
+every response is delayed by a fixed latency to mimic a slow proxy
+'''
+import sys, os, time, threading, zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+AFFILIATIONS = ['Nanjing University', 'Professor, Tsinghua University', 'Microsoft Research Asia', 'Google',
+                'Institute of Computing Technology, CAS', 'Peking University', 'ETH Zurich', 'Alibaba Group']
+
+def search_page(scholar, query):
+    '''
+    this function renders a google result page whose first scholar link points to scholar, which is this server
+    itself unless requests are rewritten to it (see replay.rewrite)
+    '''
+    user = '{:012x}'.format(zlib.crc32(query.encode()))
+    filler = ''.join('<div class="g"><a href="https://example.com/{}">result {}</a></div>'.format(i, i) for i in range(30))
+    return ('<html><body>{}<a href="{}/citations?user={}&hl=en">{}</a>'
+            '</body></html>').format(filler, scholar, user, query)
+
+def coauthors(user, count, universe=20000):
+    '''
+    this function makes up count coauthors (id, affiliation) of user, ids are drawn from a fixed universe of profiles,
+    so crawling them further runs into profiles already seen
+    '''
+    seed = int(user, 16) if user else 0
+    return [('{:012x}'.format(zlib.crc32('{}-{}'.format(user, i).encode()) % universe),
+             AFFILIATIONS[(seed+i) % len(AFFILIATIONS)]) for i in range(count)]
+
+def scholar_page(user):
+    '''
+    this function renders a google scholar profile with a coauthor sidebar matching util.parse_scholar's xpath,
+    12 coauthors are shown and a "view all" button leads to the list of 20
+    '''
+    items = ['<li><div><span><a href="/citations?user={0}&amp;hl=en">coauthor {0}</a></span><span><span>{1}</span>'
+             '</span></div></li>'.format(co, affiliation) for co, affiliation in coauthors(user, 12)]
+    return ('<html><body><div id="gsc_rsb_co"><ul>{}</ul><button id="gsc_coauth_opn">View all</button></div>'
+            '</body></html>').format(''.join(items))
+
+def colleagues_page(user):
+    '''
+    this function renders the full coauthor list of a google scholar profile
+    '''
+    cards = ['<div class="gsc_ucoar gs_scl"><div class="gs_ai_t"><h3 class="gs_ai_name"><a href="/citations?hl=en'
+             '&amp;user={0}">coauthor {0}</a></h3><div class="gs_ai_aff">{1}</div></div></div>'.format(co, affiliation)
+             for co, affiliation in coauthors(user, 20)]
+    return '<html><body><div id="gsc_codb_content">{}</div></body></html>'.format(''.join(cards))
+
+def faculty_page(names, visits=None):
+    '''
+    this function renders a faculty list matching the xpath //ul[@id="faculty"]/li/text(), with a visit counter
+    around it if visits is given, so the page changes on every visit while the list does not
+    '''
+    items = ''.join('<li>{}</li>'.format(name) for name in names)
+    counter = '<p>visitor No. {}</p>'.format(visits) if visits is not None else ''
+    return '<html><body>{}<ul id="faculty">{}</ul></body></html>'.format(counter, items)
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, avoid the delayed ack stall on keep-alive connections
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        status = 200
+        extra = {}
+        if '/faculty/' in parts.path:
+            # faculty lists answer conditional requests, with the hash of the page as its etag
+            body = faculty_page(self.server.faculty.get(parts.path.rsplit('/faculty/', 1)[1], []),
+                                self.server.requests if self.server.volatile else None)
+            extra['ETag'] = '"{:08x}"'.format(zlib.crc32(body.encode('utf-8')))
+            if self.headers.get('If-None-Match') == extra['ETag']:
+                status, body = 304, ''
+        elif parts.path.startswith('/blocked/'):
+            # a mirror that has banned us
+            status = 429
+            body = '<html><body>Our systems have detected unusual traffic from your computer network.</body></html>'
+        elif parts.path.endswith('/search'):
+            scholar = self.server.scholar or self.server.url + '/scholar.google.com'
+            body = search_page(scholar, query.get('q', [''])[0])
+        elif parts.path.endswith('/citations') and query.get('view_op') == ['list_colleagues']:
+            body = colleagues_page(query.get('user', [''])[0])
+        elif parts.path.endswith('/citations'):
+            body = scholar_page(query.get('user', [''])[0])
+        else:
+            body = '<html><body></body></html>'
+        body = body.encode('utf-8')
+        with self.server.lock:
+            self.server.requests += 1
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in extra.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0.05):
+        super().__init__(('127.0.0.1', 0), FakeHandler)
+        self.latency = latency
+        self.requests = 0
+        self.connections = 0
+        # faculty lists served under /faculty/<key>, and whether their pages change on every visit
+        self.faculty = {}
+        self.volatile = False
+        # where the scholar links of result pages point, https://scholar.google.com when requests are rewritten to
+        # this server, default to this server itself
+        self.scholar = None
+        self.lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        # one call per accepted tcp connection
+        with self.lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self.server_address[1])
+
+def start(latency=0.05):
+    '''
+    this function starts a FakeServer in a daemon thread
+    params:
+        latency: float, seconds to wait before answering each request
+    return value:
+        the running FakeServer
+    '''
+    server = FakeServer(latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
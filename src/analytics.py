@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+import columnar
+
+class Collaboration:
+    '''
+    connections interned into integer ids and held as sparse matrices. institutions (universities included, they come
+    first so university i is also institution i) are columns of a university x institution matrix of counts, and
+    optionally of a member x institution matrix, on which statistics are computed with sparse linear algebra
+    '''
+    def __init__(self, members, counts, links=None, key=None):
+        '''
+        params:
+            members: DataFrame, returned by columnar.flatten_connections
+            counts: DataFrame, returned by columnar.compute_counts or columnar.counts_from_dict
+            links: DataFrame or None, returned by columnar.flatten_connections, needed for member_matrix
+            key: function or None, passed to columnar.normalize_names to tell connections inside a university
+        '''
+        self.key = key
+        self.univs = pd.Index(members['univ'].cat.categories)
+        names = [pd.Series(self.univs), counts['institution']] + ([links['institution']] if links is not None else [])
+        codes, uniques = pd.factorize(pd.concat(names, ignore_index=True))
+        self.institutions = pd.Index(uniques)
+        self.member_univ = members['univ'].cat.codes.values
+        self.num_connections = members['num_connections'].values
+        shape = (len(self.univs), len(self.institutions))
+        self.counts = sparse.csr_matrix((counts['count'].values.astype(np.float64),
+                                         (self.univ_ids(counts['univ']),
+                                          codes[len(self.univs):len(self.univs)+len(counts)])), shape=shape)
+        self.member_matrix = None
+        if links is not None:
+            # a member is identified by its university and name, packed into one integer to look up quickly
+            names, _ = pd.factorize(pd.concat([members['member'], links['member']], ignore_index=True))
+            keys = np.concatenate([self.member_univ, self.univ_ids(links['univ'])]) \
+                   * np.int64(len(names)) + names
+            owners = pd.Index(keys[:len(members)]).get_indexer(keys[len(members):])
+            self.member_matrix = sparse.csr_matrix((np.ones(len(links)), (owners, codes[len(self.univs)+len(counts):])),
+                                                   shape=(len(members), len(self.institutions)))
+
+    def univ_ids(self, column):
+        # categories are looked up once, instead of every row
+        column = column.astype('category')
+        return self.univs.get_indexer(column.cat.categories.astype(str))[column.cat.codes.values]
+
+    def inner(self):
+        '''
+        this function tells which entries of counts are connections inside a university, i.e. with an institution
+        named like it up to case and punctuations (e.g. after util.process_institutions lowercases it), or with the same
+        key if one is given
+        return value:
+            rows: array, the university of each stored entry of counts
+            inner: array of bool, for each stored entry of counts
+        '''
+        normalized = columnar.normalize_names(pd.Series(self.institutions), self.key).values
+        rows = np.repeat(np.arange(self.counts.shape[0]), np.diff(self.counts.indptr))
+        return rows, normalized[self.counts.indices] == normalized[rows]
+
+    def stat(self):
+        '''
+        this function computes the fields of stat.csv, same as columnar.compute_stat
+        return value:
+            DataFrame indexed by university, columns are columnar.stat_fields
+        '''
+        counts = self.counts
+        rows, inner = self.inner()
+        stat = pd.DataFrame(index=self.univs)
+        stat['#member_w_connection'] = np.bincount(self.member_univ, weights=self.num_connections > 0,
+                                                   minlength=len(self.univs)).astype(np.int64)
+        stat['#total_member'] = np.bincount(self.member_univ, minlength=len(self.univs))
+        stat['total_connections'] = np.asarray(counts.sum(axis=1)).ravel().astype(np.int64)
+        stat['inner_connection_ratio'] = np.bincount(rows, weights=counts.data * inner, minlength=len(self.univs)) \
+                                         / stat['total_connections']
+        stat['unique_connections'] = np.diff(counts.indptr)
+        stat['avg_coauthors_per_member'] = stat['total_connections'] / stat['#total_member']
+        stat['avg_coauthors_per_w_con'] = stat['total_connections'] / stat['#member_w_connection']
+        stat['avg_connection_per_member'] = stat['unique_connections'] / stat['#member_w_connection']
+        return stat[columnar.stat_fields]
+
+    def jaccard(self):
+        '''
+        this function computes the jaccard overlap of the sets of institutions each pair of universities work with
+        return value:
+            DataFrame, university x university, |A & B| / |A | B|
+        '''
+        binary = self.counts.copy()
+        binary.data[:] = 1
+        shared = (binary @ binary.T).toarray()
+        sizes = np.diff(binary.indptr)
+        union = sizes[:, None] + sizes[None, :] - shared
+        return pd.DataFrame(np.divide(shared, union, out=np.zeros_like(shared), where=union > 0),
+                            index=self.univs, columns=self.univs)
+
+    def centrality(self, damping=.85, tol=1e-10, max_iter=100):
+        '''
+        this function ranks institutions by pagerank on the collaboration graph, where a university and an institution
+        are linked with weight the number of their connections, institutions named like a university are merged into it
+        params:
+            damping: float, probability of following a link instead of jumping to a random institution
+            tol: float, stop once the ranks change less than this in total
+            max_iter: int, most power iterations
+        return value:
+            Series of pagerank indexed by institution, from the most central to the least
+        '''
+        n = len(self.institutions)
+        rows, inner = self.inner()
+        cols = np.where(inner, rows, self.counts.indices)
+        upper = sparse.csr_matrix((self.counts.data, (rows, cols)), shape=(n, n))
+        graph = upper + upper.T
+        graph = (graph - sparse.diags(graph.diagonal())).tocsr()
+        graph.eliminate_zeros()
+        out = np.asarray(graph.sum(axis=1)).ravel()
+        # transition[i, j]: probability of going from j to i
+        transition = (sparse.diags(np.divide(1., out, out=np.zeros(n), where=out > 0)) @ graph).T.tocsr()
+        dangling = out == 0
+        rank = np.full(n, 1./n)
+        for _ in range(max_iter):
+            new = damping * (transition @ rank + rank[dangling].sum() / n) + (1.-damping) / n
+            done = np.abs(new-rank).sum() < tol
+            rank = new
+            if done:
+                break
+        # institutions merged into a university are left out
+        merged = np.zeros(n, dtype=bool)
+        merged[self.counts.indices[inner & (self.counts.indices != rows)]] = True
+        merged[:len(self.univs)] = False
+        rank = pd.Series(rank, index=self.institutions)[~merged]
+        return rank.sort_values(ascending=False, kind='stable')
+
+    def top_partners(self, n=10, exclude_self=True):
+        '''
+        this function lists the institutions each university works with most
+        params:
+            n: int, partners listed for each university
+            exclude_self: bool, leave the university itself (up to case and punctuations) out
+        return value:
+            dict, key: university name, value: list of tuple (institution name, number of connections), ties in
+            order of first occurrence
+        '''
+        partners = {}
+        inner = self.inner()[1]
+        for row, univ in enumerate(self.univs):
+            start, end = self.counts.indptr[row], self.counts.indptr[row+1]
+            cols, data = self.counts.indices[start:end], self.counts.data[start:end]
+            if exclude_self:
+                others = ~inner[start:end]
+                cols, data = cols[others], data[others]
+            order = np.lexsort((cols, -data))[:n]
+            partners[univ] = [(self.institutions[col], int(cnt)) for col, cnt in zip(cols[order], data[order])]
+        return partners
+
+    def cooccurrence(self):
+        '''
+        this function counts, for each pair of institutions, the faculty members having coauthors from both
+        return value:
+            csr_matrix, institution x institution, symmetric with an empty diagonal
+        '''
+        if self.member_matrix is None:
+            raise ValueError('cooccurrence needs the links the collaboration was built with')
+        binary = self.member_matrix.copy()
+        binary.data[:] = 1
+        pairs = binary.T @ binary
+        pairs = (pairs - sparse.diags(pairs.diagonal())).tocsr()
+        pairs.eliminate_zeros()
+        return pairs
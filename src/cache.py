@@ -0,0 +1,92 @@
+import os, sqlite3, threading, time, zlib, hashlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+def normalize_url(url):
+    '''
+    this function normalizes a url so that trivially different spellings of it share one cache entry
+    params:
+        url: str, the url to normalize
+    return value:
+        str, the url with lowercase scheme and host, default port and fragment removed, query parameters sorted
+    '''
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = parts.hostname or ''
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host += ':{}'.format(parts.port)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+class ResponseCache:
+    '''
+    a persistent cache of page texts in a sqlite database, keyed by the hash of the normalized url.
+    entries older than max_age are treated as missing, and the least recently used ones are evicted once the
+    compressed pages take more than max_bytes
+    '''
+    def __init__(self, cache_dir, max_age=None, max_bytes=None):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(cache_dir, 'responses.sqlite'), timeout=30, check_same_thread=False)
+        self.db.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, url TEXT, body BLOB, \
+                         size INTEGER, fetched REAL, accessed REAL)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+        self.db.commit()
+        self.total = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha1(normalize_url(url).encode('utf-8')).hexdigest()
+
+    def get(self, url):
+        '''
+        this function looks up the page of url
+        params:
+            url: str, the url (or any string used as a cache key) of the page
+        return value:
+            str, the cached text, or None if it is missing or older than max_age
+        '''
+        key = self.key(url)
+        now = time.time()
+        with self.lock:
+            row = self.db.execute('SELECT body, fetched FROM responses WHERE key=?', (key,)).fetchone()
+            if row is None or (self.max_age is not None and now-row[1] > self.max_age):
+                return None
+            self.db.execute('UPDATE responses SET accessed=? WHERE key=?', (now, key))
+            self.db.commit()
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def put(self, url, text):
+        '''
+        this function saves the page of url, evicting least recently used pages if the cache grows too large
+        params:
+            url: str, the url (or any string used as a cache key) of the page
+            text: str, the page
+        return value:
+            None
+        '''
+        key = self.key(url)
+        body = zlib.compress(text.encode('utf-8'))
+        now = time.time()
+        with self.lock:
+            old = self.db.execute('SELECT size FROM responses WHERE key=?', (key,)).fetchone()
+            self.total -= old[0] if old else 0
+            self.db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                            (key, url, body, len(body), now, now))
+            self.total += len(body)
+            if self.max_bytes is not None and self.total > self.max_bytes:
+                self._evict(int(self.max_bytes * .9))
+            self.db.commit()
+
+    def _evict(self, target):
+        rows = self.db.execute('SELECT key, size FROM responses ORDER BY accessed').fetchall()
+        for key, size in rows:
+            if self.total <= target:
+                break
+            self.db.execute('DELETE FROM responses WHERE key=?', (key,))
+            self.total -= size
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,97 @@
+import json, os
+from collections import defaultdict
+
+def open_log(filename):
+    '''
+    this function opens the log for appending, terminating a line broken by a crash first
+    params:
+        filename: str, path to the log
+    return value:
+        file object opened for appending
+    '''
+    # in binary, a crash may have cut the last line inside a multibyte character
+    if os.path.exists(filename) and os.path.getsize(filename) > 0:
+        with open(filename, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+    return open(filename, 'a', encoding='utf-8')
+
+def append_record(log_file, univ, member, found, connection):
+    '''
+    this function appends the result of one faculty member to the log, one json object per line, and flushes it
+    so that it survives a crash of the crawler
+    params:
+        log_file: file object opened for appending
+        univ: str, university name
+        member: str, faculty member's name
+        found: bool or None, whether the google scholar page of this member is found, None if the member could not
+        be searched, such a record does not count as finished, see load_log
+        connection: list or None, returned by util.parse_scholar
+    return value:
+        None
+    '''
+    record = {'univ': univ, 'member': member, 'found': found, 'connection': connection}
+    log_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+    log_file.flush()
+
+def load_log(filename):
+    '''
+    this function reads the log written by append_record, a broken last line (left by a crash) is ignored, and so are
+    members who could not be searched, so they are searched again when resuming
+    params:
+        filename: str, path to the log
+    return value:
+        a dict, key: tuple (university name, member name), value: tuple (found, connection),
+        in the order they were logged, later records of the same member override earlier ones
+    '''
+    records = {}
+    if not os.path.exists(filename):
+        return records
+    with open(filename, 'rb') as f:
+        for line in f:
+            try:
+                record = json.loads(line.decode('utf-8', errors='replace'))
+            except ValueError:
+                continue
+            if record['found'] is None:
+                continue
+            records[(record['univ'], record['member'])] = (record['found'], record['connection'])
+    return records
+
+def compact(filename, univ_faculty_collection=None):
+    '''
+    this function turns the log back into the shape of connections.json
+    params:
+        filename: str, path to the log
+        univ_faculty_collection: dict or None, if given, universities and members are ordered as in it (the same order
+        a crawl without log produces), otherwise in the order they were logged
+    return value:
+        defaultdict of defaultdict, key: university name, value: defaultdict,
+                                    secondary key: faculty member's name, secondary value: list of cooperating institutions
+    '''
+    return assemble(load_log(filename), univ_faculty_collection)
+
+def assemble(records, univ_faculty_collection=None):
+    '''
+    this function arranges per-member results into the shape of connections.json, members without a google scholar
+    page or without any result are left out
+    params:
+        records: dict, key: tuple (university name, member name), value: tuple (found, connection)
+        univ_faculty_collection: dict or None, gives the order of universities and members, the order of records if None
+    return value:
+        defaultdict of defaultdict, same as compact
+    '''
+    if univ_faculty_collection is None:
+        univ_faculty_collection = defaultdict(list)
+        for univ, member in records:
+            univ_faculty_collection[univ].append(member)
+    connections = defaultdict(defaultdict)
+    for univ in univ_faculty_collection:
+        connection_dict = defaultdict()
+        for member in univ_faculty_collection[univ]:
+            found, connection = records.get((univ, member), (False, None))
+            if found:
+                connection_dict[member] = connection
+        connections[univ] = connection_dict
+    return connections
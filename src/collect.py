@@ -1,15 +1,86 @@
-import util, json, time
+import util, metrics, json, time, os
 from collections import defaultdict
-import argparse
+from concurrent.futures import ThreadPoolExecutor, Future
+import argparse, multiprocessing
+import ratelimit, cache, checkpoint, workqueue, parsepool, romanize, snapshot, mirror
+# storage (pandas, pyarrow), graph and replay are imported by the options needing them, so that --help and recounts
+# start quickly
 
-parser = argparse.ArgumentParser(description="collection connections and save in json format")
-parser.add_argument('--range', type=str, default=None, help='the institutions you want to find connection for')
+# options of fetching pages and searching for faculty members, shared with pipeline.py
+fetch_parser = argparse.ArgumentParser(add_help=False)
+fetch_parser.add_argument('--range', type=str, default=None, help='the institutions you want to find connection for')
+fetch_parser.add_argument('--connection', type=str, default='result/connections.json', help='the connection collected \
+                    by this program, it should be a dict of dict saved in json format, first key being institution \
+                    name, second key being faculty member name')
+fetch_parser.add_argument('--concurrency', type=int, default=1, help='how many faculty members to search for at the \
+                    same time, when larger than 1, requests to each host are throttled according to \
+                    config/rate-limit.json')
+fetch_parser.add_argument('--rate_limit', type=str, default='config/rate-limit.json', help='per-host rate limits used \
+                    when --concurrency is larger than 1')
+fetch_parser.add_argument('--cache_dir', type=str, default=None, help='directory of the on-disk response cache, pages \
+                    fetched before are read from it instead of the network, default to no caching')
+fetch_parser.add_argument('--max_age', type=float, default=168, help='hours after which a cached page is stale and \
+                    fetched again')
+fetch_parser.add_argument('--cache_size', type=float, default=1024, help='MB of compressed pages kept in the cache, \
+                    least recently used pages are evicted beyond it')
+fetch_parser.add_argument('--pool_size', type=int, default=None, help='keep-alive connections kept for each host, \
+                    default to max(10, --concurrency)')
+fetch_parser.add_argument('--timeout', type=float, default=30, help='seconds to wait for connecting to or reading from \
+                    a server')
+fetch_parser.add_argument('--retries', type=int, default=3, help='times to retry a request failing to connect or \
+                    answered with 429/5xx, with exponential backoff, except google searches, which go to another \
+                    mirror')
+fetch_parser.add_argument('--log', type=str, default=None, help='append each faculty member\'s connection to this file \
+                    (one json per line) as soon as it is found, so a crashed crawl can be resumed, e.g. \
+                    result/connections.jsonl')
+fetch_parser.add_argument('--resume', action='store_true', help='skip faculty members already recorded in the file \
+                    given by --log (or done in --queue with --workers of collect.py), members who could not be \
+                    searched (every mirror blocked or failed) are searched again')
+fetch_parser.add_argument('--mirror_metrics', type=str, default='result/mirrors.json', help='where to export the \
+                    latency, error rate, blocks and cooldown of each google mirror at the end of a crawl')
+fetch_parser.add_argument('--parse_workers', type=int, default=0, help='if larger than 0, parse pages in this many \
+                    processes while the fetching threads go on fetching, default to parsing in the fetching threads, \
+                    which is also used on a single cpu')
+fetch_parser.add_argument('--parse_queue', type=int, default=64, help='pages waiting to be parsed at most with \
+                    --parse_workers, fetching threads wait when it is full')
+fetch_parser.add_argument('--pinyin_cache', type=str, default='result/pinyin.json', help='json file remembering the \
+                    search queries of each faculty member\'s name, so names are converted to pinyin only once')
+fetch_parser.add_argument('--name_variants', type=int, default=1, help='forms of a name searched for before giving up \
+                    on a faculty member, from the most likely: "given surname", "surname given", "gi-ven surname"')
+fetch_parser.add_argument('--profile', action='store_true', help='time each stage (fetching, parsing, translating, \
+                    matching, etc.) and count requests, retries, cache hits and bytes, print a summary at the end')
+fetch_parser.add_argument('--metrics', type=str, default=None, help='export the timings and counters of --profile to \
+                    this file, in the prometheus text format if it ends with .prom, as json lines otherwise')
+fetch_parser.add_argument('--record', type=str, default=None, help='record every response in this fixture archive \
+                    (e.g. result/fixtures.sqlite), to be replayed offline by replay.py, pages read from --cache_dir \
+                    are not fetched, so not recorded either')
+
+parser = argparse.ArgumentParser(description="collection connections and save in json format", parents=[fetch_parser])
 parser.add_argument('--crawl', action='store_false', help='set to True if you want recollect connection, \
                     False if you want to use file specified by --connection')
-parser.add_argument('--connection', type=str, default='result/connections.json', help='the connection collected by this program, \
-                    it should be a dict of dict saved in json format, first key being institution name, second key being \
-                    faculty member name')
-args = parser.parse_args()
+parser.add_argument('--store', type=str, default='json', choices=['json', 'parquet'], help='besides --connection, \
+                    also save connections as parquet datasets partitioned by university under --parquet_dir')
+parser.add_argument('--parquet_dir', type=str, default='result/parquet', help='directory of the parquet datasets')
+parser.add_argument('--compact', action='store_true', help='only rebuild the file given by --connection from the file \
+                    given by --log, without crawling')
+parser.add_argument('--workers', type=int, default=0, help='if larger than 0, put faculty members into a work queue \
+                    and find their connections with this many worker processes, each with its own proxy and user agent')
+parser.add_argument('--queue', type=str, default='result/queue.sqlite', help='the sqlite work queue used with --workers, \
+                    on a local disk. it is emptied when a crawl starts, with --resume the tasks already done in it are \
+                    not searched again')
+parser.add_argument('--worker_proxies', type=str, default='config/workers.json', help='proxies assigned to the workers \
+                    in turn, "none" for connecting directly')
+parser.add_argument('--lease', type=float, default=300, help='seconds a worker has to finish a task before it is handed \
+                    to another worker')
+parser.add_argument('--graph', type=str, default=None, help='instead of finding connections, crawl the coauthor graph of \
+                    the faculty members (names, profile ids and affiliations of all their coauthors) into this directory')
+parser.add_argument('--depth', type=int, default=1, help='hops of the coauthor graph to crawl with --graph, 1 only lists \
+                    the coauthors of faculty members, 2 also those of their coauthors, and so on')
+parser.add_argument('--incremental', action='store_true', help='fetch the faculty lists again only if they changed \
+                    since the last crawl (recorded in --snapshot), and only search for members who joined, dropping \
+                    those who left, from the connections in --connection')
+parser.add_argument('--snapshot', type=str, default='result/faculty-snapshot.json', help='faculty lists of the last \
+                    crawl with --incremental, with the hash and validators (ETag, Last-Modified) of their pages')
 
 def univ_collection(target_alias=None):
     '''
@@ -27,41 +98,327 @@ def univ_collection(target_alias=None):
     univ_faculty_collection = util.crawl_faculty_list(configs, target_alias)
     univ_faculty_collection = util.extract_name(univ_faculty_collection)
     univ_faculty_collection = util.name_to_pinyin(univ_faculty_collection)
+    util.romanizer.save()
     return univ_faculty_collection
 
-def find_connections(univ_faculty_collection):
+def faculty_changes(target_alias, snapshots, configs=None):
+    '''
+    this function fetches the faculty lists changed since the last crawl, and tells the members who joined or left
+    params:
+        target_alias: str, list of str, or None, same as univ_collection
+        snapshots: snapshot.FacultySnapshots, the lists of the last crawl, updated with those of this one
+        configs: list or None, returned by util.read_config, read from config/institutions.json if None
+    return value:
+        a tuple (added, removed) of defaultdict, each key is the name of a university whose list changed, and the value
+        is a list of pinyin names, like those returned by univ_collection, the members the last crawl could not search
+        are added again
+    '''
+    configs = configs or util.read_config(filename='config/institutions.json')
+    print('find changed faculty for {}'.format(target_alias if target_alias else 'all'))
+    util.crawl_faculty_list(configs, target_alias, snapshots)
+    added, removed = defaultdict(list), defaultdict(list)
+    for univ, (before, after) in snapshots.changes().items():
+        # compared after the conversion, two members sharing a pinyin name are searched for as one
+        before = util.name_to_pinyin(util.extract_name({univ: before}))[univ]
+        after = util.name_to_pinyin(util.extract_name({univ: after}))[univ]
+        known, current = set(before), set(after)
+        added[univ] = list(dict.fromkeys(name for name in after if name not in known))
+        removed[univ] = list(dict.fromkeys(name for name in before if name not in current))
+        print('-----{} joined and {} left {}-----'.format(len(added[univ]), len(removed[univ]), univ))
+    for univ in list(snapshots.snapshots):
+        pending = [name for name in snapshots.pending(univ) if name not in removed[univ] and name not in added[univ]]
+        if pending:
+            print('-----{} members of {} not searched last time-----'.format(len(pending), univ))
+            added[univ].extend(pending)
+    util.romanizer.save()
+    return added, removed
+
+def update_connections(connections, added, removed):
+    '''
+    this function applies the connections of the members who joined and drops those who left
+    params:
+        connections: dict, loaded from --connection, changed in place
+        added: dict, connections of the members who joined, in the shape returned by find_connections
+        removed: dict, returned by faculty_changes
+    return value:
+        dict, connections itself
+    '''
+    for univ in removed:
+        for member in removed[univ]:
+            connections.get(univ, {}).pop(member, None)
+    for univ in added:
+        connections.setdefault(univ, {}).update(added[univ])
+    return connections
+
+def find_member_connection(member, univ, wait=True):
+    '''
+    this function finds the google scholar page of one faculty member and parses the coauthors' institutions in it
+    params:
+        member: str, the faculty member's pinyin name
+        univ: str, the university's name
+        wait: bool, passed to util.parse_scholar, if False connection may be a future to be resolved by the caller
+    return value:
+        a tuple (found, connection), found is False if no google scholar page is found, None if the member could not be
+        searched (every mirror tried was blocked or failed), otherwise connection is the list returned by
+        util.parse_scholar
+    '''
+    searched, scholar_page = util.search_member(member, univ, with_status=True)
+    if not searched:
+        return None, None
+    if not scholar_page:
+        return False, None
+    return True, util.parse_scholar(scholar_page, wait=wait)
+
+def resolve_connection(result):
+    '''
+    this function waits for the page of a result of find_member_connection(..., wait=False) to be parsed
+    '''
+    found, connection = result
+    if isinstance(connection, Future):
+        with metrics.span('parse_scholar'):
+            connection = connection.result()
+    return found, connection
+
+def map_members(univ_faculty_collection, concurrency=1, skip=()):
+    '''
+    this function runs find_member_connection for every faculty member, with at most concurrency of them in flight
+    params:
+        univ_faculty_collection: defaultdict, returned by univ_collection
+        concurrency: int, number of worker threads, 1 means searching one by one in the calling thread
+        skip: container of tuple (university name, member name), members not to search for
+    return value:
+        a generator yielding the results of find_member_connection, in the same order as univ_faculty_collection
+    '''
+    tasks = [(member, univ) for univ in univ_faculty_collection for member in univ_faculty_collection[univ] \
+             if (univ, member) not in skip]
+    # fetching threads hand pages over to util.parse_pool without waiting for them to be parsed, pages are parsed while
+    # the next ones are fetched, and util.parse_pool makes the threads wait once --parse_queue pages are pending
+    if concurrency <= 1:
+        pending = None
+        for member, univ in tasks:
+            result = find_member_connection(member, univ, wait=False)
+            if pending is not None:
+                yield resolve_connection(pending)
+            pending = result
+        if pending is not None:
+            yield resolve_connection(pending)
+        return
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # all tasks are submitted at once, so members of the next university are searched while we wait for this one
+        for result in executor.map(lambda task: find_member_connection(*task, wait=False), tasks):
+            yield resolve_connection(result)
+
+def find_connections(univ_faculty_collection, concurrency=1, output='result/connections.json', log=None, resume=False,
+                     unsearched=None):
     '''
     this function process faculty members' name list, and associate a name with corresponding google scholar page
     params:
         univ_faculty_collection: defaultdict, key: university name, value: list of faculty members' names with institutions'
         name attached to them
+        concurrency: int, how many faculty members are searched at the same time
+        output: str or None, path to save the connections, None for not saving
+        log: str or None, if given, every member's result is appended to this file once found instead of being kept in
+        memory, and output is compacted from it at the end
+        resume: bool, skip members already recorded in log, except those who could not be searched
+        unsearched: list or None, if given, (university name, member name) of the members who could not be searched are
+        appended to it
     return value:
         defaultdict of defaultdict, key: university name, value: defaultdict, 
                                     secondary key: faculty member's name, secondary value: list of cooperating institutions
     '''
     connections = defaultdict(defaultdict)
+    done = checkpoint.load_log(log) if log and resume else {}
+    if done:
+        print('-----resume from {} finished members in {}-----'.format(len(done), log))
+    log_file = checkpoint.open_log(log) if log else None
+    results = map_members(univ_faculty_collection, concurrency, skip=done)
     for univ in univ_faculty_collection:
         s_time = time.time()
         connection_dict = defaultdict()
         for member in univ_faculty_collection[univ]:
-            scholar_page = util.google_search(member+' '+univ)
-            if scholar_page:
-                connection = util.parse_scholar(scholar_page)
+            if (univ, member) in done:
+                continue
+            found, connection = next(results)
+            if found is None and unsearched is not None:
+                unsearched.append((univ, member))
+            if log_file:
+                checkpoint.append_record(log_file, univ, member, found, connection)
+            elif found:
                 # save the following line for compute_frequency
                 # we should be careful now since this could be empty
                 connection_dict[member] = connection
         connections[univ] = connection_dict
         print('-----finish connection finding for {} after {:.3} sec-----'.format(univ, time.time()-s_time))
         s_time = time.time()
-    with open('result/connections.json', 'w') as con:
-        json.dump(dict(connections), con)
+    if log_file:
+        log_file.close()
+        connections = checkpoint.compact(log, univ_faculty_collection)
+    if output:
+        with open(output, 'w') as con:
+            json.dump(dict(connections), con)
+    return connections
+
+def coordinate(univ_faculty_collection, workers, queue_file, worker_proxies, lease=300, options=None,
+               output='result/connections.json', resume=False, unsearched=None):
+    '''
+    this function puts every faculty member into the work queue, runs worker processes until all of them are done, and
+    saves their results in the same shape as find_connections
+    params:
+        univ_faculty_collection: defaultdict, returned by univ_collection
+        workers: int, number of worker processes
+        queue_file: str, path to the sqlite work queue
+        worker_proxies: list of str, proxies assigned to the workers in turn
+        lease: float, seconds a worker has to finish a task before it is handed to another worker
+        options: argparse.Namespace or None, options passed to setup_fetching in each worker, the statistics of the
+        google mirrors seen by the workers are exported to its mirror_metrics
+        output: str or None, path to save the connections, None for not saving
+        resume: bool, continue with the tasks left in the queue by the last run, instead of emptying it first
+        unsearched: list or None, if given, (university name, member name) of the members whose tasks are not done are
+        appended to it
+    return value:
+        defaultdict of defaultdict, same as find_connections
+    '''
+    import worker
+    s_time = time.time()
+    queue = workqueue.WorkQueue(queue_file)
+    if resume:
+        queue.requeue_given_up()
+    else:
+        queue.reset()
+    print('-----{} new tasks queued, {} unfinished-----'.format(queue.put_tasks(univ_faculty_collection), queue.unfinished()))
+    # spawned workers set up their own sessions and cache connections instead of inheriting ours
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=worker.work, args=(queue_file, 'worker-{}'.format(idx), \
+                                 worker_proxies[idx % len(worker_proxies)], idx, lease, options)) for idx in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    unfinished = queue.unfinished()
+    if unfinished:
+        print('{} tasks are left unfinished, run again with the same --queue and --resume to continue'.format(
+            unfinished))
+    connections = queue.results(univ_faculty_collection)
+    if unsearched is not None:
+        unsearched.extend(queue.unsearched(univ_faculty_collection))
+    if options is not None:
+        mirror.save_metrics(mirror.merge_metrics(queue.mirror_metrics().values()), options.mirror_metrics)
+    queue.close()
+    print('-----finish connection finding with {} workers after {:.3} sec-----'.format(workers, time.time()-s_time))
+    if output:
+        with open(output, 'w') as con:
+            json.dump(dict(connections), con)
     return connections
 
+def setup_fetching(options):
+    '''
+    this function configures the sessions, rate limits and response cache of util according to the options of collect.py
+    params:
+        options: argparse.Namespace, parsed by parser or by another parser with fetch_parser as a parent
+    return value:
+        None
+    '''
+    util.configure_session(pool_maxsize=options.pool_size or max(10, options.concurrency), timeout=options.timeout,
+                           retries=options.retries)
+    metrics.enabled = options.profile or bool(options.metrics)
+    util.romanizer = romanize.Romanizer(options.pinyin_cache)
+    util.name_variants = options.name_variants
+    if options.parse_workers > 0 and (os.cpu_count() or 1) <= 1:
+        # on a single cpu the processes only take turns with the fetching threads, parsing inline is faster
+        print('-----only one cpu, parse pages in the fetching threads instead of --parse_workers-----')
+    elif options.parse_workers > 0:
+        util.parse_pool = parsepool.ParsePool(options.parse_workers, options.parse_queue)
+    if options.concurrency > 1:
+        util.rate_limiter = ratelimit.load_rate_limits(options.rate_limit)
+    if options.record:
+        import replay
+        util.recorder = replay.FixtureArchive(options.record)
+    if options.cache_dir:
+        util.response_cache = cache.ResponseCache(options.cache_dir, max_age=options.max_age*3600,
+                                                  max_bytes=int(options.cache_size*2**20))
+
+def finish_fetching(options):
+    '''
+    this function stops the parse pool, closes the fixture archive, and exports the mirror statistics (unless workers
+    exported theirs) and metrics at the end of a crawl
+    params:
+        options: argparse.Namespace, parsed by parser or by another parser with fetch_parser as a parent
+    return value:
+        None
+    '''
+    if util.parse_pool is not None:
+        util.parse_pool.shutdown()
+    if util.recorder is not None:
+        print('-----{} pages recorded in {}-----'.format(len(util.recorder), options.record))
+        util.recorder.close()
+    if not getattr(options, 'workers', 0):
+        util.mirror_scheduler.save_metrics(options.mirror_metrics)
+    if options.profile:
+        metrics.print_summary()
+    if options.metrics:
+        metrics.export(options.metrics)
+
 if __name__ == '__main__':
-    if args.crawl:
+    args = parser.parse_args()
+    if args.compact:
+        print('-----compact {} into {}-----'.format(args.log, args.connection))
+        connection = checkpoint.compact(args.log)
+        with open(args.connection, 'w') as con:
+            json.dump(dict(connection), con)
+    elif args.graph:
+        print('-----begin to crawl coauthor graph-----')
+        setup_fetching(args)
+        import graph
+        roots = graph.find_roots(univ_collection(args.range), args.concurrency)
+        print(graph.crawl_graph(roots, args.depth, args.concurrency, args.graph))
+        finish_fetching(args)
+    elif args.crawl and args.incremental:
+        print('-----begin to update connection-----')
+        setup_fetching(args)
+        snapshots = snapshot.FacultySnapshots(args.snapshot)
+        connection = {}
+        if os.path.exists(args.connection):
+            connection = util.load_data(args.connection)
+        else:
+            # the snapshots describe a crawl whose connections are lost, start over
+            snapshots.forget()
+        added, removed = faculty_changes(args.range, snapshots)
+        # only the members who joined are searched, args.connection is written once they are merged into it
+        unsearched = []
+        if args.workers > 0:
+            found = coordinate(added, args.workers, args.queue, util.load_data(args.worker_proxies)['proxies'],
+                               args.lease, args, output=None, resume=args.resume, unsearched=unsearched)
+        else:
+            found = find_connections(added, args.concurrency, output=None, log=args.log, resume=args.resume,
+                                     unsearched=unsearched)
+        connection = update_connections(connection, found, removed)
+        with open(args.connection, 'w') as con:
+            json.dump(connection, con)
+        # members who could not be searched are searched again by the next update, though their lists are known now
+        if unsearched:
+            print('-----{} members could not be searched, they are searched by the next update-----'.format(
+                len(unsearched)))
+        snapshots.set_pending(unsearched)
+        # only now, so that an interrupted update finds the same changes next time
+        snapshots.save()
+        if args.store == 'parquet':
+            import storage
+            storage.save_connections(connection, args.parquet_dir)
+        finish_fetching(args)
+    elif args.crawl:
         print('-----begin to recollect connection-----')
+        setup_fetching(args)
         univ_faculty_collection = univ_collection(args.range)
-        connection = find_connections(univ_faculty_collection)
+        if args.workers > 0:
+            connection = coordinate(univ_faculty_collection, args.workers, args.queue,
+                                    util.load_data(args.worker_proxies)['proxies'], args.lease, args,
+                                    resume=args.resume)
+        else:
+            connection = find_connections(univ_faculty_collection, args.concurrency, log=args.log, resume=args.resume)
+        if args.store == 'parquet':
+            import storage
+            storage.save_connections(connection, args.parquet_dir)
+        finish_fetching(args)
     else:
         print('-----begin to recount connection-----')
         connection = util.load_data(args.connection)
\ No newline at end of file
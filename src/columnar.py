@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+# columns of stat.csv, in the order feature.py writes them
+stat_fields = ['#member_w_connection', '#total_member', 'total_connections', 'inner_connection_ratio',
+               'unique_connections', 'avg_coauthors_per_member', 'avg_coauthors_per_w_con', 'avg_connection_per_member']
+
+def flatten_connections(connections, top_k=None, process=None):
+    '''
+    this function flattens the nested connections into long format tables, once for all statistics
+    params:
+        connections: dict of dict, saved by collect.find_connections,
+            key: institution name, value: dict,
+            secondary key: faculty member's name, secondary value: list of cooperating institutions
+        top_k: int or None, keep only the first top_k institutions of each member
+        process: function or None, applied to each member's list before flattening, e.g. util.process_institutions
+    return value:
+        members: DataFrame, one row per faculty member, columns "univ", "member", "num_connections"
+        links: DataFrame, one row per (member, institution) pair, columns "univ", "member", "rank", "institution"
+    '''
+    univs, names, num_connections, lengths, institutions = [], [], [], [], []
+    for univ in connections:
+        for member in connections[univ]:
+            connection = connections[univ][member]
+            if process is not None:
+                connection = connections[univ][member] = process(connection)
+            connection = connection or []
+            univs.append(univ)
+            names.append(member)
+            num_connections.append(len(connection))
+            if top_k is not None:
+                connection = connection[:top_k]
+            lengths.append(len(connection))
+            institutions.extend(connection)
+    # universities repeat a lot, categories keep them as small integer codes
+    members = pd.DataFrame({'univ': pd.Categorical(univs, categories=list(connections)), 'member': names,
+                            'num_connections': num_connections})
+    # each member's row is repeated once for each of its institutions
+    owner = np.repeat(np.arange(len(members)), lengths)
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    links = pd.DataFrame({'univ': members['univ'].values.take(owner), 'member': members['member'].values.take(owner),
+                          'rank': np.arange(len(owner)) - starts, 'institution': institutions})
+    return members, links
+
+def compute_counts(links, min_occur=1):
+    '''
+    this function counts the occurrences of each institution for each university, same as feature.compute_frequency
+    params:
+        links: DataFrame, returned by flatten_connections
+        min_occur: int, drop institutions occurring less than min_occur times
+    return value:
+        DataFrame, columns "univ", "institution", "count", for each university sorted from the most frequent
+        institution to the rarest (ties in order of first occurrence)
+    '''
+    counts = links.groupby(['univ', 'institution'], sort=False, observed=True).size().rename('count').reset_index()
+    counts = counts[counts['count'] >= min_occur]
+    counts = counts.sort_values(['univ', 'count'], ascending=[True, False], kind='stable')
+    return counts.reset_index(drop=True)
+
+def counts_from_dict(counts):
+    '''
+    this function converts counts.json (university -> institution -> count) into the table of compute_counts
+    '''
+    rows = [(univ, ins, counts[univ][ins]) for univ in counts for ins in counts[univ]]
+    table = pd.DataFrame(rows, columns=['univ', 'institution', 'count'])
+    table['univ'] = pd.Categorical(table['univ'], categories=list(counts))
+    return table
+
+def counts_to_dict(counts):
+    '''
+    this function converts the table of compute_counts back into the shape of counts.json
+    '''
+    ret = {univ: {} for univ in counts['univ'].cat.categories}
+    for univ, ins, cnt in zip(counts['univ'], counts['institution'], counts['count']):
+        ret[univ][ins] = int(cnt)
+    return ret
+
+def normalize_names(names, key=None):
+    '''
+    this function keeps only letters, spaces and hyphens of names and lowercases them, or applies key to them if given
+    (e.g. util.institution_key), to compare institutions
+    '''
+    # each distinct name is normalized only once
+    codes, uniques = pd.factorize(names)
+    if key is not None:
+        normalized = pd.Series(uniques).astype(str).map(key)
+    else:
+        normalized = pd.Series(uniques).astype(str).str.replace('[^a-zA-Z -]', '', regex=True).str.lower()
+    return pd.Series(normalized.values.take(codes), index=names.index)
+
+def compute_stat(members, counts, key=None):
+    '''
+    this function computes the fields of stat.csv with group-wise operations, see feature.compute_stat for their meanings
+    params:
+        members: DataFrame, returned by flatten_connections
+        counts: DataFrame, returned by compute_counts or counts_from_dict
+        key: function or None, passed to normalize_names to tell connections inside a university
+    return value:
+        DataFrame indexed by university, columns are stat_fields
+    '''
+    stat = pd.DataFrame(index=pd.Index(members['univ'].cat.categories))
+    stat['#member_w_connection'] = members['num_connections'].gt(0).groupby(members['univ'], observed=False).sum()
+    stat['#total_member'] = members.groupby('univ', observed=False).size()
+    inner = normalize_names(counts['institution'], key) == normalize_names(counts['univ'], key)
+    count_stat = counts.assign(inner=counts['count'].where(inner, 0)).groupby('univ', observed=False)
+    stat['total_connections'] = count_stat['count'].sum()
+    stat['inner_connection_ratio'] = count_stat['inner'].sum() / stat['total_connections']
+    stat['unique_connections'] = count_stat.size()
+    stat['avg_coauthors_per_member'] = stat['total_connections'] / stat['#total_member']
+    stat['avg_coauthors_per_w_con'] = stat['total_connections'] / stat['#member_w_connection']
+    stat['avg_connection_per_member'] = stat['unique_connections'] / stat['#member_w_connection']
+    return stat[stat_fields]
@@ -1,9 +1,9 @@
-import numpy as np
-import json, re
+import json, re, os
 from collections import defaultdict
-import util
-import pandas as pd
+import util, translate, metrics, resolve
 import argparse
+# pandas, and columnar, storage and analytics using it, are imported where they are needed, so that --help does not
+# wait for them and a recount only loads what its --engine and --store use
 
 parser = argparse.ArgumentParser(description="generate statistics and save them to a csv with collected data")
 
@@ -16,9 +16,34 @@ parser.add_argument('--top_k', type=int, default=10, help='if recompute counts,
 parser.add_argument('--min_occur', type=int, default=1, help='if recompute counts, take only institution show up more \
                     than min_occur times into account')
 
-args = parser.parse_args()
+parser.add_argument('--translator', type=str, default='google', choices=sorted(translate.backends), help='backend \
+                    translating chinese affiliations when recomputing counts, "none" keeps them as they are')
+parser.add_argument('--translation_cache', type=str, default='result/translation.json', help='json file remembering \
+                    every affiliation translated, so recounts do not translate again')
+parser.add_argument('--raw_institutions', action='store_true', help='keep institutions as matched, instead of resolving \
+                    their spellings, abbreviations and translations to one canonical name each')
+parser.add_argument('--resolve_threshold', type=float, default=.8, help='similarity (jaccard of character 3-grams) from \
+                    which two names having the same words (up to a typo in each) are taken as the same institution')
+parser.add_argument('--entity_cache', type=str, default='result/entities.json', help='json file remembering the \
+                    canonical name each institution is resolved to')
+parser.add_argument('--engine', type=str, default='dict', choices=['dict', 'columnar', 'sparse'], help='compute with loops \
+                    over the nested dicts, flatten connections into a table once and compute with pandas group-bys, or \
+                    intern them into sparse matrices, which also computes jaccard overlaps, centrality and top partners')
+parser.add_argument('--top_n', type=int, default=10, help='partners listed for each university with --engine sparse')
+parser.add_argument('--analytics_dir', type=str, default='result', help='where --engine sparse writes jaccard.csv, \
+                    centrality.csv and partners.json')
+parser.add_argument('--range', type=str, default=None, help='aliases of the institutions to compute statistics for, \
+                    e.g. "thu pku", default to all. the counts and statistics of the others are kept where they are \
+                    saved. with --store parquet, only their partitions are read and written')
+parser.add_argument('--store', type=str, default='json', choices=['json', 'parquet'], help='read connections and counts \
+                    from, and write counts and statistics to, json/csv files or parquet datasets under --parquet_dir')
+parser.add_argument('--parquet_dir', type=str, default='result/parquet', help='directory of the parquet datasets')
+parser.add_argument('--profile', action='store_true', help='time translating and matching institutions, print a summary \
+                    at the end')
+parser.add_argument('--metrics', type=str, default=None, help='export the timings and counters of --profile to this file, \
+                    in the prometheus text format if it ends with .prom, as json lines otherwise')
 
-def compute_frequency(connections, top_k, min_occur):
+def compute_frequency(connections, top_k, min_occur, output='result/counts.json'):
     '''
     this function counts the connections, each institute's each occurrance counts for once
     params:
@@ -27,18 +52,58 @@ def compute_frequency(connections, top_k, min_occur):
                                     secondary key: faculty member's name, secondary value: list of cooperating institutions 
         top_k: int, count the first top_k connections of a faculty member
         min_occur: take only institution show up [i.e., colloborate with] more than min_occur times into account
+        output: str or None, path to save the counts, None for not saving
     return value:
         count: defaultdict of defaultdict, key: university name, value: defaultdict,
                                            secondary key: institute's name, secondary key: number of occurrance
     '''
+    counts = count_institutions(normalize_connections(connections), top_k, min_occur)
+    if output:
+        with open(output, 'w') as cnt:
+            json.dump(dict(counts), cnt)
+    return counts
+
+def normalize_connections(connections):
+    '''
+    this function replaces the coauthors' affiliations of every faculty member with the institutions matched in them,
+    see util.process_institutions
+    params:
+        connections: dict of dict, returned by find_connections, changed in place
+    return value:
+        connections itself, secondary value: list of institutions, empty for members without any connection
+    '''
+    translate_connections(connections)
+    for univ in connections:
+        for member in connections[univ]:
+            connections[univ][member] = util.process_institutions(connections[univ][member])
+    util.translator.save()
+    return connections
+
+def translate_connections(connections):
+    '''
+    this function translates the coauthors' affiliations of all members in batches, so that util.process_institutions
+    then finds them memoized
+    '''
+    util.translator.translate([raw for univ in connections for member in connections[univ] \
+                               for raw in connections[univ][member] or []])
+
+def count_institutions(connections, top_k, min_occur):
+    '''
+    this function counts the institutions each university's faculty members connect to
+    params:
+        connections: dict of dict, returned by normalize_connections
+        top_k: int, count the first top_k connections of a faculty member
+        min_occur: take only institution show up [i.e., colloborate with] more than min_occur times into account
+    return value:
+        defaultdict of dict, same as compute_frequency
+    '''
     counts = defaultdict(defaultdict)
     for univ in connections:
         count = defaultdict(int)
         for member in connections[univ]:
-            connections[univ][member] = util.process_institutions(connections[univ][member])
             # some faculty member might have no connection on google scholar
             if connections[univ][member]:
-                for institute in connections[univ][member]:
+                for institute in connections[univ][member][:top_k]:
                     count[institute] += 1
         # delete the institution that occurs too rarely
         del_key = []
@@ -49,8 +114,6 @@ def compute_frequency(connections, top_k, min_occur):
             del count[key]
         # sort institutions from occurring most frequently to most rarely
         counts[univ] = dict(sorted(count.items(), key=lambda x: x[1], reverse=True))
-    with open('../result/counts.json', 'w') as cnt:
-        json.dump(dict(counts), cnt)
     return counts
 
 def compute_member_w_connection(connections, stat):
@@ -93,7 +156,7 @@ def compute_connection_stats(counts, stat):
         stat[univ]['total_connections'] = 0
         stat[univ]['inner_connection_ratio'] = 0
         for ins in counts[univ]:    # ins: {institution_name: #connection}
-            if re.sub('[^a-zA-Z -]', '', ins).lower() == re.sub('[^a-zA-Z -]', '', univ).lower():
+            if util.institution_key(ins) == util.institution_key(univ):
                 stat[univ]['inner_connection_ratio'] += counts[univ][ins]
             stat[univ]['total_connections'] += counts[univ][ins]
         stat[univ]['inner_connection_ratio'] /= stat[univ]['total_connections']
@@ -119,21 +182,197 @@ def compute_stat():
         avg_coauthors_per_w_con: total_connections / #member_w_connection
         avg_connection_per_member: unique_connection / #member_w_connection
     '''
+    setup_institutions(args)
+    univs = util.alias_to_university(args.range) if args.range else None
+    con, cnt = load_inputs(univs)
+    if args.engine == 'columnar':
+        return compute_stat_columnar(con, cnt)
+    if args.engine == 'sparse':
+        return compute_stat_sparse(con, cnt)
+    if cnt is None:
+        cnt = compute_frequency(con, args.top_k, args.min_occur, output=None)
+        save_counts(cnt)
+    return stat_frame(con, cnt)
+
+def setup_institutions(options):
+    '''
+    this function sets the translator and the entity resolver used by util.process_institutions and
+    util.institution_key according to the options of feature.py
+    params:
+        options: argparse.Namespace, with translator, translation_cache, raw_institutions, resolve_threshold and
+        entity_cache
+    return value:
+        None
+    '''
+    util.translator = translate.CachedTranslator(translate.backends[options.translator](), options.translation_cache)
+    if not options.raw_institutions:
+        util.entity_resolver = resolve.EntityResolver(resolve.load_aliases(), options.resolve_threshold,
+                                                      cache_file=options.entity_cache)
+
+def stat_frame(con, cnt):
+    '''
+    this function computes the statistics of compute_stat from connections and counts
+    params:
+        con: dict of dict, connections
+        cnt: dict of dict, counts
+    return value:
+        DataFrame of the statistics, indexed by institution
+    '''
+    stat = defaultdict(defaultdict)
+    stat = compute_member_w_connection(con, stat)
+    stat = compute_connection_stats(cnt, stat)
+    import pandas as pd
+    return pd.DataFrame.from_dict(stat, orient='index')
+
+def load_inputs(univs=None):
+    '''
+    this function loads connections, and counts unless they are to be recomputed, from where --store points to
+    params:
+        univs: list of str or None, names of the universities to load, None for all
+    return value:
+        con: dict of dict, connections
+        cnt: dict of dict, counts, or None if --count is None
+    '''
+    cnt = None
+    if args.store == 'parquet':
+        import storage
+        con = storage.load_connections(args.parquet_dir, univs)
+        if args.count != 'None':
+            cnt = storage.load_counts(args.parquet_dir, univs)
+        return con, cnt
     try:
-        con = util.load_data('result/connections.json')
+        con = util.load_data(args.connection)
     except:
         print('no connection file find, please make sure it exists, if not, try to generate with collect.py')
     if args.count != 'None':
         cnt = util.load_data(args.count)
-    else:
-        cnt = compute_frequency(con, args.top_k, args.min_occur)
-    stat = defaultdict(defaultdict)
-    stat = compute_member_w_connection(con, stat)
-    stat = compute_connection_stats(cnt, stat)
-    return stat
+    if univs is not None:
+        con = {univ: con[univ] for univ in con if univ in univs}
+        cnt = {univ: cnt[univ] for univ in cnt if univ in univs} if cnt is not None else None
+    return con, cnt
+
+def save_counts(cnt):
+    '''
+    this function saves recomputed counts to where --store points to
+    params:
+        cnt: dict of dict, returned by compute_frequency, or DataFrame returned by columnar.compute_counts
+    return value:
+        None
+    '''
+    if args.store == 'parquet':
+        import storage
+        storage.save_counts(cnt, args.parquet_dir)
+        return
+    if not isinstance(cnt, dict):
+        import columnar
+        cnt = columnar.counts_to_dict(cnt)
+    write_counts(cnt, partial=args.range is not None)
+
+def write_counts(cnt, filename='result/counts.json', partial=False):
+    '''
+    this function writes counts to a json file
+    params:
+        cnt: dict of dict, counts
+        filename: str, path to the json file
+        partial: bool, whether cnt only has some universities (e.g. those of --range), the counts of the others are
+        then kept from the file
+    return value:
+        None
+    '''
+    if partial and os.path.exists(filename):
+        # universities already in the file keep their place, new ones come last
+        cnt = {**util.load_data(filename), **cnt}
+    with open(filename, 'w') as f:
+        json.dump(dict(cnt), f)
+
+def write_stat(stat, filename='result/stat.csv', partial=False):
+    '''
+    this function writes the statistics to a csv file
+    params:
+        stat: DataFrame, indexed by institution
+        filename: str, path to the csv file
+        partial: bool, whether stat only has some universities, the statistics of the others are then kept from the file
+    return value:
+        None
+    '''
+    if partial and os.path.exists(filename):
+        import pandas as pd
+        kept = pd.read_csv(filename, index_col=0)
+        order = list(dict.fromkeys(list(kept.index) + list(stat.index)))
+        stat = pd.concat([kept[~kept.index.isin(stat.index)], stat]).loc[order]
+    stat.to_csv(filename)
+
+def flatten_and_count(con, cnt=None):
+    '''
+    this function flattens connections into the tables of the columnar and sparse engines, and unless counts are given,
+    translates and processes the coauthors' affiliations, counts the institutions and saves the counts
+    params:
+        con: dict of dict, connections
+        cnt: dict of dict, counts, or None to recompute them
+    return value:
+        members: DataFrame, returned by columnar.flatten_connections
+        links: DataFrame of the processed institutions returned by columnar.flatten_connections, None if cnt is given
+        cnt: DataFrame, the counts in the shape returned by columnar.compute_counts
+    '''
+    import columnar
+    if cnt is not None:
+        members, _ = columnar.flatten_connections(con)
+        return members, None, columnar.counts_from_dict(cnt)
+    translate_connections(con)
+    members, links = columnar.flatten_connections(con, args.top_k, util.process_institutions)
+    util.translator.save()
+    cnt = columnar.compute_counts(links, args.min_occur)
+    save_counts(cnt)
+    return members, links, cnt
+
+def compute_stat_columnar(con, cnt=None):
+    '''
+    this function computes the same statistics as compute_stat, by flattening connections into a table once and
+    grouping it with pandas instead of walking the nested dicts
+    params:
+        con: dict of dict, connections
+        cnt: dict of dict, counts, or None to recompute them
+    return value:
+        DataFrame of the statistics, indexed by institution
+    '''
+    import columnar
+    members, _, cnt = flatten_and_count(con, cnt)
+    return columnar.compute_stat(members, cnt, util.institution_key)
+
+def compute_stat_sparse(con, cnt=None):
+    '''
+    this function computes the same statistics as compute_stat from sparse matrices of interned connections, and saves
+    the jaccard overlap between universities, the pagerank of institutions and each university's top partners under
+    --analytics_dir
+    params:
+        con: dict of dict, connections
+        cnt: dict of dict, counts, or None to recompute them
+    return value:
+        DataFrame of the statistics, indexed by institution
+    '''
+    import analytics
+    members, links, cnt = flatten_and_count(con, cnt)
+    collaboration = analytics.Collaboration(members, cnt, links, util.institution_key)
+    collaboration.jaccard().to_csv(os.path.join(args.analytics_dir, 'jaccard.csv'))
+    collaboration.centrality().rename('pagerank').rename_axis('institution').to_csv(
+        os.path.join(args.analytics_dir, 'centrality.csv'))
+    with open(os.path.join(args.analytics_dir, 'partners.json'), 'w') as f:
+        json.dump(collaboration.top_partners(args.top_n), f)
+    return collaboration.stat()
 
 if __name__=="__main__":
-    stat = compute_stat()
-    df_stat = pd.DataFrame.from_dict(stat, orient='index')
-    # save the statistics to a csv
-    df_stat.to_csv('result/stat.csv')
+    args = parser.parse_args()
+    metrics.enabled = args.profile or bool(args.metrics)
+    df_stat = compute_stat()
+    if util.entity_resolver is not None:
+        util.entity_resolver.save()
+    if args.store == 'parquet':
+        import storage
+        storage.save_stat(df_stat, args.parquet_dir)
+    else:
+        # save the statistics to a csv, with --range those of the other universities are kept
+        write_stat(df_stat, partial=args.range is not None)
+    if args.profile:
+        metrics.print_summary()
+    if args.metrics:
+        metrics.export(args.metrics)
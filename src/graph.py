@@ -0,0 +1,162 @@
+import csv, gzip, os, random, time
+from concurrent.futures import ThreadPoolExecutor
+from lxml import etree
+import pandas as pd
+import util, metrics
+
+# coauthors in the sidebar of a profile, google scholar shows 20 at most, the rest behind a "view all" button
+sidebar_xpath = '//*[@id="gsc_rsb_co"]/ul/li'
+# cards of the full coauthor list (view_op=list_colleagues)
+colleague_xpath = '//*[contains(concat(" ", @class, " "), " gsc_ucoar ")]'
+
+def parse_coauthors(page):
+    '''
+    this function parses the coauthor sidebar of a google scholar profile
+    params:
+        page: str, the profile page
+    return value:
+        a tuple (coauthors, more), coauthors is a list of tuple (profile id, name, affiliation), more tells whether
+        the profile has a "view all" button, i.e. the sidebar might not list everyone
+    '''
+    tree = etree.HTML(page)
+    if tree is None:
+        return [], False
+    coauthors = []
+    for item in tree.xpath(sidebar_xpath):
+        link = item.xpath('.//a[contains(@href, "user=")]')
+        affiliation = item.xpath('div/span[2]/span[1]/text()')
+        user = util.scholar_user.search(link[0].get('href')) if link else None
+        if user is not None:
+            coauthors.append((user.group(1), ''.join(link[0].itertext()).strip(),
+                              affiliation[0].strip() if affiliation else ''))
+    return coauthors, bool(tree.xpath('//*[@id="gsc_coauth_opn"]'))
+
+def parse_colleagues(page):
+    '''
+    this function parses the full coauthor list of a google scholar profile, same output as parse_coauthors
+    '''
+    tree = etree.HTML(page)
+    if tree is None:
+        return []
+    coauthors = []
+    for card in tree.xpath(colleague_xpath):
+        link = card.xpath('.//h3//a[contains(@href, "user=")]')
+        affiliation = card.xpath('.//*[contains(@class, "gs_ai_aff")]//text()')
+        user = util.scholar_user.search(link[0].get('href')) if link else None
+        if user is not None:
+            coauthors.append((user.group(1), ''.join(link[0].itertext()).strip(), ''.join(affiliation).strip()))
+    return coauthors
+
+def fetch_coauthors(user, host='https://scholar.google.com'):
+    '''
+    this function fetches the profile of user and returns all of its coauthors, following "view all" when the sidebar
+    is not the complete list
+    params:
+        user: str, google scholar profile id
+        host: str, where the profiles are, the part of a profile url before "/citations"
+    return value:
+        list of tuple (profile id, name, affiliation), None if the profile cannot be fetched
+    '''
+    header = random.choice(util.headers)
+    try:
+        with metrics.span('fetch_coauthors'):
+            page = util.fetch_page('{}/citations?user={}'.format(host, user), header, proxies=util.proxies)
+        with metrics.span('parse_coauthors'):
+            coauthors, more = parse_coauthors(page)
+        if more:
+            with metrics.span('fetch_coauthors'):
+                page = util.fetch_page('{}/citations?view_op=list_colleagues&user={}'.format(host, user), header,
+                                       proxies=util.proxies)
+            with metrics.span('parse_coauthors'):
+                # keep the sidebar if the full list turns out to be empty, e.g. its layout has changed
+                coauthors = parse_colleagues(page) or coauthors
+    except:
+        print('Error occurred when browsing the coauthors of google scholar profile {}'.format(user))
+        return None
+    return coauthors
+
+def find_roots(univ_faculty_collection, concurrency=1):
+    '''
+    this function finds the google scholar profiles of faculty members, the starting points of crawl_graph
+    params:
+        univ_faculty_collection: defaultdict, returned by collect.univ_collection
+        concurrency: int, how many members are searched at the same time
+    return value:
+        list of tuple (profile id, name, affiliation, host), members without a profile are left out
+    '''
+    tasks = [(member, univ) for univ in univ_faculty_collection for member in univ_faculty_collection[univ]]
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        urls = list(executor.map(lambda task: util.search_member(*task), tasks))
+    roots = []
+    for (member, univ), url in zip(tasks, urls):
+        user = util.scholar_user.search(url) if url else None
+        if user is not None:
+            roots.append((user.group(1), member, univ, url[:url.index('/citations')]))
+    print('-----found {} profiles of {} faculty members-----'.format(len(roots), len(tasks)))
+    return roots
+
+def crawl_graph(roots, depth=1, concurrency=1, output='result/graph'):
+    '''
+    this function crawls the coauthor graph breadth first from roots. every profile met is written to nodes.tsv.gz once,
+    with its distance to the roots, and every coauthor listed by a fetched profile to edges.tsv.gz, as an edge from the
+    profile to the coauthor. profiles are kept in a visited set, so none of them is fetched twice
+    params:
+        roots: list of tuple (profile id, name, affiliation, host), returned by find_roots
+        depth: int, hops to crawl, 1 only fetches the roots, 2 also their coauthors, and so on
+        concurrency: int, how many profiles are fetched at the same time
+        output: str, directory of nodes.tsv.gz and edges.tsv.gz, both are overwritten
+    return value:
+        a dict with the numbers of "nodes", "edges", "fetched" profiles and "failed" ones
+    '''
+    os.makedirs(output, exist_ok=True)
+    nodes_file = gzip.open(os.path.join(output, 'nodes.tsv.gz'), 'wt', encoding='utf-8', newline='')
+    edges_file = gzip.open(os.path.join(output, 'edges.tsv.gz'), 'wt', encoding='utf-8', newline='')
+    nodes, edges = csv.writer(nodes_file, delimiter='\t'), csv.writer(edges_file, delimiter='\t')
+    nodes.writerow(['id', 'name', 'affiliation', 'depth'])
+    edges.writerow(['source', 'target'])
+    # profile id -> distance to the roots, every profile in it is either fetched or waiting in the frontier
+    visited = {}
+    frontier = []
+    for user, name, affiliation, host in roots:
+        if user not in visited:
+            visited[user] = 0
+            nodes.writerow([user, name, affiliation, 0])
+            frontier.append((user, host))
+    stat = dict(nodes=len(visited), edges=0, fetched=0, failed=0)
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+        for level in range(depth):
+            s_time = time.time()
+            next_frontier = []
+            for (user, host), coauthors in zip(frontier, executor.map(lambda task: fetch_coauthors(*task), frontier)):
+                if coauthors is None:
+                    stat['failed'] += 1
+                    continue
+                stat['fetched'] += 1
+                for coauthor, name, affiliation in coauthors:
+                    edges.writerow([user, coauthor])
+                    stat['edges'] += 1
+                    if coauthor not in visited:
+                        visited[coauthor] = level+1
+                        nodes.writerow([coauthor, name, affiliation, level+1])
+                        next_frontier.append((coauthor, host))
+            stat['nodes'] = len(visited)
+            print('-----finish hop {} with {} profiles after {:.3} sec, {} nodes and {} edges so far-----'.format(
+                level+1, len(frontier), time.time()-s_time, stat['nodes'], stat['edges']))
+            frontier = next_frontier
+    nodes_file.close()
+    edges_file.close()
+    return stat
+
+def load_graph(output='result/graph'):
+    '''
+    this function loads the graph written by crawl_graph
+    params:
+        output: str, directory of nodes.tsv.gz and edges.tsv.gz
+    return value:
+        nodes: DataFrame, columns "id", "name", "affiliation", "depth"
+        edges: DataFrame, columns "source", "target"
+    '''
+    nodes = pd.read_csv(os.path.join(output, 'nodes.tsv.gz'), sep='\t', dtype={'id': str, 'name': str,
+                        'affiliation': str}, keep_default_na=False)
+    edges = pd.read_csv(os.path.join(output, 'edges.tsv.gz'), sep='\t', dtype=str, keep_default_na=False)
+    return nodes, edges
@@ -0,0 +1,85 @@
+import re
+
+class AffiliationMatcher:
+    '''
+    finds the institution in a coauthor's affiliation with patterns built once for all keywords.
+    keywords are tried in the order of the config (every "composite" one before every "single" one, and so on),
+    an entity containing several of them is attributed to the first one in that order. one scan of an entity
+    returns the keywords in it, and the result of each entity is remembered, as for each affiliation
+    '''
+    def __init__(self, parties, delimiters=',/;', memo_size=1<<18):
+        '''
+        params:
+            parties: dict, key: kind of keyword, value: list of keywords, for the kind "single" the keyword itself is
+            the institution's name, for the others the whole entity containing it is
+            delimiters: str, characters separating entities in an affiliation
+            memo_size: int, number of affiliations whose result is remembered, coauthors' affiliations repeat a lot
+        '''
+        self.keywords = []
+        for kind in parties:
+            for party in parties[kind]:
+                if party not in (keyword for keyword, _ in self.keywords):
+                    self.keywords.append((party, kind))
+        self.priority = {party: idx for idx, (party, _) in enumerate(self.keywords)}
+        self.kinds = dict(self.keywords)
+        self.delimiters = re.compile('[{}]'.format(re.escape(delimiters)))
+        # alternatives in config order, so of the keywords starting at the same place, the one returned comes first
+        self.any_keyword = re.compile('|'.join(re.escape(party) for party, _ in self.keywords))
+        # keywords overlapping one returned by the scan (e.g. "eth" in "institute") are skipped by it, these are the
+        # ones coming first in config order, looked for in the entity when the other one is returned
+        self.overlaps = {party: [other for other, _ in self.keywords if self.priority[other] < self.priority[party] and
+                                 any(other.startswith(party[offset:]) or party[offset:].startswith(other)
+                                     for offset in range(len(party)))]
+                         for party, _ in self.keywords}
+        self.punctuation = re.compile(r"[^a-zA-z0-9 -']")
+        self.memo = {}
+        # entities repeat even more than affiliations (e.g. "professor", "nanjing university")
+        self.entities = {}
+        self.memo_size = memo_size
+
+    def match(self, affiliation):
+        '''
+        this function extracts the institution from one affiliation
+        params:
+            affiliation: str, raw information about a coauthor, already in english
+        return value:
+            str, the name of the institution, or None if no keyword is found
+        '''
+        if affiliation in self.memo:
+            return self.memo[affiliation]
+        ret = self._match(affiliation.lower())
+        if len(self.memo) >= self.memo_size:
+            self.memo.clear()
+        self.memo[affiliation] = ret
+        return ret
+
+    def _match(self, affiliation):
+        # university often comes after a specific institute or college, but the former is more useful
+        for entity in reversed(self.delimiters.split(affiliation)):
+            if entity in self.entities:
+                ret = self.entities[entity]
+            else:
+                ret = self._match_entity(entity)
+                if len(self.entities) >= self.memo_size:
+                    self.entities.clear()
+                self.entities[entity] = ret
+            if ret is not None:
+                return ret
+        return None
+
+    def _match_entity(self, entity):
+        keywords = self.any_keyword.findall(entity)
+        if not keywords:
+            return None
+        party = min(keywords, key=self.priority.__getitem__)
+        for keyword in keywords:
+            for other in self.overlaps[keyword]:
+                if self.priority[other] < self.priority[party] and other in entity:
+                    party = other
+        if self.kinds[party] == 'single':
+            return party
+        entity = entity.strip()  # remove leading and trailing spaces
+        # replace "&" with "and"
+        entity = entity.replace(' & ', ' and ').replace('at ', '')
+        # replace other punctuations, preserving only alphabet, digit, and white space
+        return self.punctuation.sub('', entity)
@@ -0,0 +1,127 @@
+import json, threading, time, functools
+from collections import defaultdict
+from contextlib import contextmanager
+
+# time spent in each stage of the pipeline and counters of requests, retries, cache hits, bytes, etc.
+# recording is cheap but not free, so it is off unless --profile or --metrics is given
+enabled = False
+lock = threading.Lock()
+stages = defaultdict(lambda: dict(count=0, total=0., max=0.))
+counters = defaultdict(float)
+
+def reset():
+    with lock:
+        stages.clear()
+        counters.clear()
+
+def observe(stage, seconds):
+    '''
+    this function records that one run of stage took seconds
+    '''
+    if not enabled:
+        return
+    with lock:
+        stat = stages[stage]
+        stat['count'] += 1
+        stat['total'] += seconds
+        stat['max'] = max(stat['max'], seconds)
+
+def incr(name, value=1):
+    '''
+    this function adds value to the counter name
+    '''
+    if not enabled:
+        return
+    with lock:
+        counters[name] += value
+
+@contextmanager
+def span(stage):
+    '''
+    this function times the code in a with block as one run of stage
+    '''
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter()-start)
+
+def timed(stage):
+    '''
+    this function returns a decorator timing every call of the decorated function as one run of stage
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def snapshot():
+    '''
+    this function returns a copy of what has been recorded
+    params:
+        None
+    return value:
+        dict, "stages": stage -> dict of count, total, max and mean seconds, "counters": name -> value
+    '''
+    with lock:
+        return dict(stages={stage: dict(stat, mean=stat['total']/stat['count']) for stage, stat in stages.items()},
+                    counters=dict(counters))
+
+def write_prometheus(filename, prefix='scholar_spider'):
+    '''
+    this function writes what has been recorded in the prometheus text format, e.g. for node_exporter's textfile
+    collector
+    '''
+    data = snapshot()
+    lines = ['# TYPE {}_stage_seconds summary'.format(prefix)]
+    for stage, stat in sorted(data['stages'].items()):
+        lines.append('{}_stage_seconds_sum{{stage="{}"}} {}'.format(prefix, stage, stat['total']))
+        lines.append('{}_stage_seconds_count{{stage="{}"}} {}'.format(prefix, stage, stat['count']))
+    lines.append('# TYPE {}_stage_seconds_max gauge'.format(prefix))
+    for stage, stat in sorted(data['stages'].items()):
+        lines.append('{}_stage_seconds_max{{stage="{}"}} {}'.format(prefix, stage, stat['max']))
+    for name, value in sorted(data['counters'].items()):
+        lines.append('# TYPE {}_{}_total counter'.format(prefix, name))
+        lines.append('{}_{}_total {}'.format(prefix, name, value))
+    with open(filename, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+def write_jsonl(filename):
+    '''
+    this function appends what has been recorded to a json lines file, one line per stage and per counter,
+    each stamped with the current time
+    '''
+    data, now = snapshot(), time.time()
+    with open(filename, 'a') as f:
+        for stage, stat in sorted(data['stages'].items()):
+            f.write(json.dumps(dict(time=now, stage=stage, **stat)) + '\n')
+        for name, value in sorted(data['counters'].items()):
+            f.write(json.dumps(dict(time=now, counter=name, value=value)) + '\n')
+
+def export(filename):
+    '''
+    this function writes what has been recorded to filename, in the prometheus text format if it ends with .prom,
+    as json lines otherwise
+    '''
+    if filename.endswith('.prom'):
+        write_prometheus(filename)
+    else:
+        write_jsonl(filename)
+
+def print_summary():
+    '''
+    this function prints time spent in each stage, from the most to the least, followed by the counters
+    '''
+    data = snapshot()
+    print('{:<20} {:>8} {:>10} {:>10} {:>10}'.format('stage', 'count', 'total(s)', 'mean(ms)', 'max(ms)'))
+    for stage, stat in sorted(data['stages'].items(), key=lambda x: x[1]['total'], reverse=True):
+        print('{:<20} {:>8} {:>10.3f} {:>10.2f} {:>10.2f}'.format(stage, stat['count'], stat['total'], stat['mean']*1e3,
+                                                                 stat['max']*1e3))
+    for name, value in sorted(data['counters'].items()):
+        print('{:<20} {:>8g}'.format(name, value))
@@ -0,0 +1,144 @@
+import json, random, threading, time
+
+# signs of google's block page ("sorry" page), besides the status codes, specific enough not to appear in the results
+# of a search, e.g. about a professor working on captchas
+block_signs = ['/sorry/index', 'id="captcha-form"', 'our systems have detected unusual traffic']
+
+def is_block_page(status, page):
+    '''
+    this function tells whether google answered with a block page (rate limited, or asking for a captcha)
+    instead of search results
+    params:
+        status: int or None, http status code, None if the page came from the cache
+        page: str, the page
+    return value:
+        bool
+    '''
+    if status in (429, 503):
+        return True
+    page = page[:20000].lower()
+    return any(sign in page for sign in block_signs)
+
+class MirrorScheduler:
+    '''
+    chooses among the google mirrors in config/search.json by their recent health. each mirror keeps moving averages
+    of its latency and error rate, a mirror answering with a block page (or failing several times in a row) cools down
+    for a while, doubling each time it happens again, and the remaining ones are chosen with probability proportional
+    to (1 - error rate) / latency. when every mirror is cooling down, searching waits for the first one to be ready
+    '''
+    def __init__(self, sites, base_cooldown=60, max_cooldown=3600, alpha=.2, max_failures=3):
+        self.sites = sites
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.alpha = alpha
+        self.max_failures = max_failures
+        self.stats = {site['region']: dict(latency=1., error_rate=0., requests=0, errors=0, blocks=0, failures=0,
+                                           strikes=0, cooldown_until=0.) for site in sites}
+        self.lock = threading.Lock()
+
+    def pick(self):
+        '''
+        this function chooses a mirror to search with, waiting until one has cooled down if none is available
+        params:
+            None
+        return value:
+            dict, an entry of config/search.json, with "region" and "url"
+        '''
+        while True:
+            now = time.time()
+            with self.lock:
+                available = [site for site in self.sites if self.stats[site['region']]['cooldown_until'] <= now]
+                if available:
+                    weights = [self.score(site['region']) for site in available]
+                    break
+                ready = min(self.stats[site['region']]['cooldown_until'] for site in self.sites)
+            # google usually blocks the ip on every mirror at once, a search sent now would only be blocked again
+            print('every google mirror is cooling down, wait {:.0f} sec'.format(ready-now))
+            time.sleep(ready-now)
+        return random.choices(available, weights=weights)[0]
+
+    def score(self, region):
+        stat = self.stats[region]
+        return max(1.-stat['error_rate'], .01) / max(stat['latency'], .05)
+
+    def report(self, site, latency, ok=True, blocked=False):
+        '''
+        this function records the outcome of a search with a mirror
+        params:
+            site: dict, returned by pick
+            latency: float or None, seconds the request took, None if it failed without an answer (e.g. timed out),
+            then only the error rate is updated
+            ok: bool, whether the mirror answered with search results
+            blocked: bool, whether the mirror answered with a block page
+        return value:
+            None
+        '''
+        with self.lock:
+            stat = self.stats[site['region']]
+            stat['requests'] += 1
+            if latency is not None:
+                stat['latency'] += self.alpha * (latency-stat['latency'])
+            stat['error_rate'] += self.alpha * ((0. if ok else 1.)-stat['error_rate'])
+            if ok:
+                stat['failures'] = stat['strikes'] = 0
+                return
+            stat['errors'] += 1
+            stat['blocks'] += int(blocked)
+            stat['failures'] += 1
+            if blocked or stat['failures'] >= self.max_failures:
+                stat['failures'] = 0
+                if stat['cooldown_until'] > time.time():
+                    # sent (by another thread) before the mirror began to cool down, that block is already waited out
+                    return
+                stat['strikes'] += 1
+                cooldown = min(self.base_cooldown * 2**(stat['strikes']-1), self.max_cooldown)
+                stat['cooldown_until'] = time.time() + cooldown
+                print('cool down region {} for {} sec'.format(site['region'], cooldown))
+
+    def metrics(self):
+        '''
+        this function returns a snapshot of every mirror's statistics
+        params:
+            None
+        return value:
+            dict, key: region, value: dict of latency, error_rate, requests, errors, blocks, cooling (seconds left
+            to cool down) and score
+        '''
+        now = time.time()
+        with self.lock:
+            return {region: dict(latency=stat['latency'], error_rate=stat['error_rate'], requests=stat['requests'],
+                                 errors=stat['errors'], blocks=stat['blocks'],
+                                 cooling=max(stat['cooldown_until']-now, 0.), score=self.score(region))
+                    for region, stat in self.stats.items()}
+
+    def save_metrics(self, filename):
+        save_metrics(self.metrics(), filename)
+
+def merge_metrics(snapshots):
+    '''
+    this function combines the statistics of the same mirrors seen by several processes (e.g. the workers of
+    collect.py --workers), counts are summed, latency and error rate averaged over the requests
+    params:
+        snapshots: list of dict, returned by MirrorScheduler.metrics
+    return value:
+        dict, same as MirrorScheduler.metrics
+    '''
+    merged = {}
+    for snapshot in snapshots:
+        for region, stat in snapshot.items():
+            merged.setdefault(region, []).append(stat)
+    ret = {}
+    for region, stats in merged.items():
+        requests = sum(stat['requests'] for stat in stats)
+        weights = [stat['requests'] / requests if requests else 1. / len(stats) for stat in stats]
+        latency = sum(weight * stat['latency'] for weight, stat in zip(weights, stats))
+        error_rate = sum(weight * stat['error_rate'] for weight, stat in zip(weights, stats))
+        ret[region] = dict(latency=latency, error_rate=error_rate, requests=requests,
+                           errors=sum(stat['errors'] for stat in stats), blocks=sum(stat['blocks'] for stat in stats),
+                           cooling=max(stat['cooling'] for stat in stats),
+                           score=max(1.-error_rate, .01) / max(latency, .05))
+    return ret
+
+def save_metrics(metrics, filename):
+    with open(filename, 'w') as f:
+        json.dump(metrics, f, indent=4)
@@ -0,0 +1,62 @@
+import multiprocessing, threading
+from concurrent.futures import ProcessPoolExecutor, Future
+
+def run_xpath(page, xpath, limit=None):
+    '''
+    this function parses a page and evaluates xpath on it
+    params:
+        page: str or bytes, the html page
+        xpath: str, an xpath selecting text, e.g. the "xpath" of config/institutions.json
+        limit: int or None, keep only the first limit strings, None for all of them
+    return value:
+        list of str, plain strings so they can be sent back from another process
+    '''
+    from lxml import etree
+    tree = etree.HTML(page)
+    if tree is None:
+        return []
+    return [str(node) for node in tree.xpath(xpath)[:limit]]
+
+class ParsePool:
+    '''
+    parses pages in worker processes, so parsing runs in parallel with (and does not hold the GIL from) the threads
+    fetching pages. at most max_pending pages are waiting for or being parsed, a fetcher submitting more blocks until
+    one is done, which keeps the pages held in memory bounded when parsing falls behind
+    '''
+    def __init__(self, workers=None, max_pending=64):
+        # spawned workers only import this module, forking a process full of threads and sockets is not safe
+        self.executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+        self.slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, page, xpath, limit=None):
+        '''
+        this function queues a page to be parsed, waiting first if max_pending pages are queued already
+        params:
+            page: str or bytes, the html page
+            xpath: str, the xpath to evaluate
+            limit: int or None, passed to run_xpath
+        return value:
+            concurrent.futures.Future, whose result is the list returned by run_xpath
+        '''
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(run_xpath, page, xpath, limit)
+        except:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+def parse_inline(page, xpath, limit=None):
+    '''
+    this function parses a page in the calling thread, returning a finished future like ParsePool.submit
+    '''
+    future = Future()
+    try:
+        future.set_result(run_xpath(page, xpath, limit))
+    except Exception as e:
+        future.set_exception(e)
+    return future
@@ -0,0 +1,253 @@
+import argparse, hashlib, json, os, pickle, re, time
+import util, metrics, translate, collect, feature, vis
+
+stages = ['connections', 'normalize', 'count', 'stats', 'plot']
+
+# only the options of fetching are taken from collect.py, those of its other modes (--workers, --incremental, --graph,
+# --compact, --store, ...) are not supported here, and argparse rejects them
+parser = argparse.ArgumentParser(description='run crawl (or load) -> normalize -> count -> stats -> plot in one process, \
+                                 handing the data of each stage to the next in memory', parents=[collect.fetch_parser])
+parser.add_argument('--crawl', action='store_true', help='crawl the connections with the fetching options of \
+                    collect.py, instead of loading them from --connection')
+parser.add_argument('--top_k', type=int, default=10, help='count how many coauthors of a faculty member')
+parser.add_argument('--min_occur', type=int, default=1, help='count only institutions showing up at least this many \
+                    times for a university')
+parser.add_argument('--translator', type=str, default='google', choices=sorted(translate.backends), help='backend \
+                    translating chinese affiliations, "none" keeps them as they are')
+parser.add_argument('--translation_cache', type=str, default='result/translation.json', help='json file remembering \
+                    every affiliation translated')
+parser.add_argument('--raw_institutions', action='store_true', help='keep institutions as matched, instead of resolving \
+                    them to canonical names')
+parser.add_argument('--resolve_threshold', type=float, default=.8, help='similarity from which two names having the same \
+                    words are taken as the same institution')
+parser.add_argument('--entity_cache', type=str, default='result/entities.json', help='json file remembering the \
+                    canonical name each institution is resolved to')
+parser.add_argument('--plot_type', type=int, default=2, choices=[2, 3], help='2 for 2d plots, 3 for 3d ones')
+parser.add_argument('--fields', type=str, default='inner_connection_ratio avg_connection_per_member', help='fields \
+                    plotted, "x y" for 2d plots and "x y z" for 3d ones')
+parser.add_argument('--area', type=str, default='#member_w_connection', help='field giving the size of each dot')
+parser.add_argument('--render', type=str, default='auto', choices=['auto', 'scatter', 'hexbin'], help='draw a dot for \
+                    each institution, or aggregate them, see vis.py')
+parser.add_argument('--max_points', type=int, default=10000, help='institutions drawn as dots at most with --render \
+                    auto')
+parser.add_argument('--labels', type=int, default=100, help='institutions labeled at most in 2d plots')
+parser.add_argument('--gridsize', type=int, default=50, help='hexagons across the x-axis when aggregating')
+parser.add_argument('--until', type=str, default='plot', choices=stages,
+                    help='the last stage to run')
+parser.add_argument('--state', type=str, default='result/pipeline', help='directory keeping the output of each stage \
+                    with the fingerprint of its inputs and options, a stage whose fingerprint did not change is \
+                    skipped, "None" for running every stage')
+parser.add_argument('--force', action='store_true', help='run every stage even if its fingerprint did not change')
+parser.add_argument('--save', action='store_true', help='also write the connections crawled to --connection, the \
+                    counts to result/counts.json and the statistics to result/stat.csv, as the separate scripts do')
+
+def fingerprint(*parts):
+    '''
+    this function hashes json-serializable parts, e.g. options and the fingerprints of the inputs of a stage
+    '''
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def file_fingerprint(filename):
+    '''
+    this function hashes the bytes of a file, without parsing it, None if it does not exist
+    '''
+    if not os.path.exists(filename):
+        return None
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class StageState:
+    '''
+    the outputs of the stages of the last run, pickled in a directory, with a manifest of the fingerprint each of them
+    was computed from
+    '''
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_file = os.path.join(directory, 'manifest.json')
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = util.load_data(self.manifest_file) if os.path.exists(self.manifest_file) else {}
+
+    def path(self, stage):
+        return os.path.join(self.directory, stage + '.pickle')
+
+    def fresh(self, stage, key):
+        return self.manifest.get(stage) == key and os.path.exists(self.path(stage))
+
+    def load(self, stage):
+        with open(self.path(stage), 'rb') as f:
+            return pickle.load(f)
+
+    def store(self, stage, key, value):
+        with open(self.path(stage), 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.manifest[stage] = key
+        with open(self.manifest_file, 'w') as f:
+            json.dump(self.manifest, f)
+
+class Pipeline:
+    '''
+    stages computing their output from the outputs of other stages, each run at most once and only when its output is
+    asked for. the fingerprint of a stage combines its options with the fingerprints of its inputs, so with a state,
+    a stage whose fingerprint is the same as in the last run is skipped and its output is loaded instead, only if a
+    later stage needs it. a stage with a source function (e.g. a crawl) always runs and is fingerprinted by its output
+    '''
+    def __init__(self, state=None, force=False):
+        self.state = state
+        self.force = force
+        self.stages = {}
+        self.outputs = {}
+        self.keys = {}
+
+    def add(self, name, func, inputs=(), options=None, keep=True, check=None):
+        '''
+        this function adds a stage
+        params:
+            name: str, name of the stage
+            func: function, called with the outputs of inputs, returns the output of the stage
+            inputs: list of str, names of the stages whose outputs func takes
+            options: json-serializable, everything else the output depends on, None marks a source stage
+            keep: bool, whether the output is kept in the state
+            check: function or None, tells whether an output loaded from the state is still valid, e.g. whether the
+            file it names exists
+        return value:
+            None
+        '''
+        self.stages[name] = (func, list(inputs), options, keep, check)
+
+    def key(self, name):
+        '''
+        this function returns the fingerprint of a stage, running it first if it is a source stage
+        '''
+        if name not in self.keys:
+            func, inputs, options, keep, check = self.stages[name]
+            if options is None:
+                self.keys[name] = fingerprint(name, self.get(name))
+            else:
+                self.keys[name] = fingerprint(name, options, [self.key(stage) for stage in inputs])
+        return self.keys[name]
+
+    def get(self, name):
+        '''
+        this function returns the output of a stage, loaded from the state if its fingerprint did not change, computed
+        otherwise
+        '''
+        if name in self.outputs:
+            return self.outputs[name]
+        func, inputs, options, keep, check = self.stages[name]
+        key = self.key(name) if options is not None else None
+        if key is not None and keep and self.state is not None and not self.force and self.state.fresh(name, key):
+            output = self.state.load(name)
+            if check is None or check(output):
+                print('-----{} is up to date, skipped-----'.format(name))
+                self.outputs[name] = output
+                return output
+        values = [self.get(stage) for stage in inputs]
+        s_time = time.time()
+        with metrics.span('stage_' + name):
+            self.outputs[name] = func(*values)
+        print('-----finish {} after {:.3} sec-----'.format(name, time.time()-s_time))
+        if key is not None and keep and self.state is not None:
+            self.state.store(name, key, self.outputs[name])
+        return self.outputs[name]
+
+def load_connections(options):
+    '''
+    this function loads the connections of the universities in --range from --connection
+    '''
+    con = util.load_data(options.connection)
+    if options.range:
+        univs = util.alias_to_university(options.range)
+        con = {univ: con[univ] for univ in con if univ in univs}
+    return con
+
+def crawl_connections(options):
+    '''
+    this function crawls the connections as collect.py does, without writing them unless --save is given
+    '''
+    collect.setup_fetching(options)
+    univ_faculty_collection = collect.univ_collection(options.range)
+    con = collect.find_connections(univ_faculty_collection, options.concurrency,
+                                   output=options.connection if options.save else None, log=options.log,
+                                   resume=options.resume)
+    collect.finish_fetching(options)
+    return con
+
+def normalize(con):
+    # the connections are copied, so the output of the connections stage is left as it is
+    return feature.normalize_connections({univ: {member: list(con[univ][member] or []) for member in con[univ]}
+                                          for univ in con})
+
+def save(pipeline, options):
+    '''
+    this function writes the counts and the statistics where feature.py does, the stages not run are loaded from the
+    state
+    '''
+    # with --range, the results of the other universities are kept
+    if stages.index(options.until) >= stages.index('count'):
+        feature.write_counts(pipeline.get('count'), partial=bool(options.range))
+    if stages.index(options.until) >= stages.index('stats'):
+        feature.write_stat(pipeline.get('stats'), partial=bool(options.range))
+
+def plot(stat, options):
+    '''
+    this function plots the statistics as vis.py does, and returns the path of the figure
+    '''
+    fields = re.split('[ ]+', options.fields)
+    # vis.py plots the statistics read from stat.csv, whose first column is the institution
+    stat = stat.rename_axis('institution').reset_index()
+    if options.plot_type == 3:
+        vis.plot_field_3d(stat, fields, options.area, 'result/demo-3d.png', options.render, options.max_points,
+                          options.gridsize)
+        return 'result/demo-3d.png'
+    vis.plot_field_2d(stat, fields, options.area, 'result/demo-2d.png', options.render, options.max_points,
+                      options.labels, options.gridsize)
+    return 'result/demo-2d.png'
+
+def build(options):
+    '''
+    this function lays out the stages according to the options of pipeline.py
+    params:
+        options: argparse.Namespace, parsed by parser
+    return value:
+        a Pipeline
+    '''
+    state = StageState(options.state) if options.state != 'None' else None
+    pipeline = Pipeline(state, options.force)
+    if options.crawl:
+        pipeline.add('connections', lambda: crawl_connections(options), keep=False)
+    else:
+        pipeline.add('connections', lambda: load_connections(options),
+                     options=[file_fingerprint(options.connection), options.range], keep=False)
+    # institutions are matched with config/parties.json, and resolved with the aliases of config/institutions.json
+    institutions = [options.translator, options.raw_institutions, options.resolve_threshold,
+                    file_fingerprint('config/parties.json'), file_fingerprint('config/institutions.json')]
+    pipeline.add('normalize', normalize, ['connections'], options=institutions)
+    pipeline.add('count', lambda normalized: feature.count_institutions(normalized, options.top_k, options.min_occur),
+                 ['normalize'], options=[options.top_k, options.min_occur])
+    pipeline.add('stats', feature.stat_frame, ['normalize', 'count'], options=institutions)
+    pipeline.add('plot', lambda stat: plot(stat, options), ['stats'],
+                 options=[options.plot_type, options.fields, options.area, options.render, options.max_points,
+                          options.labels, options.gridsize], check=os.path.exists)
+    return pipeline
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    if len(re.split('[ ]+', args.fields)) < args.plot_type:
+        parser.error('--fields should name {} fields for --plot_type {}'.format(args.plot_type, args.plot_type))
+    metrics.enabled = args.profile or bool(args.metrics)
+    feature.setup_institutions(args)
+    pipeline = build(args)
+    output = pipeline.get(args.until)
+    if isinstance(output, str):
+        print(output)
+    if args.save:
+        save(pipeline, args)
+    if util.entity_resolver is not None:
+        util.entity_resolver.save()
+    if args.profile:
+        metrics.print_summary()
+    if args.metrics:
+        metrics.export(args.metrics)
@@ -0,0 +1,73 @@
+import json, threading, time
+from urllib.parse import urlsplit
+
+class TokenBucket:
+    '''
+    a token bucket refilled at `rate` tokens per second and holding at most `burst` tokens, each request takes one
+    token and waits for the refill if the bucket is empty
+    '''
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        '''
+        this function takes a token from the bucket, blocking until it is available
+        params:
+            None
+        return value:
+            float, the time (in sec) this call waited for
+        '''
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now-self.stamp) * self.rate)
+            self.stamp = now
+            # take the token in advance, so callers arriving later queue up behind this one
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+class HostRateLimiter:
+    '''
+    keeps one token bucket for each host, hosts not listed in the config share the default rate (but not the bucket)
+    '''
+    def __init__(self, config):
+        self.default = config['default']
+        self.hosts = config.get('hosts', {})
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, host):
+        with self.lock:
+            if host not in self.buckets:
+                limit = self.hosts.get(host, self.default)
+                self.buckets[host] = TokenBucket(limit['rate'], limit.get('burst', 1))
+            return self.buckets[host]
+
+    def acquire(self, url):
+        '''
+        this function blocks until a request to the host of url is allowed
+        params:
+            url: str, the url about to be requested
+        return value:
+            float, the time (in sec) this call waited for
+        '''
+        return self.bucket(urlsplit(url).netloc.lower()).acquire()
+
+def load_rate_limits(filename='config/rate-limit.json'):
+    '''
+    this function reads per-host rate limits and builds a limiter with them
+    params:
+        filename: str, path to the config file, with a "default" limit and a "hosts" dict, each limit is a dict
+        with "rate" (requests per sec) and "burst"
+    return value:
+        a HostRateLimiter
+    '''
+    with open(filename, 'r') as f:
+        config = json.load(f)
+    return HostRateLimiter(config)
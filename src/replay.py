@@ -0,0 +1,186 @@
+import argparse, json, random, sqlite3, threading, time, zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+from cache import normalize_url
+
+parser = argparse.ArgumentParser(description='serve the responses recorded by collect.py --record, so the crawler can \
+                                 run without google, google scholar or the universities\' sites')
+parser.add_argument('--archive', type=str, default='result/fixtures.sqlite', help='the fixture archive recorded by \
+                    collect.py --record')
+parser.add_argument('--port', type=int, default=8000, help='port to listen on, crawl against it by setting \
+                    SCHOLAR_SPIDER_REPLAY=http://127.0.0.1:PORT')
+parser.add_argument('--latency', type=float, default=0., help='seconds to wait before each response')
+parser.add_argument('--jitter', type=float, default=0., help='at most this many seconds are added to --latency, \
+                    uniformly at random')
+parser.add_argument('--error_rate', type=float, default=0., help='share of requests answered with 503')
+parser.add_argument('--drop_rate', type=float, default=0., help='share of requests whose connection is closed without \
+                    any answer')
+parser.add_argument('--seed', type=int, default=202, help='seed of the latency and errors, for repeatable runs')
+
+# headers recorded with a page and sent back when it is replayed
+kept_headers = ['Content-Type', 'ETag', 'Last-Modified']
+
+def fixture_key(url):
+    '''
+    this function returns the key of a page in the archive, its normalized url without the scheme, since a rewritten
+    url loses it
+    '''
+    return normalize_url(url).split('://', 1)[1]
+
+def rewrite(url, base):
+    '''
+    this function points a url to the replay server at base, e.g. https://scholar.google.com/citations?user=x ->
+    http://127.0.0.1:8000/scholar.google.com/citations?user=x
+    params:
+        url: str, the url to fetch
+        base: str, url of the replay server
+    return value:
+        str, the url to fetch instead
+    '''
+    parts = urlsplit(url)
+    return '{}/{}{}{}'.format(base.rstrip('/'), parts.netloc, parts.path or '/', '?'+parts.query if parts.query else '')
+
+class FixtureArchive:
+    '''
+    recorded responses in a sqlite database, one per url (a later response of the same url replaces it), bodies are
+    compressed. pages not found by their url are looked up by their path and query alone, so a google search recorded
+    on one mirror is replayed on every mirror
+    '''
+    def __init__(self, filename):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(filename, timeout=30, check_same_thread=False)
+        self.db.execute('CREATE TABLE IF NOT EXISTS fixtures (key TEXT PRIMARY KEY, path TEXT, url TEXT, \
+                         status INTEGER, headers TEXT, body BLOB, recorded REAL)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS fixtures_path ON fixtures (path)')
+        self.db.commit()
+
+    def add(self, url, status, headers, body):
+        '''
+        this function records one response
+        params:
+            url: str, the url requested, before any rewrite
+            status: int, http status code
+            headers: dict, response headers, only those in kept_headers are kept
+            body: bytes, the raw body
+        return value:
+            None
+        '''
+        key = fixture_key(url)
+        headers = {name: headers[name] for name in kept_headers if headers.get(name)}
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO fixtures VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (key, key.split('/', 1)[-1], url, status, json.dumps(headers), zlib.compress(body),
+                             time.time()))
+            self.db.commit()
+
+    def record(self, url, response):
+        '''
+        this function records a requests.Response to url, called by util.request_page with collect.py --record
+        '''
+        self.add(url, response.status_code, response.headers, response.content)
+
+    def lookup(self, url):
+        '''
+        this function finds the response recorded for url
+        return value:
+            a tuple (status, headers, body), or None if url was never recorded
+        '''
+        key = fixture_key(url)
+        with self.lock:
+            row = self.db.execute('SELECT status, headers, body FROM fixtures WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                row = self.db.execute('SELECT status, headers, body FROM fixtures WHERE path = ? LIMIT 1',
+                                      (key.split('/', 1)[-1],)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), zlib.decompress(row[2])
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute('SELECT COUNT(*) FROM fixtures').fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            delay = server.latency + server.rng.random() * server.jitter
+            fate = server.rng.random()
+        time.sleep(delay)
+        if fate < server.drop_rate:
+            self.close_connection = True
+            return
+        found = server.archive.lookup('http://' + self.path.lstrip('/'))
+        if fate < server.drop_rate + server.error_rate:
+            status, headers, body = 503, {}, b'<html><body>service unavailable</body></html>'
+        elif found is None:
+            with server.lock:
+                server.missing += 1
+            status, headers, body = 404, {}, b'<html><body>not recorded</body></html>'
+        else:
+            status, headers, body = found
+            if headers.get('ETag') and self.headers.get('If-None-Match') == headers['ETag']:
+                status, body = 304, b''
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class ReplayServer(ThreadingHTTPServer):
+    '''
+    an http server answering with the responses of a FixtureArchive, each request is delayed by latency plus up to
+    jitter seconds, error_rate of them are answered with 503 and drop_rate of them get their connection closed
+    '''
+    daemon_threads = True
+
+    def __init__(self, archive, port=0, latency=0., jitter=0., error_rate=0., drop_rate=0., seed=202):
+        super().__init__(('127.0.0.1', port), ReplayHandler)
+        self.archive = archive
+        self.latency, self.jitter = latency, jitter
+        self.error_rate, self.drop_rate = error_rate, drop_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.missing = 0
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self.server_address[1])
+
+def start(archive, **options):
+    '''
+    this function starts a ReplayServer in a daemon thread
+    params:
+        archive: FixtureArchive or str, the archive or its path
+        options: passed to ReplayServer
+    return value:
+        the running ReplayServer
+    '''
+    if isinstance(archive, str):
+        archive = FixtureArchive(archive)
+    server = ReplayServer(archive, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    archive = FixtureArchive(args.archive)
+    server = ReplayServer(archive, args.port, args.latency, args.jitter, args.error_rate, args.drop_rate, args.seed)
+    print('-----replay {} pages at {}, crawl with SCHOLAR_SPIDER_REPLAY={}-----'.format(len(archive), server.url,
+                                                                                    server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print('-----{} requests, {} not recorded-----'.format(server.requests, server.missing))
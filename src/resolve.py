@@ -0,0 +1,222 @@
+import json, math, os, re
+from collections import defaultdict
+
+# abbreviations spelled out before comparing names
+abbreviations = {'univ': 'university', 'uni': 'university', 'inst': 'institute', 'tech': 'technology',
+                 'technol': 'technology', 'sci': 'science', 'sciences': 'science', 'acad': 'academy', 'natl': 'national',
+                 'coll': 'college', 'dept': 'department', 'lab': 'laboratory', 'labs': 'laboratory', 'ctr': 'center',
+                 'centre': 'center'}
+# words left out when comparing the words of two names
+stopwords = {'the', 'of', 'and', 'at', 'in', 'for'}
+
+# a word, with the period of its abbreviation
+word = re.compile(r"\b([A-Za-z]+)\b\.?")
+
+def spell_out(match):
+    # only abbreviations, "sciences" and "centre" are left as they are written
+    full = abbreviations.get(match.group(1).lower(), '')
+    return full if len(full) > len(match.group(1)) else match.group(0)
+
+def normalize(name):
+    '''
+    this function reduces an institution's name to lowercase words, punctuations dropped and abbreviations spelled out,
+    e.g. "Tsinghua Univ." -> "tsinghua university"
+    '''
+    words = re.sub(r'[^a-z0-9 ]', ' ', name.lower().replace('&', ' and ')).split()
+    return ' '.join(abbreviations.get(word, word) for word in words)
+
+def ngrams(key, n=3):
+    key = ' {} '.format(key)
+    return {key[i:i+n] for i in range(max(len(key)-n+1, 1))}
+
+def content_words(key):
+    return [word for word in key.split() if word not in stopwords]
+
+def one_typo(a, b):
+    '''
+    this function tells whether two words of at least 4 letters differ by one inserted, deleted or replaced letter, or
+    two swapped adjacent letters, e.g. "university" and "univeristy"
+    '''
+    if abs(len(a) - len(b)) > 1 or min(len(a), len(b)) < 4:
+        return False
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    a, b = a[i:], b[i:]
+    j = 0
+    while j < min(len(a), len(b)) and a[-1-j] == b[-1-j]:
+        j += 1
+    a, b = a[:len(a)-j], b[:len(b)-j]
+    return len(a) + len(b) in (1, 2) and max(len(a), len(b)) == 1 or len(a) == len(b) == 2 and a == b[::-1]
+
+def same_words(words, other):
+    '''
+    this function tells whether two names have the same words (stopwords left out), up to one typo in each word or
+    spaces between them, e.g. "tsing hua university" and "tsinghua univeristy". a word missing from either name is a
+    different institution, e.g. "city university of hong kong" and "university of hong kong"
+    params:
+        words, other: list of str, returned by content_words
+    '''
+    if ''.join(words) == ''.join(other):
+        return True
+    def covered(words, other):
+        return all(any(word == match or one_typo(word, match) for match in other) for word in words)
+    return covered(words, other) and covered(other, words)
+
+def load_aliases(filename='config/institutions.json'):
+    '''
+    this function builds the alias table from the config of institutions, each university is known by its name and
+    its alias
+    params:
+        filename: str, path to config/institutions.json
+    return value:
+        dict, key: a name or an alias, value: the university's name
+    '''
+    with open(filename, 'r') as f:
+        configs = json.load(f)
+    aliases = {}
+    for config in configs:
+        aliases[config['university']] = config['university']
+        aliases[config['alias']] = config['university']
+    return aliases
+
+class EntityResolver:
+    '''
+    maps the names of an institution (spellings, abbreviations, translations) to one canonical name. names in the alias
+    table resolve to their university, others to the most similar canonical name met so far if the jaccard similarity
+    of their character n-grams is at least threshold and they have the same words (see same_words), or become canonical
+    names themselves. an inverted index from
+    n-grams to canonical names blocks the comparisons: only names sharing one of the rarest n-grams of the query are
+    compared, which is enough to find every name above threshold
+    '''
+    def __init__(self, aliases=None, threshold=.8, n=3, cache_file=None):
+        self.threshold = threshold
+        self.n = n
+        self.cache_file = cache_file
+        # canonical names, their ids are their positions
+        self.names = []
+        self.grams = []
+        self.numbers = []
+        self.words = []
+        self.index = defaultdict(list)
+        # normalized name -> canonical id
+        self.exact = {}
+        # raw name -> canonical name, saved to cache_file
+        self.memo = {}
+        self.dirty = False
+        # normalized alias -> university, and affiliation -> expanded affiliation, see expand
+        self.aliases = {}
+        self.expanded = {}
+        self.memo_size = 1 << 18
+        for alias, name in (aliases or {}).items():
+            self.exact[normalize(alias)] = self.add(name)
+            self.aliases[normalize(alias)] = name
+        if cache_file and os.path.exists(cache_file):
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                for raw, name in json.load(f).items():
+                    key, cid = normalize(raw), self.add(name)
+                    # merges made by an older resolver without the check of words are resolved again
+                    if self.exact.get(key, cid) != cid or not same_words(content_words(key), self.words[cid]):
+                        self.dirty = True
+                        continue
+                    self.exact[key] = cid
+                    self.memo[raw] = name
+
+    def add(self, name):
+        '''
+        this function makes name canonical unless its normalized form is known already
+        return value:
+            int, the canonical id of name
+        '''
+        key = normalize(name)
+        if key in self.exact:
+            return self.exact[key]
+        cid = len(self.names)
+        self.names.append(name)
+        self.grams.append(ngrams(key, self.n))
+        self.numbers.append(re.findall(r'\d+', key))
+        self.words.append(content_words(key))
+        for gram in self.grams[cid]:
+            self.index[gram].append(cid)
+        self.exact[key] = cid
+        return cid
+
+    def nearest(self, key):
+        '''
+        this function finds the canonical name most similar to a normalized name
+        return value:
+            int or None, the canonical id, None if none is similar enough
+        '''
+        grams = ngrams(key, self.n)
+        # a name at least threshold similar shares at least ceil(threshold * |grams|) n-grams with the query,
+        # so it has one of any |grams| - ceil(threshold * |grams|) + 1 of them, take the rarest
+        probe = len(grams) - math.ceil(self.threshold * len(grams) - 1e-9) + 1
+        candidates = set()
+        for gram in sorted(grams, key=lambda gram: len(self.index.get(gram, ())))[:probe]:
+            candidates.update(self.index.get(gram, ()))
+        numbers = re.findall(r'\d+', key)
+        words = content_words(key)
+        best, best_score = None, self.threshold
+        for cid in candidates:
+            other = self.grams[cid]
+            # the similarity can not reach threshold if the sizes differ too much
+            if len(other) < self.threshold * len(grams) or len(grams) < self.threshold * len(other):
+                continue
+            # names differing in numbers are different institutions, e.g. "the 2nd hospital" and "the 3rd hospital"
+            if numbers != self.numbers[cid]:
+                continue
+            shared = len(grams & other)
+            score = shared / (len(grams) + len(other) - shared)
+            if score >= best_score and same_words(words, self.words[cid]):
+                best, best_score = cid, score
+        return best
+
+    def expand(self, affiliation, delimiters):
+        '''
+        this function prepares a coauthor's affiliation for the keyword matcher (matcher.AffiliationMatcher), entities
+        in the alias table become their university and abbreviations are spelled out in the others, so that e.g.
+        "THU" and "Dept. of CS, Peking Univ." are matched as universities
+        params:
+            affiliation: str, raw information about a coauthor, already in english
+            delimiters: compiled regex, characters separating entities, the delimiters of the matcher
+        return value:
+            str, the affiliation with its entities joined by ","
+        '''
+        if affiliation in self.expanded:
+            return self.expanded[affiliation]
+        entities = []
+        for entity in delimiters.split(affiliation):
+            name = self.aliases.get(normalize(entity))
+            if name is None:
+                name = word.sub(spell_out, entity)
+            entities.append(name)
+        if len(self.expanded) >= self.memo_size:
+            self.expanded.clear()
+        self.expanded[affiliation] = ','.join(entities)
+        return self.expanded[affiliation]
+
+    def resolve(self, name):
+        '''
+        this function returns the canonical name of an institution
+        params:
+            name: str, an institution's name, e.g. returned by util.process_institutions
+        return value:
+            str, the canonical name
+        '''
+        if name in self.memo:
+            return self.memo[name]
+        key = normalize(name)
+        cid = self.exact.get(key)
+        if cid is None:
+            cid = self.nearest(key)
+            cid = self.add(name) if cid is None else cid
+            self.exact[key] = cid
+        self.memo[name] = self.names[cid]
+        self.dirty = True
+        return self.memo[name]
+
+    def save(self):
+        if self.cache_file and self.dirty:
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump(self.memo, f, ensure_ascii=False)
+            self.dirty = False
@@ -0,0 +1,113 @@
+import json, os
+from functools import lru_cache
+
+# surnames of two characters, looked for before taking the first character as the surname
+compound_surnames = ['欧阳', '司马', '上官', '诸葛', '东方', '皇甫', '尉迟', '公孙', '慕容', '长孙', '宇文', '司徒', '令狐',
+                     '夏侯', '轩辕', '端木', '独孤', '南宫', '西门', '百里', '呼延', '闻人', '澹台', '公羊', '申屠', '万俟',
+                     '钟离', '太史', '赫连', '濮阳', '第五', '东郭', '左丘', '拓跋', '司空', '鲜于', '闾丘', '子车', '亓官']
+# surnames read differently from the most common reading of their characters
+surname_readings = {'曾': 'zeng', '单': 'shan', '解': 'xie', '区': 'ou', '朴': 'piao', '查': 'zha', '仇': 'qiu', '乐': 'yue',
+                    '覃': 'qin', '缪': 'miao', '翟': 'zhai', '盖': 'ge', '隗': 'wei', '过': 'guo',
+                    '种': 'chong', '繁': 'po', '冼': 'xian', '蔺': 'lin', '万俟': 'moqi', '尉迟': 'yuchi', '长孙': 'zhangsun'}
+
+@lru_cache(maxsize=1<<16)
+def char_pinyin(char):
+    '''
+    this function returns the pinyin of one character, memoized since the characters of names repeat a lot
+    '''
+    # loading the dictionaries of pypinyin takes a while, only do it when a name is converted
+    from pypinyin import lazy_pinyin
+    return ''.join(c for c in ''.join(lazy_pinyin(char)) if c.isalpha())
+
+def split_name(name):
+    '''
+    this function splits a chinese name into surname and given name
+    params:
+        name: str, a name in chinese characters
+    return value:
+        a tuple (surname, given name)
+    '''
+    if len(name) > 2 and name[:2] in compound_surnames:
+        return name[:2], name[2:]
+    return name[:1], name[1:]
+
+class Romanizer:
+    '''
+    converts chinese names into pinyin search queries, ranked from the most likely form of the name on google scholar:
+    "given surname" (e.g. "xiaoming zhang"), "surname given" ("zhang xiaoming"), and given names with a hyphen
+    ("xiao-ming zhang"). names already in latin letters are taken as "surname given" and reordered the same way.
+    the queries of each name are memoized, and kept in cache_file across runs if it is given
+    '''
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file
+        self.memo = {}
+        # first query -> all queries, for collect.py to try the others when the first one finds nothing
+        self.alternatives = {}
+        self.dirty = False
+        if cache_file and os.path.exists(cache_file):
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                for name, queries in json.load(f).items():
+                    self.remember(name, queries)
+
+    def remember(self, name, queries):
+        self.memo[name] = queries
+        if queries:
+            self.alternatives.setdefault(queries[0], queries)
+
+    def convert(self, name):
+        '''
+        this function computes the ranked queries of a name, without the memo
+        params:
+            name: str, a faculty member's name, in chinese characters or latin letters
+        return value:
+            list of str, from the most likely query to the least, without duplicates, empty if name has no letter
+        '''
+        name = name.strip()
+        if name.isascii():
+            words = name.split()
+            if not words:
+                return []
+            surname, given = words[0], ' '.join(words[1:])
+            syllables = given.replace('-', ' ').split()
+        else:
+            surname, given = split_name(''.join(c for c in name if not c.isspace()))
+            surname = surname_readings.get(surname) or ''.join(char_pinyin(c) for c in surname)
+            syllables = [pinyin for pinyin in (char_pinyin(c) for c in given) if pinyin]
+            given = ''.join(syllables)
+            if not surname:
+                return [given] if given else []
+        queries = [given + ' ' + surname, surname + ' ' + given, '-'.join(syllables) + ' ' + surname]
+        return list(dict.fromkeys(query.strip() for query in queries if query.strip()))
+
+    def queries(self, name):
+        '''
+        this function returns the ranked queries of a name, see convert
+        '''
+        if name not in self.memo:
+            self.remember(name, self.convert(name))
+            self.dirty = True
+        return self.memo[name]
+
+    def convert_all(self, names):
+        '''
+        this function converts a whole faculty list at once, each distinct name once
+        params:
+            names: list of str, faculty members' names
+        return value:
+            list of str, the first query of each name, '' for names without any letter
+        '''
+        for name in dict.fromkeys(names):
+            self.queries(name)
+        return [(self.memo[name] or [''])[0] for name in names]
+
+    def variants(self, query):
+        '''
+        this function returns every ranked query of the name whose first query is query, [query] if it is not known
+        '''
+        return self.alternatives.get(query, [query])
+
+    def save(self):
+        if self.cache_file and self.dirty:
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump(self.memo, f, ensure_ascii=False)
+            self.dirty = False
@@ -0,0 +1,109 @@
+import json, os, hashlib
+
+def digest(names):
+    '''
+    this function hashes the names selected by the xpath of a faculty list, instead of the whole page, so a page whose
+    layout, news or date changed around the same list is not taken as changed
+    params:
+        names: list of str, returned by evaluating the xpath on the page
+    return value:
+        str, hex digest of the names in order
+    '''
+    return hashlib.sha1('\n'.join(names).encode('utf-8')).hexdigest()
+
+class FacultySnapshots:
+    '''
+    the faculty list of each university as of the last crawl, with the hash of the list and the validators (ETag and
+    Last-Modified) of its page, kept in a json file. util.crawl_faculty_list uses them to fetch a list again only if
+    its page changed, and records which lists did change in this crawl, see changes. members who joined but could not
+    be searched are kept as pending, to be searched by the next crawl
+    '''
+    def __init__(self, filename='result/faculty-snapshot.json'):
+        self.filename = filename
+        # university name -> dict(names, hash, etag, last_modified)
+        self.snapshots = {}
+        # university name -> tuple (names before, names now), for lists changed in this crawl
+        self.changed = {}
+        if filename and os.path.exists(filename):
+            with open(filename, 'r', encoding='utf-8') as f:
+                self.snapshots = json.load(f)
+
+    def forget(self):
+        '''
+        this function drops every snapshot, so all lists are fetched and taken as new
+        '''
+        self.snapshots.clear()
+
+    def validators(self, univ):
+        '''
+        return value:
+            a tuple (etag, last_modified) of the page of univ fetched last time, None for unknown ones
+        '''
+        snapshot = self.snapshots.get(univ, {})
+        return snapshot.get('etag'), snapshot.get('last_modified')
+
+    def names(self, univ):
+        '''
+        return value:
+            list of str, the faculty list of univ as of the last crawl, empty if it was never crawled
+        '''
+        return list(self.snapshots.get(univ, {}).get('names', []))
+
+    def update(self, univ, names, etag=None, last_modified=None):
+        '''
+        this function records the faculty list of univ fetched in this crawl
+        params:
+            univ: str, the university's name
+            names: list of str, the faculty list, as selected by the xpath
+            etag: str or None, the ETag of the page
+            last_modified: str or None, the Last-Modified of the page
+        return value:
+            bool, whether the list is different from the last snapshot
+        '''
+        before = self.snapshots.get(univ)
+        changed = before is None or before['hash'] != digest(names)
+        if changed:
+            self.changed[univ] = (before['names'] if before else [], list(names))
+        self.snapshots[univ] = dict(names=list(names), hash=digest(names), etag=etag, last_modified=last_modified,
+                                    pending=before.get('pending', []) if before else [])
+        return changed
+
+    def pending(self, univ):
+        '''
+        return value:
+            list of str, pinyin names of the members of univ the last crawl could not search
+        '''
+        return list(self.snapshots.get(univ, {}).get('pending', []))
+
+    def set_pending(self, members):
+        '''
+        this function replaces the pending members of every university
+        params:
+            members: list of tuple (university name, pinyin name), members this crawl could not search
+        return value:
+            None
+        '''
+        for snapshot in self.snapshots.values():
+            snapshot['pending'] = []
+        for univ, member in members:
+            if univ in self.snapshots:
+                self.snapshots[univ]['pending'].append(member)
+
+    def changes(self):
+        '''
+        return value:
+            a dict, key: name of a university whose list changed in this crawl, value: tuple (names before, names now)
+        '''
+        return dict(self.changed)
+
+    def save(self):
+        '''
+        this function writes the snapshots, it should be called only after the changes are handled, otherwise they are
+        lost: the next crawl compares with the lists written here
+        '''
+        if not self.filename:
+            return
+        temp = self.filename + '.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshots, f, ensure_ascii=False)
+        os.replace(temp, self.filename)
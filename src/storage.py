@@ -0,0 +1,157 @@
+import os, json, argparse, shutil
+from urllib.parse import unquote
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.compute as pc
+import columnar, util
+
+parser = argparse.ArgumentParser(description='convert results between json/csv files and parquet datasets')
+parser.add_argument('direction', type=str, choices=['to_parquet', 'to_json'], help='"to_parquet" reads connections.json, \
+                    counts.json and stat.csv under --result and writes them under --parquet_dir, "to_json" goes back')
+parser.add_argument('--result', type=str, default='result', help='directory of the json and csv files')
+parser.add_argument('--parquet_dir', type=str, default='result/parquet', help='directory of the parquet datasets')
+
+def _write_dataset(table, path):
+    # partitions of the universities written are replaced, those of the others are left as they are. a university
+    # without any row left (e.g. none of its members has a coauthor) is still one of the categories of table['univ'],
+    # its old partition is deleted here since write_to_dataset only replaces the partitions it writes
+    univs = table['univ'].cat.categories if hasattr(table['univ'], 'cat') else table['univ'].unique()
+    univs = set(map(str, univs))
+    if os.path.isdir(path):
+        for name in os.listdir(path):
+            if name.startswith('univ=') and unquote(name[len('univ='):]) in univs:
+                shutil.rmtree(os.path.join(path, name))
+    table['univ'] = table['univ'].astype(str)
+    pq.write_to_dataset(pa.Table.from_pandas(table, preserve_index=False), path, partition_cols=['univ'],
+                        existing_data_behavior='delete_matching')
+
+def _positions(table, path):
+    # a position is the rank of the university (in the order universities were first written to path) << 32, plus the
+    # row in the university, so writing some universities again keeps them in place among the others
+    table_univs = table['univ'].astype(str)
+    ranks = {}
+    if os.path.exists(path):
+        existing = _read_dataset(path, columns=['univ', 'position'])
+        ranks = (existing['position'] // (1 << 32)).groupby(existing['univ']).min().to_dict()
+    for univ in dict.fromkeys(table_univs):
+        if univ not in ranks:
+            ranks[univ] = max(ranks.values(), default=-1) + 1
+    return table_univs.map(ranks).astype('int64') * (1 << 32) + table_univs.groupby(table_univs, sort=False).cumcount()
+
+def _read_dataset(path, univs=None, columns=None):
+    filters = pc.field('univ').isin(pa.array(list(univs), pa.string())) if univs is not None else None
+    table = pq.read_table(path, columns=columns, filters=filters).to_pandas()
+    if 'univ' in table:
+        table['univ'] = table['univ'].astype(str)
+    return table
+
+def save_connections(connections, root='result/parquet'):
+    '''
+    this function saves connections as two parquet datasets partitioned by university, "members" with one row per
+    faculty member and "connections" with one row per (member, cooperating institution)
+    params:
+        connections: dict of dict, returned by collect.find_connections
+        root: str, directory of the datasets
+    return value:
+        None
+    '''
+    members, links = columnar.flatten_connections(connections)
+    # partitions are read back in directory order, positions restore the order of universities and members
+    members['position'] = _positions(members, os.path.join(root, 'members'))
+    _write_dataset(members, os.path.join(root, 'members'))
+    _write_dataset(links, os.path.join(root, 'connections'))
+
+def load_connections(root='result/parquet', univs=None):
+    '''
+    this function loads connections saved by save_connections back into the shape of connections.json, only the
+    partitions of the given universities are read
+    params:
+        root: str, directory of the datasets
+        univs: list of str or None, names of the universities to load, None for all
+    return value:
+        dict of dict, key: university name, value: dict,
+                      secondary key: faculty member's name, secondary value: list of cooperating institutions
+    '''
+    members = _read_dataset(os.path.join(root, 'members'), univs).sort_values('position', kind='stable')
+    links = _read_dataset(os.path.join(root, 'connections'), univs).sort_values(['univ', 'member', 'rank'])
+    grouped = links.groupby(['univ', 'member'], sort=False)['institution'].agg(list).to_dict()
+    connections = {}
+    for univ, member in zip(members['univ'], members['member']):
+        connections.setdefault(univ, {})[member] = grouped.get((univ, member), [])
+    return connections
+
+def save_counts(counts, root='result/parquet'):
+    '''
+    this function saves counts (dict as in counts.json, or the table of columnar.compute_counts) as a parquet dataset
+    partitioned by university
+    '''
+    if isinstance(counts, dict):
+        counts = columnar.counts_from_dict(counts)
+    counts = counts.assign(position=_positions(counts, os.path.join(root, 'counts')))
+    _write_dataset(counts, os.path.join(root, 'counts'))
+
+def load_counts(root='result/parquet', univs=None):
+    '''
+    this function loads counts saved by save_counts, only the partitions of the given universities are read
+    params:
+        root: str, directory of the datasets
+        univs: list of str or None, names of the universities to load, None for all
+    return value:
+        dict, key: university name, value: dict, secondary key: institute's name, secondary value: number of occurrence,
+        sorted from the most frequent institute to the rarest
+    '''
+    counts = _read_dataset(os.path.join(root, 'counts'), univs).sort_values('position', kind='stable')
+    ret = {}
+    for univ, ins, cnt in zip(counts['univ'], counts['institution'], counts['count']):
+        ret.setdefault(univ, {})[ins] = int(cnt)
+    return ret
+
+def save_stat(stat, root='result/parquet'):
+    '''
+    this function saves the statistics DataFrame of feature.compute_stat as the dataset stat.parquet partitioned by
+    university, the statistics of universities not in stat are kept
+    '''
+    path = os.path.join(root, 'stat.parquet')
+    table = stat.rename_axis('univ').reset_index()
+    if os.path.isfile(path):
+        # stat.parquet used to be a single file, it is turned into a dataset first, whose partitions of the
+        # universities in stat are then replaced
+        kept = pd.read_parquet(path).rename(columns={'university': 'univ'})
+        os.remove(path)
+        _write_dataset(kept.assign(position=_positions(kept, path)), path)
+    _write_dataset(table.assign(position=_positions(table, path)), path)
+
+def load_stat(filename='result/parquet/stat.parquet', columns=None, univs=None):
+    '''
+    this function loads statistics saved by save_stat, reading only the given columns and partitions
+    params:
+        filename: str, path to stat.parquet
+        columns: list of str or None, fields to read besides "university", None for all
+        univs: list of str or None, names of the universities to load, None for all
+    return value:
+        DataFrame, the first column is "university", followed by the requested fields
+    '''
+    if columns is not None:
+        columns = [column for column in dict.fromkeys(columns) if column != 'university'] + ['univ', 'position']
+    stat = _read_dataset(filename, univs, columns).sort_values('position', kind='stable')
+    stat = stat.drop(columns='position').rename(columns={'univ': 'university'}).reset_index(drop=True)
+    return stat[['university'] + [column for column in stat.columns if column != 'university']]
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    if args.direction == 'to_parquet':
+        save_connections(util.load_data(os.path.join(args.result, 'connections.json')), args.parquet_dir)
+        if os.path.exists(os.path.join(args.result, 'counts.json')):
+            save_counts(util.load_data(os.path.join(args.result, 'counts.json')), args.parquet_dir)
+        if os.path.exists(os.path.join(args.result, 'stat.csv')):
+            save_stat(pd.read_csv(os.path.join(args.result, 'stat.csv'), index_col=0), args.parquet_dir)
+    else:
+        with open(os.path.join(args.result, 'connections.json'), 'w') as f:
+            json.dump(load_connections(args.parquet_dir), f)
+        if os.path.exists(os.path.join(args.parquet_dir, 'counts')):
+            with open(os.path.join(args.result, 'counts.json'), 'w') as f:
+                json.dump(load_counts(args.parquet_dir), f)
+        if os.path.exists(os.path.join(args.parquet_dir, 'stat.parquet')):
+            load_stat(os.path.join(args.parquet_dir, 'stat.parquet')).set_index('university') \
+                .rename_axis(None).to_csv(os.path.join(args.result, 'stat.csv'))
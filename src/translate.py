@@ -0,0 +1,83 @@
+import json, os
+import metrics
+
+class GoogleBackend:
+    '''
+    translates with googletrans, the Translator is only created (and connects) on first use
+    '''
+    def __init__(self, service_urls=('translate.google.cn',)):
+        self.service_urls = list(service_urls)
+        self.translator = None
+
+    def translate(self, texts, src='zh-cn', dest='en'):
+        '''
+        this function translates a batch of texts in one call
+        params:
+            texts: list of str, texts to translate
+            src: str, source language
+            dest: str, target language
+        return value:
+            a list of the same length, each entry is the translated text
+        '''
+        if self.translator is None:
+            from googletrans import Translator
+            self.translator = Translator(service_urls=self.service_urls)
+        return [result.text for result in self.translator.translate(texts, src=src, dest=dest)]
+
+class IdentityBackend:
+    '''
+    an offline backend returning texts unchanged, for tests and for recounts without network
+    '''
+    def translate(self, texts, src='zh-cn', dest='en'):
+        return list(texts)
+
+backends = {'google': GoogleBackend, 'none': IdentityBackend}
+
+class CachedTranslator:
+    '''
+    translates affiliations with a backend, skipping pure ascii texts (already english), sending the rest in batches
+    and remembering every result in a json file keyed by the raw text
+    '''
+    def __init__(self, backend, cache_file=None, batch_size=50):
+        self.backend = backend
+        self.cache_file = cache_file
+        self.batch_size = batch_size
+        self.memo = {}
+        self.dirty = False
+        if cache_file and os.path.exists(cache_file):
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                self.memo = json.load(f)
+
+    def translate(self, texts, src='zh-cn', dest='en'):
+        '''
+        this function translates texts, only those neither ascii nor memoized go to the backend
+        params:
+            texts: list of str, texts to translate
+            src: str, source language
+            dest: str, target language
+        return value:
+            a list of the same length, each entry is the translated text
+        '''
+        missing = list(dict.fromkeys(text for text in texts if not text.isascii() and text not in self.memo))
+        metrics.incr('translation_hits', len(texts)-len(missing))
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start+self.batch_size]
+            with metrics.span('translate'):
+                self.memo.update(zip(batch, self.backend.translate(batch, src=src, dest=dest)))
+            metrics.incr('translation_requests')
+            self.dirty = True
+        return [text if text.isascii() else self.memo[text] for text in texts]
+
+    def save(self):
+        '''
+        this function writes the memo back to cache_file if anything new was translated
+        params:
+            None
+        return value:
+            None
+        '''
+        if not self.cache_file or not self.dirty:
+            return
+        with open(self.cache_file, 'w', encoding='utf-8') as f:
+            json.dump(self.memo, f, ensure_ascii=False)
+        self.dirty = False
@@ -1,16 +1,37 @@
-import json, random, time, re
+import json, os, random, time, re, threading, html
+from urllib.parse import unquote
 from collections import defaultdict
-from pypinyin import lazy_pinyin
-import requests
-from lxml import etree
-from bs4 import BeautifulSoup
-import numpy as np
-from googletrans import Translator
+# requests, numpy, lxml (parsepool) and pypinyin (romanize) are imported where they are first used, so that scripts
+# starting up to print --help or to recount do not wait for them
+import translate, matcher, mirror, metrics, parsepool, romanize
 
-translator = Translator(service_urls=['translate.google.cn'])
+# affiliations in chinese are translated by google, feature.py may swap the backend or give it a persistent cache
+translator = translate.CachedTranslator(translate.GoogleBackend(['translate.google.cn']))
 random.seed(202)
 # use socks5 proxy for google sites as default, may change accordingly to other setup
 proxies=dict(http='socks5h://127.0.0.1:1080', https='socks5h://127.0.0.1:1080')
+# a ratelimit.HostRateLimiter, set by collect.py when crawling concurrently, None means no throttling
+rate_limiter = None
+# a cache.ResponseCache, set by collect.py with --cache_dir, None means always fetching from the network
+response_cache = None
+# how many mirrors google_search tries before giving up on a query
+search_attempts = 3
+# how many forms of a member's name (see romanize.Romanizer) search_member tries before giving up on the member
+name_variants = 1
+# connection pools shared by all fetches, one requests.Session per proxy setting, see configure_session
+session_options = dict(pool_connections=32, pool_maxsize=10, timeout=30, retries=3, backoff=.5)
+sessions = {}
+sessions_lock = threading.Lock()
+# url of a replay server (see replay.py), every request is sent to it instead, without proxies
+replay_url = os.environ.get('SCHOLAR_SPIDER_REPLAY')
+# a replay.FixtureArchive, set by collect.py with --record, every response is recorded in it
+recorder = None
+# a parsepool.ParsePool, set by collect.py with --parse_workers, None means parsing in the fetching thread
+parse_pool = None
+# hrefs pointing to google scholar in a result page, either directly or through google's /url?q= redirect
+# (case sensitive, matching ignoring case is about 20 times slower, and google writes its markup in lower case)
+scholar_href = re.compile(r'''href\s*=\s*["']?([^"'\s>]*scholar\.google\.com[^"'\s>]*)''')
+scholar_user = re.compile(r'[?&]user=([\w-]+)')
 
 def load_data(filename):
     '''
@@ -24,18 +45,46 @@ def load_data(filename):
         ret = json.load(f)
     return ret
 
-# pretend to browse with some browsers on some platform (shamelessly)
-headers = load_data('config/user-agent.json')
+# globals read from the config files on their first use (see lazy), so importing util reads no file
+deferred = {
+    # pretend to browse with some browsers on some platform (shamelessly)
+    'headers': lambda: load_data('config/user-agent.json'),
+    # read all alternative google sites provided by search.json
+    # search with them randomly to avoid being blocked by google (shamelessly +1)
+    'google_sites': lambda: load_data('config/search.json'),
+    # and prefer those answering quickly without blocking us, see mirror.MirrorScheduler
+    'mirror_scheduler': lambda: mirror.MirrorScheduler(lazy('google_sites')),
+    # rules for parsing google scholar list, keywords of the institutions we look for
+    'interested_parties': lambda: load_data('config/parties.json'),
+    'affiliation_matcher': lambda: matcher.AffiliationMatcher(lazy('interested_parties')),
+}
+deferred_lock = threading.RLock()
 
-# read all alternative google sites provided by search.json
-# search with them randomly to avoid being blocked by google (shamelessly +1)
-google_sites = load_data('config/search.json')
+def lazy(name):
+    '''
+    this function returns a global of util, loading it first if it is one of deferred and was never loaded or set
+    params:
+        name: str, name of the global, e.g. "headers"
+    return value:
+        the value of the global
+    '''
+    if name in globals():
+        return globals()[name]
+    with deferred_lock:
+        if name not in globals():
+            globals()[name] = deferred[name]()
+        return globals()[name]
+
+def __getattr__(name):
+    # called for util.<name> when name is not a global (yet), see PEP 562, functions of util call lazy instead
+    if name in deferred:
+        return lazy(name)
+    raise AttributeError("module 'util' has no attribute '{}'".format(name))
 
-# rules for parsing google scholar list
-interested_parties = {'composite': ['university', 'academy', 'institute'],
-                      'single':  ['cas', 'hkust', 'eth', 'mit', 'sustech', 'tencent', 'microsoft', 'google', \
-                      'facebook', 'amazon', 'uber', 'intel', 'aws', 'apple', 'alibaba', 'baidu', \
-                      'sensetime', 'face++', 'huawei', 'samsang', 'meituan', 'jd', 'didi']}
+# a resolve.EntityResolver, set by feature.py, None means institutions are kept as matched
+entity_resolver = None
+# converts faculty members' names into search queries, collect.py gives it a persistent cache
+romanizer = romanize.Romanizer()
 
 def read_config(filename='config/institutions.json'):
     '''
@@ -49,44 +98,241 @@ def read_config(filename='config/institutions.json'):
         configs = json.load(conf)
     return configs
 
-def crawl_faculty_list(configs, target_alias=None):
+def configure_session(pool_connections=32, pool_maxsize=10, timeout=30, retries=3, backoff=.5):
+    '''
+    this function sets up the connection pools used by fetch_page, sessions created before are dropped
+    params:
+        pool_connections: int, number of hosts whose pools are kept alive by each session
+        pool_maxsize: int, number of keep-alive connections kept for each host, should be no less than the concurrency
+        timeout: float, seconds to wait for connecting to or reading from a server
+        retries: int, times to retry a request failing to connect or answered with 429/5xx
+        backoff: float, retries wait for backoff * 2 ** (retry - 1) sec
+    return value:
+        None
+    '''
+    with sessions_lock:
+        session_options.update(pool_connections=pool_connections, pool_maxsize=pool_maxsize, timeout=timeout,
+                               retries=retries, backoff=backoff)
+        for session in sessions.values():
+            session.close()
+        sessions.clear()
+
+def get_session(proxies=None, retry=True):
+    '''
+    this function returns the session for a proxy setting, creating it the first time, each session keeps a pool of
+    keep-alive connections for every host it visits
+    params:
+        proxies: dict or None, proxies passed to requests
+        retry: bool, whether requests failing to connect or answered with 429/5xx are retried, google searches are
+        not, so a blocked mirror is reported to mirror_scheduler at once and another one is tried instead
+    return value:
+        a requests.Session
+    '''
+    key = (tuple(sorted(proxies.items())) if proxies else (), retry)
+    with sessions_lock:
+        if key not in sessions:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            policy = Retry(total=session_options['retries'] if retry else 0, backoff_factor=session_options['backoff'],
+                           status_forcelist=[429, 500, 502, 503, 504], allowed_methods=['GET'], raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=session_options['pool_connections'],
+                                  pool_maxsize=session_options['pool_maxsize'], max_retries=policy)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            if proxies:
+                session.proxies.update(proxies)
+            sessions[key] = session
+        return sessions[key]
+
+def fetch_page(url, header, proxies=None, detect_encoding=False, refresh=False):
+    '''
+    this function fetches a web page, if rate_limiter is set, it waits for the host of url to be available first
+    params:
+        url: str, the page to fetch
+        header: dict, http headers sent with the request
+        proxies: dict or None, proxies passed to requests
+        detect_encoding: bool, guess the encoding from the content instead of trusting the response headers
+        refresh: bool, ignore the cached page and fetch it again
+    return value:
+        str, the text of the page
+    '''
+    if response_cache is not None and not refresh:
+        text = response_cache.get(url)
+        metrics.incr('cache_hits' if text is not None else 'cache_misses')
+        if text is not None:
+            return text
+    req = request_page(url, header, proxies)
+    text = decode_page(req, detect_encoding)
+    if response_cache is not None and req.status_code == 200:
+        response_cache.put(url, text)
+    return text
+
+def request_page(url, header, proxies=None, retry=True):
+    '''
+    this function sends one request through the shared sessions, waiting for rate_limiter first, and records its
+    timings in metrics, and the response in recorder if it is set
+    params:
+        url: str, the page to fetch
+        header: dict, http headers sent with the request
+        proxies: dict or None, proxies passed to requests
+        retry: bool, see get_session
+    return value:
+        a requests.Response, its attribute latency is the seconds the request took, without waiting for rate_limiter
+    '''
+    if rate_limiter is not None:
+        with metrics.span('rate_limit_wait'):
+            rate_limiter.acquire(url)
+    s_time = time.perf_counter()
+    if replay_url:
+        import replay
+        req = get_session(retry=retry).get(replay.rewrite(url, replay_url), headers=header,
+                                           timeout=session_options['timeout'])
+    else:
+        req = get_session(proxies, retry).get(url, headers=header, timeout=session_options['timeout'])
+    req.latency = time.perf_counter() - s_time
+    # elapsed covers proxy handshake, connecting and waiting for the headers, the rest is reading the body
+    metrics.observe('http_wait', req.elapsed.total_seconds())
+    metrics.observe('http_body', max(time.perf_counter()-s_time-req.elapsed.total_seconds(), 0.))
+    metrics.incr('requests')
+    metrics.incr('bytes', len(req.content))
+    if req.raw is not None and getattr(req.raw, 'retries', None) is not None:
+        metrics.incr('retries', len(req.raw.retries.history))
+    if recorder is not None:
+        recorder.record(url, req)
+    return req
+
+def decode_page(req, detect_encoding=False):
+    '''
+    this function returns the text of a response
+    params:
+        req: requests.Response, returned by request_page
+        detect_encoding: bool, guess the encoding from the content instead of trusting the response headers
+    return value:
+        str, the text of the page
+    '''
+    with metrics.span('decode'):
+        if detect_encoding:
+            # gb2312 fails to encode some rare characters, so we change it to gbk
+            req.encoding = 'gbk' if req.apparent_encoding=='GB2312' else req.apparent_encoding
+        return req.text
+
+def fetch_if_changed(url, header, etag=None, last_modified=None, proxies=None, detect_encoding=False):
+    '''
+    this function fetches a page again only if it changed since it was fetched with the validators etag and
+    last_modified, bypassing response_cache
+    params:
+        url: str, the page to fetch
+        header: dict, http headers sent with the request
+        etag: str or None, the ETag of the page fetched before, sent as If-None-Match
+        last_modified: str or None, the Last-Modified of the page fetched before, sent as If-Modified-Since
+        proxies: dict or None, proxies passed to requests
+        detect_encoding: bool, guess the encoding from the content instead of trusting the response headers
+    return value:
+        a tuple (text, etag, last_modified), text is None if the server answered 304 not modified, etag and
+        last_modified are the validators to send next time
+    '''
+    header = dict(header)
+    if etag:
+        header['If-None-Match'] = etag
+    if last_modified:
+        header['If-Modified-Since'] = last_modified
+    req = request_page(url, header, proxies)
+    if req.status_code == 304:
+        metrics.incr('not_modified')
+        return None, req.headers.get('ETag', etag), req.headers.get('Last-Modified', last_modified)
+    return decode_page(req, detect_encoding), req.headers.get('ETag'), req.headers.get('Last-Modified')
+
+def alias_to_university(target_alias, configs=None):
+    '''
+    this function looks up the full names of universities by their aliases
+    params:
+        target_alias: str or list of str, aliases such as "thu pku" or ['thu', 'pku']
+        configs: list, returned by read_config, read from the default config file if None
+    return value:
+        a list of university names, in the order of configs, unknown aliases are ignored
+    '''
+    if isinstance(target_alias, str):
+        target_alias = re.split('[ ]+', target_alias.strip())
+    configs = configs if configs is not None else read_config()
+    return [univ['university'] for univ in configs if univ['alias'] in target_alias]
+
+def crawl_faculty_list(configs, target_alias=None, snapshots=None):
     '''
     this function crawl faculty list according to configs, if target_alias is given, only faculty members affiliated
-    with those institutions in it will be crawled
+    with those institutions in it will be crawled. with snapshots, a list is fetched again only if its page changed
+    (the server does not answer 304 not modified) and is taken as changed only if the names in it changed
     params:
         configs: list, each entry is a dict, key is university name ("university"), target website ("url"), and
         target path ("xpath")
         target_alias: list of str, each str is an alias of a target institution. Any alias other than those in config
         will be ignored without notification
+        snapshots: snapshot.FacultySnapshots or None, the lists of the last crawl, updated with those of this one,
+        response_cache is bypassed with it
     return value:
         a defaultdict, each key is a university, and the value is a 'raw' list of faculty list
         (Chinese name, potentially with title and degree)
     '''
     university_faculty = defaultdict(list)
+    parsing = []
     for univ in configs:
         s_start = time.time()
         if target_alias is not None and univ['alias'] not in target_alias:
             continue
-        attemp_cnt = 0
-        while attemp_cnt < 10:
-            header = random.choice(headers)
-            req = requests.get(univ['url'], headers=header)
-            # gb2312 fails to encode some rare characters, so we change it to gbk
-            req.encoding = 'gbk' if req.apparent_encoding=='GB2312' else req.apparent_encoding
-            text = req.text
-            tree = etree.HTML(text)
-            name_list = tree.xpath(univ['xpath'])
-            if name_list:
-                university_faculty[univ['university']] = name_list
+        header = random.choice(lazy('headers'))
+        # failed connections and 429/5xx answers are retried with backoff by the session
+        validators = (None, None)
+        with metrics.span('fetch_faculty'):
+            if snapshots is None:
+                text = fetch_page(univ['url'], header, detect_encoding=True)
+            else:
+                text, *validators = fetch_if_changed(univ['url'], header, *snapshots.validators(univ['university']),
+                                                     detect_encoding=True)
+        if text is None:
+            # not modified since the last crawl
+            university_faculty[univ['university']] = snapshots.names(univ['university'])
+            print("-----faculty list of {} not modified-----".format(univ['university']))
+            continue
+        # with a parse pool, the next list is fetched while this one is parsed
+        parsing.append((univ, header, s_start, validators, submit_parse(text, univ['xpath'])))
+    for univ, header, s_start, validators, future in parsing:
+        with metrics.span('parse_faculty'):
+            name_list = future.result()
+        if not name_list and response_cache is not None and snapshots is None:
+            # the cached page might be a broken one, fetch it again
+            with metrics.span('fetch_faculty'):
+                text = fetch_page(univ['url'], header, detect_encoding=True, refresh=True)
+            with metrics.span('parse_faculty'):
+                name_list = submit_parse(text, univ['xpath']).result()
+        if name_list:
+            university_faculty[univ['university']] = name_list
+            if snapshots is not None and not snapshots.update(univ['university'], name_list, *validators):
+                print("-----faculty list of {} not changed-----".format(univ['university']))
+            else:
                 print("-----finish faculty collection for {} after {:.3} sec-----".format(univ['university'], \
                                                                                     time.time()-s_start))
-                s_start = time.time()
-                break
-            attemp_cnt += 1
-            if attemp_cnt == 10:
-                print('fail to find faculty for {} after 10 retries'.format(univ['university']))
+        else:
+            print('fail to find faculty for {}'.format(univ['university']))
+            if snapshots is not None and snapshots.names(univ['university']):
+                # a broken page does not mean everyone left, keep the last list until the page is back
+                university_faculty[univ['university']] = snapshots.names(univ['university'])
     return university_faculty
 
+def submit_parse(page, xpath, limit=None):
+    '''
+    this function evaluates xpath on a page, in parse_pool if it is set, in this thread otherwise
+    params:
+        page: str, the html page
+        xpath: str, the xpath to evaluate
+        limit: int or None, keep only the first limit results, None for all of them
+    return value:
+        concurrent.futures.Future, whose result is a list of str
+    '''
+    if parse_pool is None:
+        return parsepool.parse_inline(page, xpath, limit)
+    return parse_pool.submit(page, xpath, limit)
+
 def extract_name(raw_dict):
     '''
     this function processes Chinese name, removing irrelevant title and punctuations
@@ -103,6 +349,7 @@ def extract_name(raw_dict):
             raw_dict[univ][idx] = name
     return raw_dict
 
+@metrics.timed('pinyin')
 def name_to_pinyin(zh_dict):
     '''
     this functions converts Chinese name (characters) to pinyin for searching in Google Scholar
@@ -110,78 +357,142 @@ def name_to_pinyin(zh_dict):
         zh_dict: defaultdict, returned by extract_name
     return value:
         a defaultdict, each corresponding entry is a converted name in pinyin,
-        with form '[given name] [surname]'
+        with form '[given name] [surname]', the other forms of the name are kept by romanizer
     '''
     for univ in zh_dict:
-        if univ == 'Zhejiang University':   # we found the Pinyin name for zju faculty
-            for idx in range(len(zh_dict[univ])):
-                zh_dict[univ][idx] = ' '.join(reversed(zh_dict[univ][idx].split(' ')))
-            continue
-        for idx in range(len(zh_dict[univ])):
-            # FIXME: this method only works for surname of exactly one character, 
-            # and does not take into composite surname, such as 欧阳
-            full_name_zh = zh_dict[univ][idx]
-            raw_pinyin = lazy_pinyin(full_name_zh)
-            raw_pinyin = [c for c in raw_pinyin if c.isalpha()]
-            zh_dict[univ][idx] = ''.join(raw_pinyin[1:]) + ' ' + raw_pinyin[0]
+        # names already in pinyin (e.g. on the site of zju) are taken as '[surname] [given name]' and reordered
+        zh_dict[univ][:] = [name for name in romanizer.convert_all(zh_dict[univ]) if name]
     return zh_dict
 
-def google_search(query):
+def google_search(query, with_status=False):
     '''
     this function searches for a given query on Google
     params:
         query: str, containing a faculty member's pinyin name with the affiliated institution for disambiguity,
         an example: "san zhang nju"
+        with_status: bool, also return whether a mirror answered with search results
     return value:
-        the hyperref to this faculty member's Google Scholar page
+        the hyperref to this faculty member's Google Scholar page, or a tuple (searched, hyperref) if with_status is
+        set, searched is False if every mirror tried was blocked or failed, so the query could not be searched
     '''
     query = query.lower()
-    region_url = random.choice(google_sites)
-    region = region_url['region']
-    url_prefix = region_url['url']
-    search_url = url_prefix + query
-    header = random.choice(headers)
+    # results are the same on every mirror, so they share one cache entry
+    cache_key = lazy('google_sites')[0]['url'] + query
+    scheduler, user_agents = lazy('mirror_scheduler'), lazy('headers')
+    page = None
+    if response_cache is not None:
+        page = response_cache.get(cache_key)
+        metrics.incr('cache_hits' if page is not None else 'cache_misses')
     # FIXME: I have already found some mistakes made by googling like this, e.g., an irrelevant faculty found
-    try:
-        page = requests.get(url=search_url+query, headers=header, proxies=proxies).text
-    except:
-        print('Error occurred when browsing with url {} in region {}'.format(url_prefix, region))
-        if url_prefix != google_sites[0]['url']:
-            page = requests.get(url=google_sites[0]['url'], headers=header, proxies=proxies).text
-        else:
-            return None
-    sp = BeautifulSoup(page, "html.parser")
-    for link in sp.find_all('a'):
-        url = link.get('href')
-        if url and 'scholar.google.com' in url:
-            # we assume that after restricting query to a faculty member's name and affiliated institution,
-            # the first result containing an href to google scholar should be his/hers
-            return url
-    # if not found on the first page (so it is very likely this member does not have a google scholar page),
-    # just return None
+    for _ in range(search_attempts if page is None else 0):
+        site = scheduler.pick()
+        header = random.choice(user_agents)
+        try:
+            with metrics.span('fetch_search'):
+                # a 429 or 503 is not retried on the same mirror, the scheduler cools it down and picks another one,
+                # or waits for one to cool down if all of them are blocked
+                req = request_page(site['url']+query, header, proxies=proxies, retry=False)
+                status, text = req.status_code, decode_page(req)
+        except:
+            print('Error occurred when browsing with url {} in region {}'.format(site['url'], site['region']))
+            scheduler.report(site, None, ok=False)
+            continue
+        is_blocked = mirror.is_block_page(status, text)
+        failed = is_blocked or status >= 400
+        if failed:
+            metrics.incr('blocks' if is_blocked else 'search_errors')
+            print('{} when browsing with url {} in region {}'.format('Blocked' if is_blocked else 'Status {}'.format(status),
+                                                                     site['url'], site['region']))
+        scheduler.report(site, req.latency, ok=not failed, blocked=is_blocked)
+        if not failed:
+            page = text
+            if response_cache is not None:
+                response_cache.put(cache_key, page)
+            break
+    if page is None:
+        return (False, None) if with_status else None
+    with metrics.span('parse_search'):
+        # we assume that after restricting query to a faculty member's name and affiliated institution,
+        # the first result linking to a google scholar profile should be his/hers
+        # if not found on the first page (so it is very likely this member does not have a google scholar page),
+        # just return None
+        url = find_scholar_url(page)
+    return (True, url) if with_status else url
+
+def find_scholar_url(page):
+    '''
+    this function scans a google result page for the first link to a google scholar profile, without parsing the page
+    params:
+        page: str, the result page
+    return value:
+        str, the canonical url of the profile, e.g. "https://scholar.google.com/citations?user=AbCdEfGhIjKl",
+        None if no link to a profile is found
+    '''
+    for match in scholar_href.finditer(page):
+        url = unquote(html.unescape(match.group(1)))
+        user = scholar_user.search(url)
+        # other links to scholar (e.g. "scholarly articles for ...") are not profiles
+        if user is None:
+            continue
+        # keep the host the link points to, minus google's redirect, so mirrors of scholar work too
+        end = url.lower().index('scholar.google.com') + len('scholar.google.com')
+        host = url[:end]
+        start = max(host.rfind('q='), host.rfind('url='))
+        if start >= 0:
+            host = host[host.index('=', start)+1:]
+        if host.startswith('//'):
+            host = 'https:' + host
+        elif '://' not in host:
+            host = 'https://' + host
+        return '{}/citations?user={}'.format(host, user.group(1))
     return None
 
-def parse_scholar(url, top_k=10):
+def search_member(member, univ, with_status=False):
+    '''
+    this function searches for the google scholar page of a faculty member, trying the forms of the name from the most
+    likely one until a page is found or name_variants of them are tried
+    params:
+        member: str, the faculty member's pinyin name, returned by name_to_pinyin
+        univ: str, the university's name
+        with_status: bool, also return whether every form tried was searched, see google_search
+    return value:
+        the hyperref to this faculty member's Google Scholar page, None if not found, or a tuple (searched, hyperref)
+        if with_status is set, searched is False if no page is found and some form of the name could not be searched
+    '''
+    searched = True
+    for query in romanizer.variants(member)[:max(name_variants, 1)]:
+        ok, url = google_search(query+' '+univ, with_status=True)
+        if url:
+            return (True, url) if with_status else url
+        searched = searched and ok
+    return (searched, None) if with_status else None
+
+def parse_scholar(url, top_k=10, wait=True):
     '''
     this function browse the google scholar page returned by google_search, and return a list of institutions with
     which this faculty member has cooperated
     params:
         url: str, a url to the faculty member's google scholar page
         top_k: int, include how many coauthors' institutions from top to bottom
+        wait: bool, if False, return as soon as the page is fetched, with a future of the list, so the calling thread can
+        go on fetching while parse_pool parses the page
     return value:
         a list, each entry is a name of a coauthor's affiliated institution, might have also include his/her title/position,
-        need to be furthur processed
+        need to be furthur processed (a concurrent.futures.Future of it if wait is False), None if the page could not be
+        fetched
     '''
-    header = random.choice(headers)
+    header = random.choice(lazy('headers'))
     try:
-        page = requests.get(url, headers=header, proxies=proxies).text
+        with metrics.span('fetch_scholar'):
+            page = fetch_page(url, header, proxies=proxies)
     except:
         print('Error occurred when browsing google scholar page at {}'.format(url))
         return None
-    tree = etree.HTML(page)
-    raw_list = tree.xpath('//*[@id="gsc_rsb_co"]/ul/li/div/span[2]/span[1]/text()')
-    raw_list = raw_list[:top_k]
-    return raw_list
+    future = submit_parse(page, '//*[@id="gsc_rsb_co"]/ul/li/div/span[2]/span[1]/text()', limit=top_k)
+    if not wait:
+        return future
+    with metrics.span('parse_scholar'):
+        return future.result()
 
 def process_institutions(raw_list):
     '''
@@ -195,46 +506,38 @@ def process_institutions(raw_list):
     processed_list = []
     if raw_list is None or raw_list == []:
         return processed_list
-    for idx in range(len(raw_list)):
-        # FIXME: the cases for handling troublesome punctuations are apparently non-exhausted, try to polish this part later
-        delimiters = [',', '/', ';']
-        # some of the institution's name is in Chinese, translate to English
-        raw_list[idx] = translator.translate(raw_list[idx], src='zh-cn', dest='en').text
-        entities = [raw_list[idx].lower()]
-        for delimiter in delimiters:
-            sep = []
-            for entity in entities:
-                sep += entity.split(delimiter)
-            entities = sep
-        # only look for universities and a few companies now
-        found = False
-        entities.reverse()  # university often comes after a specific institute or college, but the former is more useful
-        for entity in entities:
-            # address institution name in chinese
-            for ins in interested_parties:
-                for party in interested_parties[ins]:
-                    if party in entity:
-                        found = True
-                        '''
-                        # remove leading white space
-                        while entity and entity[0].isalpha() is False:
-                            entity = entity[1:]
-                        while entity and entity[-1].isalpha() is False:
-                            entity = entity[:-1]
-                        '''
-                        if entity: entity = entity.strip()  # remove leading and trailing spaces
-                        # replace "&" with "and"
-                        entity = entity.replace(' & ', ' and ').replace('at ', '')
-                        # replace other punctuations, preserving only alphabet, digit, and white space
-                        entity = re.sub(r"[^a-zA-z0-9 -']", '', entity)
-                        processed_list.append(entity if ins != 'single' else party)
-                        break   # we will assume that each person is affiliated with only one institution
-                if found:
-                    break
-            if found:
-                break
+    # some of the institution's name is in Chinese, translate to English
+    raw_list[:] = translator.translate(raw_list, src='zh-cn', dest='en')
+    affiliations = lazy('affiliation_matcher')
+    with metrics.span('match_institutions'):
+        for raw in raw_list:
+            if entity_resolver is not None:
+                # aliases and abbreviations (e.g. "THU", "Tsinghua Univ.") carry no keyword until they are spelled out
+                raw = entity_resolver.expand(raw, affiliations.delimiters)
+            # FIXME: the cases for handling troublesome punctuations are apparently non-exhausted, try to polish this part later
+            # only look for universities and a few companies now
+            # we will assume that each person is affiliated with only one institution
+            entity = affiliations.match(raw)
+            if entity is not None:
+                processed_list.append(entity)
+    if entity_resolver is not None:
+        with metrics.span('resolve_institutions'):
+            processed_list = [entity_resolver.resolve(entity) for entity in processed_list]
     return processed_list
 
+def institution_key(name):
+    '''
+    this function reduces an institution's name to a key, two names with the same key are the same institution,
+    used to tell connections inside a university
+    params:
+        name: str, an institution's name
+    return value:
+        str, the name's letters, spaces and hyphens in lowercase, after resolving it with entity_resolver if it is set
+    '''
+    if entity_resolver is not None:
+        name = entity_resolver.resolve(name)
+    return re.sub('[^a-zA-Z -]', '', name).lower()
+
 def normal_to_01(arr):
     '''
     this function normalize a sequence of data to range [0, 1]
@@ -243,6 +546,7 @@ def normal_to_01(arr):
     return value:
         numpy array of same length, with data normalized to range [0, 1]
     '''
+    import numpy as np
     return (arr-arr.min()) / (arr.max()-arr.min() + np.finfo('float').eps)
 
 def normal_to_m1p1(arr):
@@ -253,4 +557,5 @@ def normal_to_m1p1(arr):
     return value:
         numpy array of same length, with data normalized to range [-1, 1]
     '''
+    import numpy as np
     return 2 * (arr-arr.min()) / (arr.max()-arr.min() + np.finfo('float').eps) - 1
\ No newline at end of file
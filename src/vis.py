@@ -1,41 +1,98 @@
-from itertools import cycle
-from mpl_toolkits.mplot3d import Axes3D
 import argparse, re
-import matplotlib.pyplot as plt
-import argparse
 import util
-import numpy as np
-import pandas as pd
+# matplotlib, numpy and pandas are imported when plotting, so that --help and bad arguments are answered right away
 
 parser = argparse.ArgumentParser(description='provide visualization for statistics saved in the csv file')
 
-parser.add_argument('--stat', type=str, default='result/stat.csv', help='path to the csv file saved by feature.py')
+parser.add_argument('--stat', type=str, default='result/stat.csv', help='path to the csv file saved by feature.py, or \
+                    to stat.parquet saved by feature.py --store parquet, of which only the fields plotted are read')
 parser.add_argument('--plot_type', type=int, default=2, help='choose visualization for data, 2 for 2d plots, 3 for 3d ones')
 parser.add_argument('--fields', type=str, default='inner_connection_ratio avg_connection_per_member', help='choose \
                     which fields in statistics to generate plot, the order is "data_x_dim data_y_dim" for 2d plots and \
                     "data_x_dim data_y_dim data_z_dim" for 3d ones')
 parser.add_argument('--area', type=str, default='#member_w_connection', help='choose the meaning of each dot')
+parser.add_argument('--render', type=str, default='auto', choices=['auto', 'scatter', 'hexbin'], help='draw a dot for \
+                    each institution, or aggregate them into hexagons (cubes for 3d plots) colored by the total area \
+                    of their dots, auto aggregates when there are more than --max_points institutions')
+parser.add_argument('--max_points', type=int, default=10000, help='institutions drawn as dots at most with --render \
+                    auto')
+parser.add_argument('--labels', type=int, default=100, help='institutions labeled at most, from the largest dots, \
+                    labels overlapping one already placed are left out')
+parser.add_argument('--gridsize', type=int, default=50, help='hexagons across the x-axis when aggregating, a third of \
+                    it for the cubes of 3d plots')
+parser.add_argument('--output', type=str, default=None, help='where to save the figure, default to \
+                    result/demo-2d.png or result/demo-3d.png')
 
-args = parser.parse_args()
+# colors of the dots, in turn
+palette = 'bgrcmky'
 
-stat = args.stat
-plot_type = args.plot_type
-fields = re.split('[ ]+', args.fields)
-area = args.area
+def aggregated(render, count, max_points):
+    '''
+    this function tells whether to aggregate count points instead of drawing each of them
+    '''
+    return render == 'hexbin' or (render == 'auto' and count > max_points)
 
-color_cycle = cycle('bgrcmky')
+def place_labels(ax, x_axis, y_axis, labels, order, max_labels, fontsize=10):
+    '''
+    this function labels points without letting two labels overlap, each label is put above its point, points are
+    tried in order and labels overlapping an earlier one are left out, until max_labels are placed
+    params:
+        ax: matplotlib axes, with its limits set
+        x_axis, y_axis: numpy arrays, coordinates of the points
+        labels: numpy array of str
+        order: numpy array of int, indices of the points from the most to the least important
+        max_labels: int, labels placed at most
+        fontsize: float, size of the labels in points
+    return value:
+        int, number of labels placed
+    '''
+    import numpy as np
+    offset1, offset2 = 9e-3, 1.6e-1
+    # only look at a bounded number of candidates, so that labeling 100k points costs as little as labeling 1k
+    order = order[:max_labels*20]
+    lengths = np.array([len(label) for label in labels[order]])
+    anchors = ax.transData.transform(np.column_stack([x_axis[order]-offset1*lengths, y_axis[order]+offset2]))
+    # the size of the text in pixels, estimated from the font size
+    char_width, height = fontsize * .6 * ax.figure.dpi / 72, fontsize * 1.3 * ax.figure.dpi / 72
+    widths = lengths * char_width
+    # boxes placed so far, by the cells of a grid with the height of a label, a box spans at most a few cells
+    grid, placed = {}, 0
+    for idx, (left, bottom), width in zip(order, anchors, widths):
+        if placed >= max_labels:
+            break
+        cells = [(i, j) for i in range(int(left // height), int((left+width) // height) + 1)
+                 for j in range(int(bottom // height), int((bottom+height) // height) + 1)]
+        if any(left < r and l < left+width and bottom < t and b < bottom+height
+               for cell in cells for l, b, r, t in grid.get(cell, ())):
+            continue
+        for cell in cells:
+            grid.setdefault(cell, []).append((left, bottom, left+width, bottom+height))
+        ax.annotate(labels[idx], (x_axis[idx], y_axis[idx]),
+                    (x_axis[idx]-offset1*len(labels[idx]), y_axis[idx]+offset2), fontsize=fontsize)
+        placed += 1
+    return placed
 
-def plot_field_2d(stat, fields, area):
+def plot_field_2d(stat, fields, area, output='result/demo-2d.png', render='auto', max_points=10000, max_labels=100,
+                  gridsize=50):
     '''
     this function will visualize the data we collect, with x-axis being outer connection ratio,
-    and y-axis being number of unique_connections connections, size of plot being total_connections connections
+    and y-axis being number of unique_connections connections, size of plot being total_connections connections.
+    all dots are drawn by one scatter call, or aggregated into hexagons when there are too many of them, and the
+    largest dots are labeled with the name of their institution
     params:
-        stat: dict of dict
-            key: institution name, value: dict
-            secondary key: 'total_connections', 'num_members', 'inner_connection_ratio', 'unique_connections'
+        stat: dataframe, the first column is the name of each institution, see plot_field_3d for the other fields
+        fields: list of str, fields of the x-axis and the y-axis
+        area: str, field giving the size of each dot
+        output: str, where to save the figure
+        render: str, "scatter", "hexbin", or "auto" for hexbin beyond max_points institutions
+        max_points: int, see render
+        max_labels: int, institutions labeled at most
+        gridsize: int, hexagons across the x-axis
     return value:
         none
     '''
+    import numpy as np
+    import matplotlib.pyplot as plt
     fig = plt.figure(figsize=(12, 8))
     ax = fig.add_subplot()
     ax.set_xlabel(fields[0])
@@ -43,21 +100,28 @@ def plot_field_2d(stat, fields, area):
     ax.set_xlim(-1.2, 1.2)
     ax.set_ylim(-1.2, 1.2)
     x_axis, y_axis, area = stat[fields[0]], stat[fields[1]], stat[area]
-    x_axis, y_axis, area = np.array(x_axis), np.array(y_axis), np.array(area)
+    x_axis, y_axis, area = np.array(x_axis, dtype=float), np.array(y_axis, dtype=float), np.array(area, dtype=float)
     x_axis = util.normal_to_m1p1(x_axis)
     y_axis = util.normal_to_m1p1(y_axis)
     area = util.normal_to_01(area) + 1
-    offset1, offset2, idx = 9e-3, 1.6e-1, 0
-    for row in stat.iterrows():
-        ax.scatter(x_axis[idx], y_axis[idx], s=area[idx]*1600, c=next(color_cycle), marker='o', alpha=.6)
-        ax.annotate(row[1][0], (x_axis[idx], y_axis[idx]), (x_axis[idx]-offset1*len(row[1][0]), y_axis[idx]+offset2))
-        idx += 1
-    plt.savefig('result/demo-2d.png')
+    if aggregated(render, len(stat), max_points):
+        cells = ax.hexbin(x_axis, y_axis, C=area, reduce_C_function=np.sum, gridsize=gridsize, mincnt=1,
+                          extent=(-1.2, 1.2, -1.2, 1.2), cmap='viridis')
+        fig.colorbar(cells, ax=ax, label='total area of {} dots'.format(len(stat)))
+    else:
+        colors = np.array(list(palette))[np.arange(len(stat)) % len(palette)]
+        ax.scatter(x_axis, y_axis, s=area*1600, c=colors, marker='o', alpha=.6)
+    labels = stat.iloc[:, 0].astype(str).to_numpy()
+    place_labels(ax, x_axis, y_axis, labels, np.argsort(-area, kind='stable'), max_labels)
+    plt.savefig(output)
+    plt.close(fig)
 
-def plot_field_3d(stat, fields, area):
+def plot_field_3d(stat, fields, area, output='result/demo-3d.png', render='auto', max_points=10000, gridsize=50):
     '''
     this function will visualize the data we collect, with x-axis being outer connection ratio,
-    and y-axis being number of unique_connections connections, size of plot being total_connections connections
+    and y-axis being number of unique_connections connections, size of plot being total_connections connections.
+    all dots are drawn by one scatter call, or aggregated into cubes (a dot at the center of each, sized and colored
+    by the total area of the dots in it) when there are too many of them
     params:
         stat: dataframe, fields other than institutions' names are listed as follows
         #total_member: number of total faculty members crawled from official websites
@@ -68,9 +132,13 @@ def plot_field_3d(stat, fields, area):
         avg_coauthors_per_member: total_connections / #total_member
         avg_coauthors_per_w_con: total_connections / #member_w_connection
         avg_connection_per_member: unique_connection / #member_w_connection
+        fields, area, output, render, max_points: same as plot_field_2d, with three fields
+        gridsize: int, three times the cubes across each axis
     return value:
         none
     '''
+    import numpy as np
+    import matplotlib.pyplot as plt
     fig = plt.figure()
     ax = fig.add_subplot(111, projection='3d')
     ax.set_xlabel(fields[0])
@@ -80,32 +148,53 @@ def plot_field_3d(stat, fields, area):
     ax.set_ylim(-1.2, 1.2)
     ax.set_zlim(-1.2, 1.2)
     x_axis, y_axis, z_axis, area = stat[fields[0]], stat[fields[1]], stat[fields[2]], stat[area]
-    x_axis, y_axis, z_axis, area = np.array(x_axis), np.array(y_axis), np.array(z_axis), np.array(area)
+    x_axis, y_axis, z_axis, area = [np.array(column, dtype=float) for column in (x_axis, y_axis, z_axis, area)]
     x_axis = util.normal_to_m1p1(x_axis)
     y_axis = util.normal_to_m1p1(y_axis)
     z_axis = util.normal_to_m1p1(z_axis)
     area = util.normal_to_01(area) + 1
-    idx = 0
-    for _ in stat.iterrows():
-        ax.scatter(x_axis[idx], y_axis[idx], z_axis[idx], s=area[idx]*2000, c=next(color_cycle), marker='o', alpha=.6)
-        idx += 1
-    plt.savefig('result/demo-3d.png')
+    if aggregated(render, len(stat), max_points):
+        bins = max(gridsize // 3, 1)
+        edges = np.linspace(-1.2, 1.2, bins+1)
+        total, _ = np.histogramdd(np.column_stack([x_axis, y_axis, z_axis]), bins=[edges]*3, weights=area)
+        centers = (edges[:-1] + edges[1:]) / 2
+        i, j, k = np.nonzero(total)
+        dots = ax.scatter(centers[i], centers[j], centers[k], s=util.normal_to_01(total[i, j, k])*400+10,
+                          c=total[i, j, k], cmap='viridis', marker='o', alpha=.6)
+        fig.colorbar(dots, ax=ax, label='total area of {} dots'.format(len(stat)))
+    else:
+        colors = np.array(list(palette))[np.arange(len(stat)) % len(palette)]
+        ax.scatter(x_axis, y_axis, z_axis, s=area*2000, c=colors, marker='o', alpha=.6)
+    plt.savefig(output)
+    plt.close(fig)
 
 if __name__ == '__main__':
+    args = parser.parse_args()
+    stat = args.stat
+    plot_type = args.plot_type
+    fields = re.split('[ ]+', args.fields)
+    area = args.area
     try:
-        stat = pd.read_csv(stat)
+        if stat.endswith('.parquet'):
+            import storage
+            stat = storage.load_stat(stat, columns=fields+[area])
+        else:
+            import pandas as pd
+            stat = pd.read_csv(stat)
     except:
        print('can not find statistics file {}'.format(stat))
        exit(-1)
     if plot_type == 2:
         #try:
-        plot_field_2d(stat, fields, area)
+        plot_field_2d(stat, fields, area, args.output or 'result/demo-2d.png', args.render, args.max_points,
+                      args.labels, args.gridsize)
         #except:
         #    print('can not plot 2d with field setting: "{}"'.format(args.fields))
     elif plot_type == 3:
         try:
-            plot_field_2d(stat, fields, area)
+            plot_field_3d(stat, fields, area, args.output or 'result/demo-3d.png', args.render, args.max_points,
+                          args.gridsize)
         except:
             print('can not plot 3d with field setting: "{}"'.format(args.fields))
     else:
-        print('plot_type = {} is not a valid setting'.format(plot_type))
\ No newline at end of file
+        print('plot_type = {} is not a valid setting'.format(plot_type))
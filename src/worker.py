@@ -0,0 +1,73 @@
+import argparse, time
+import util, workqueue, collect, metrics
+
+parser = argparse.ArgumentParser(description='claim faculty members from a work queue, find their connections and save \
+                                 the results back, until every task in the queue is done')
+parser.add_argument('--queue', type=str, default='result/queue.sqlite', help='the sqlite work queue filled by collect.py \
+                    --workers, on a local disk, since sqlite cannot share it over a network file system')
+parser.add_argument('--name', type=str, default='worker', help='name of this worker, recorded with the tasks it claims')
+parser.add_argument('--proxy', type=str, default=None, help='proxy used by this worker for google sites, e.g. \
+                    socks5h://127.0.0.1:1081, "none" for connecting directly, default to the proxy in util.py')
+parser.add_argument('--user_agent', type=int, default=None, help='index of the only entry in config/user-agent.json \
+                    this worker pretends to be, default to choosing randomly for each request')
+parser.add_argument('--lease', type=float, default=300, help='seconds a claimed task is reserved for this worker, after \
+                    which it is handed to another one')
+
+def work(queue_file, name, proxy=None, user_agent=None, lease=300, options=None, poll=5):
+    '''
+    this function claims tasks from the queue one by one, runs collect.find_member_connection for each, and saves the
+    results, it returns once every task of the queue is done (by this worker or any other), leaving the statistics of
+    the google mirrors it used in the queue
+    params:
+        queue_file: str, path to the sqlite work queue
+        name: str, name of this worker
+        proxy: str or None, proxy for google sites, "none" for connecting directly, None for util.proxies
+        user_agent: int or None, index of the only user agent used, None for choosing randomly each time
+        lease: float, seconds to complete a task before it is handed to another worker
+        options: argparse.Namespace or None, options of collect.py passed to collect.setup_fetching
+        poll: float, seconds to wait before checking again when all unfinished tasks are leased by others
+    return value:
+        int, number of tasks completed by this worker
+    '''
+    if options is not None:
+        collect.setup_fetching(options)
+    if proxy == 'none':
+        util.proxies = None
+    elif proxy:
+        util.proxies = dict(http=proxy, https=proxy)
+    if user_agent is not None:
+        util.headers = [util.headers[user_agent % len(util.headers)]]
+    queue = workqueue.WorkQueue(queue_file)
+    completed, s_time = 0, time.time()
+    while True:
+        task = queue.claim(name, lease)
+        if task is None:
+            if queue.unfinished() == 0:
+                break
+            time.sleep(poll)
+            continue
+        task_id, univ, member = task
+        try:
+            found, connection = collect.find_member_connection(member, univ)
+        except Exception as e:
+            # leave the task leased, it is handed to another worker once the lease expires
+            print('{} failed on {} of {}: {}'.format(name, member, univ, e))
+            continue
+        if found is None:
+            # not searched, e.g. every mirror blocked this worker, so it is left leased as well
+            print('{} could not search for {} of {}'.format(name, member, univ))
+            continue
+        queue.complete(task_id, found, connection)
+        completed += 1
+    queue.save_mirror_metrics(name, util.mirror_scheduler.metrics())
+    queue.close()
+    if util.parse_pool is not None:
+        util.parse_pool.shutdown()
+    print('-----{} finish {} tasks after {:.3} sec-----'.format(name, completed, time.time()-s_time))
+    if options is not None and options.profile:
+        metrics.print_summary()
+    return completed
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    work(args.queue, args.name, args.proxy, args.user_agent, args.lease)
@@ -0,0 +1,145 @@
+import json, sqlite3, time
+import checkpoint
+
+class WorkQueue:
+    '''
+    a queue of (university, member) tasks kept in a sqlite database shared by the coordinator and the workers.
+    a worker claims a task with a lease, if it does not complete the task before the lease expires (e.g. it died),
+    the task is handed to another worker, a task claimed max_attempts times without success is given up.
+    the database should be on a local disk, the write-ahead log sqlite shares between processes does not work over a
+    network file system
+    '''
+    def __init__(self, filename, timeout=60, max_attempts=3):
+        self.max_attempts = max_attempts
+        self.db = sqlite3.connect(filename, timeout=timeout, isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute("CREATE TABLE IF NOT EXISTS tasks (id INTEGER PRIMARY KEY, univ TEXT, member TEXT, \
+                         state TEXT DEFAULT 'pending', worker TEXT, lease_until REAL, attempts INTEGER DEFAULT 0, \
+                         found INTEGER, connection TEXT, UNIQUE (univ, member))")
+        self.db.execute('CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_until)')
+        self.db.execute('CREATE TABLE IF NOT EXISTS mirrors (worker TEXT PRIMARY KEY, metrics TEXT)')
+
+    def reset(self):
+        '''
+        this function empties the queue, tasks done included, e.g. when a new run starts instead of continuing one
+        '''
+        self.db.execute('BEGIN IMMEDIATE')
+        self.db.execute('DELETE FROM tasks')
+        self.db.execute('DELETE FROM mirrors')
+        self.db.execute('COMMIT')
+
+    def put_tasks(self, univ_faculty_collection):
+        '''
+        this function adds a task for every faculty member, members already in the queue (done or not) are kept as is,
+        so a coordinator restarted on the same queue only adds what is new
+        params:
+            univ_faculty_collection: defaultdict, returned by collect.univ_collection
+        return value:
+            int, number of tasks added
+        '''
+        before = self.db.total_changes
+        self.db.execute('BEGIN IMMEDIATE')
+        self.db.executemany('INSERT OR IGNORE INTO tasks (univ, member) VALUES (?, ?)',
+                            [(univ, member) for univ in univ_faculty_collection for member in univ_faculty_collection[univ]])
+        self.db.execute('COMMIT')
+        return self.db.total_changes - before
+
+    def requeue_given_up(self):
+        '''
+        this function gives the tasks given up another max_attempts chances, e.g. when a new run starts
+        return value:
+            int, number of tasks requeued
+        '''
+        return self.db.execute("UPDATE tasks SET state='pending', attempts=0 WHERE state!='done' AND attempts>=? \
+                                AND lease_until<?", (self.max_attempts, time.time())).rowcount
+
+    def claim(self, worker, lease=300):
+        '''
+        this function leases the next pending task (or one whose lease has expired) to worker
+        params:
+            worker: str, name of the worker
+            lease: float, seconds the worker has to complete the task
+        return value:
+            a tuple (task id, university name, member name), or None if no task is available now
+        '''
+        now = time.time()
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.db.execute("SELECT id, univ, member FROM tasks WHERE attempts<? AND (state='pending' OR \
+                                   (state='leased' AND lease_until<?)) ORDER BY id LIMIT 1",
+                                  (self.max_attempts, now)).fetchone()
+            if row is not None:
+                self.db.execute("UPDATE tasks SET state='leased', worker=?, lease_until=?, attempts=attempts+1 \
+                                 WHERE id=?", (worker, now+lease, row[0]))
+            self.db.execute('COMMIT')
+        except:
+            self.db.execute('ROLLBACK')
+            raise
+        return row
+
+    def complete(self, task_id, found, connection):
+        '''
+        this function saves the result of a task, if it has been completed by another worker meanwhile,
+        the first result is kept
+        params:
+            task_id: int, returned by claim
+            found: bool, whether the google scholar page of this member is found
+            connection: list or None, returned by util.parse_scholar
+        return value:
+            None
+        '''
+        self.db.execute("UPDATE tasks SET state='done', found=?, connection=? WHERE id=? AND state!='done'",
+                        (int(found), json.dumps(connection), task_id))
+
+    def unfinished(self):
+        '''
+        this function counts the tasks not done yet, either still to be claimed or leased to a worker now,
+        tasks given up are not included
+        '''
+        return self.db.execute("SELECT COUNT(*) FROM tasks WHERE state!='done' AND (attempts<? OR lease_until>=?)",
+                               (self.max_attempts, time.time())).fetchone()[0]
+
+    def results(self, univ_faculty_collection):
+        '''
+        this function collects the results of finished tasks into the shape of connections.json
+        params:
+            univ_faculty_collection: defaultdict, returned by collect.univ_collection, gives the order of the output
+        return value:
+            defaultdict of defaultdict, key: university name, value: defaultdict,
+                                        secondary key: faculty member's name, secondary value: list of cooperating institutions
+        '''
+        records = {}
+        for univ, member, found, connection in self.db.execute("SELECT univ, member, found, connection FROM tasks \
+                                                                WHERE state='done'"):
+            records[(univ, member)] = (bool(found), json.loads(connection))
+        return checkpoint.assemble(records, univ_faculty_collection)
+
+    def unsearched(self, univ_faculty_collection):
+        '''
+        this function lists the members of univ_faculty_collection whose tasks are not done, i.e. unfinished, given up
+        or never searched because every mirror was blocked
+        return value:
+            list of tuple (university name, member name)
+        '''
+        done = set(self.db.execute("SELECT univ, member FROM tasks WHERE state='done'"))
+        return [(univ, member) for univ in univ_faculty_collection for member in univ_faculty_collection[univ]
+                if (univ, member) not in done]
+
+    def save_mirror_metrics(self, worker, metrics):
+        '''
+        this function keeps the statistics of the google mirrors seen by a worker, returned by
+        mirror.MirrorScheduler.metrics, so the coordinator can export them
+        '''
+        self.db.execute('INSERT OR REPLACE INTO mirrors VALUES (?, ?)', (worker, json.dumps(metrics)))
+
+    def mirror_metrics(self):
+        '''
+        this function returns the statistics saved by save_mirror_metrics
+        return value:
+            dict, key: worker name, value: dict returned by mirror.MirrorScheduler.metrics
+        '''
+        return {worker: json.loads(metrics)
+                for worker, metrics in self.db.execute('SELECT worker, metrics FROM mirrors')}
+
+    def close(self):
+        self.db.close()
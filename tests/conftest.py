@@ -0,0 +1,10 @@
+import os, sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+@pytest.fixture(autouse=True)
+def in_root(monkeypatch):
+    # the modules read config/ relative to the working directory, as when run from the root of the repository
+    monkeypatch.chdir(ROOT)
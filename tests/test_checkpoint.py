@@ -0,0 +1,43 @@
+import json
+import util, collect, checkpoint
+
+def test_resume_retries_members_not_searched(tmp_path, monkeypatch):
+    collection = {'Nanjing University': ['san zhang', 'si li', 'wu wang']}
+    log, output = str(tmp_path/'connections.jsonl'), str(tmp_path/'connections.json')
+    # zhang has a profile, li has none, and every mirror blocks the search for wang
+    answers = {'san zhang': (True, 'https://scholar.google.com/citations?user=zhang'), 'si li': (True, None),
+               'wu wang': (False, None)}
+    searched = []
+    def search_member(member, univ, with_status=False):
+        searched.append(member)
+        return answers[member]
+    monkeypatch.setattr(util, 'search_member', search_member)
+    monkeypatch.setattr(util, 'parse_scholar', lambda url, wait=True: ['Tsinghua University'])
+    collect.find_connections(collection, output=output, log=log)
+    assert set(checkpoint.load_log(log)) == {('Nanjing University', 'san zhang'), ('Nanjing University', 'si li')}
+    # the mirrors are back
+    answers['wu wang'] = (True, 'https://scholar.google.com/citations?user=wang')
+    searched.clear()
+    connections = collect.find_connections(collection, output=output, log=log, resume=True)
+    assert searched == ['wu wang']
+    assert dict(connections['Nanjing University']) == {'san zhang': ['Tsinghua University'],
+                                                       'wu wang': ['Tsinghua University']}
+    with open(output) as f:
+        assert set(json.load(f)['Nanjing University']) == {'san zhang', 'wu wang'}
+
+def test_log_cut_inside_a_character(tmp_path):
+    log = str(tmp_path/'connections.jsonl')
+    log_file = checkpoint.open_log(log)
+    checkpoint.append_record(log_file, '南京大学', '张三', True, ['北京大学'])
+    checkpoint.append_record(log_file, '南京大学', '李四', True, ['北京大学'])
+    log_file.close()
+    with open(log, 'rb') as f:
+        data = f.read()
+    # the crash cuts the last record in the middle of "京"
+    with open(log, 'wb') as f:
+        f.write(data[:data.rindex('京'.encode('utf-8'))+1])
+    assert set(checkpoint.load_log(log)) == {('南京大学', '张三')}
+    log_file = checkpoint.open_log(log)
+    checkpoint.append_record(log_file, '南京大学', '王五', False, None)
+    log_file.close()
+    assert set(checkpoint.load_log(log)) == {('南京大学', '张三'), ('南京大学', '王五')}
@@ -0,0 +1,32 @@
+import util, collect, snapshot
+
+class Romanizer:
+    def save(self):
+        pass
+
+def update(snapshots, names, monkeypatch):
+    monkeypatch.setattr(util, 'crawl_faculty_list', lambda configs, target, snapshots: snapshots.update('NJU', names))
+    added, removed = collect.faculty_changes(None, snapshots, configs=[{}])
+    unsearched = []
+    found = collect.find_connections(added, output=None, unsearched=unsearched)
+    snapshots.set_pending(unsearched)
+    snapshots.save()
+    return dict(added), dict(found)
+
+def test_members_not_searched_are_searched_by_the_next_update(tmp_path, monkeypatch):
+    monkeypatch.setattr(util, 'extract_name', lambda faculty: faculty)
+    monkeypatch.setattr(util, 'name_to_pinyin', lambda faculty: faculty)
+    monkeypatch.setattr(util, 'romanizer', Romanizer())
+    monkeypatch.setattr(util, 'parse_scholar', lambda url, wait=True: ['Tsinghua University'])
+    # every mirror blocks the search for wang this time
+    answers = {'san zhang': (True, 'https://scholar.google.com/citations?user=zhang'), 'wu wang': (False, None)}
+    monkeypatch.setattr(util, 'search_member', lambda member, univ, with_status=False: answers[member])
+    filename = str(tmp_path/'faculty-snapshot.json')
+    added, found = update(snapshot.FacultySnapshots(filename), ['san zhang', 'wu wang'], monkeypatch)
+    assert added == {'NJU': ['san zhang', 'wu wang']} and list(found['NJU']) == ['san zhang']
+    # the list is the same, but wang is searched again, and only him
+    answers['wu wang'] = (True, 'https://scholar.google.com/citations?user=wang')
+    added, found = update(snapshot.FacultySnapshots(filename), ['san zhang', 'wu wang'], monkeypatch)
+    assert added == {'NJU': ['wu wang']} and list(found['NJU']) == ['wu wang']
+    added, found = update(snapshot.FacultySnapshots(filename), ['san zhang', 'wu wang'], monkeypatch)
+    assert not any(added.values())
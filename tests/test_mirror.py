@@ -0,0 +1,80 @@
+import threading, time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pytest
+import util, mirror
+
+class Blocking(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests += 1
+        body = b'<html><body>too many requests</body></html>'
+        self.send_response(429)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def blocked_mirror(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Blocking)
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    sites = [{'region': 'blocked', 'url': 'http://127.0.0.1:{}/search?q='.format(server.server_address[1])}]
+    monkeypatch.setattr(util, 'google_sites', sites, raising=False)
+    monkeypatch.setattr(util, 'mirror_scheduler', mirror.MirrorScheduler(sites), raising=False)
+    monkeypatch.setattr(util, 'proxies', None)
+    monkeypatch.setattr(util, 'replay_url', None)
+    monkeypatch.setattr(util, 'response_cache', None)
+    monkeypatch.setattr(util, 'search_attempts', 1)
+    util.configure_session()
+    yield server
+    server.shutdown()
+
+def test_blocked_mirror_cools_down_after_one_request(blocked_mirror):
+    assert util.google_search('san zhang nju', with_status=True) == (False, None)
+    assert blocked_mirror.requests == 1
+    stat = util.mirror_scheduler.stats['blocked']
+    assert stat['blocks'] == 1
+    assert stat['cooldown_until'] > time.time()
+
+def test_latency_leaves_out_rate_limit_wait(blocked_mirror, monkeypatch):
+    class SlowLimiter:
+        def acquire(self, url):
+            time.sleep(.5)
+    monkeypatch.setattr(util, 'rate_limiter', SlowLimiter())
+    reported = []
+    monkeypatch.setattr(util.mirror_scheduler, 'report', lambda site, latency, **kwargs: reported.append(latency))
+    util.google_search('san zhang nju')
+    assert len(reported) == 1 and reported[0] < .5
+
+def test_searches_wait_for_the_cooldown(blocked_mirror, monkeypatch):
+    monkeypatch.setattr(util, 'mirror_scheduler', mirror.MirrorScheduler(util.google_sites, base_cooldown=.2))
+    s_time = time.time()
+    for _ in range(3):
+        assert util.google_search('san zhang nju', with_status=True) == (False, None)
+    # one request per search, each sent once the mirror has cooled down from the one before: .2 then .4 sec
+    assert blocked_mirror.requests == 3
+    assert time.time() - s_time >= .6
+    assert util.mirror_scheduler.stats['blocked']['strikes'] == 3
+
+def test_blocks_during_a_cooldown_add_no_strike():
+    site = {'region': 'blocked', 'url': 'http://127.0.0.1/search?q='}
+    scheduler = mirror.MirrorScheduler([site])
+    # several threads picked the mirror before it was blocked, and their answers come back one after another
+    for _ in range(4):
+        scheduler.report(site, .1, ok=False, blocked=True)
+    stat = scheduler.stats['blocked']
+    assert stat['blocks'] == 4 and stat['strikes'] == 1
+    assert stat['cooldown_until'] - time.time() <= scheduler.base_cooldown
+
+def test_block_page_is_told_from_results_about_captchas():
+    results = '<html><body><a href="https://scholar.google.com/citations?user=x">CAPTCHA research group, ' \
+              'telling humans and bots apart, not a robot</a></body></html>'
+    sorry = '<html><body><form id="captcha-form" action="index" method="post">Our systems have detected unusual ' \
+            'traffic from your computer network.</form></body></html>'
+    assert not mirror.is_block_page(200, results)
+    assert mirror.is_block_page(200, sorry)
+    assert mirror.is_block_page(429, results)
@@ -0,0 +1,49 @@
+import json
+import pytest
+import resolve
+
+near_misses = [('City University of Hong Kong', 'University of Hong Kong'),
+               ('Chinese University of Hong Kong', 'University of Hong Kong'),
+               ('South China University of Technology', 'China University of Technology'),
+               ('East China Normal University', 'South China Normal University'),
+               ('Northeastern University', 'Northwestern University'),
+               ('National Taiwan Normal University', 'National Taiwan University')]
+
+spellings = [('The University of Hong Kong', 'University of Hong Kong'),
+             ('University of Science & Technology of China', 'University of Science and Technology of China'),
+             ('Peking Univeristy', 'Peking University'),
+             ('Tsing Hua Univ.', 'Tsinghua University')]
+
+@pytest.mark.parametrize('name, other', near_misses)
+def test_near_misses_stay_apart(name, other):
+    resolver = resolve.EntityResolver(threshold=.5)
+    resolver.resolve(other)
+    assert resolver.resolve(name) == name
+
+@pytest.mark.parametrize('name, other', spellings)
+def test_spellings_are_merged(name, other):
+    resolver = resolve.EntityResolver(threshold=.5)
+    resolver.resolve(other)
+    assert resolver.resolve(name) == other
+
+def test_cached_merges_are_checked_again(tmp_path):
+    cache_file = str(tmp_path/'entities.json')
+    with open(cache_file, 'w') as f:
+        json.dump({'University of Hong Kong': 'University of Hong Kong',
+                   'City University of Hong Kong': 'University of Hong Kong',
+                   'The University of Hong Kong': 'University of Hong Kong'}, f)
+    resolver = resolve.EntityResolver(cache_file=cache_file)
+    assert resolver.resolve('City University of Hong Kong') == 'City University of Hong Kong'
+    assert resolver.resolve('The University of Hong Kong') == 'University of Hong Kong'
+    resolver.save()
+    with open(cache_file, 'r') as f:
+        assert json.load(f)['City University of Hong Kong'] == 'City University of Hong Kong'
+
+def test_abbreviations_and_aliases_reach_the_resolver(monkeypatch):
+    import util, translate
+    monkeypatch.setattr(util, 'translator', translate.CachedTranslator(translate.IdentityBackend()))
+    monkeypatch.setattr(util, 'entity_resolver', resolve.EntityResolver(resolve.load_aliases()))
+    raw = ['Tsinghua University', 'Tsinghua Univ.', 'Professor, Tsinghua Univ', 'THU', 'Dept. of CS, Peking Univ.',
+           'Univ. of Sci. & Tech. of China', 'Chinese Academy of Sciences', 'Google Inc.']
+    assert util.process_institutions(raw) == ['Tsinghua University'] * 4 + [
+        'Peking University', 'University of Science and Technology of China', 'chinese academy of sciences', 'google']
@@ -0,0 +1,36 @@
+import pandas as pd
+import storage
+
+counts = {'Peking University': {'Peking University': 3, 'Google': 1}, 'Nanjing University': {'Google': 2},
+          'Zhejiang University': {'Zhejiang University': 4, 'Nanjing University': 1}}
+
+def test_partial_counts_keep_other_universities_in_place(tmp_path):
+    storage.save_counts(counts, str(tmp_path))
+    storage.save_counts({'Nanjing University': {'Google': 5, 'Alibaba': 1}}, str(tmp_path))
+    loaded = storage.load_counts(str(tmp_path))
+    assert list(loaded) == list(counts)
+    assert loaded == dict(counts, **{'Nanjing University': {'Google': 5, 'Alibaba': 1}})
+
+def test_partial_stat_keeps_other_universities_in_place(tmp_path):
+    stat = pd.DataFrame({'unique_connections': [2, 1, 2], 'inner_connection_ratio': [.75, 0., .8]}, index=list(counts))
+    storage.save_stat(stat, str(tmp_path))
+    storage.save_stat(stat.loc[['Nanjing University']].assign(unique_connections=7), str(tmp_path))
+    loaded = storage.load_stat(str(tmp_path/'stat.parquet'), columns=['unique_connections'])
+    assert list(loaded.columns) == ['university', 'unique_connections']
+    assert list(loaded['university']) == list(counts)
+    assert list(loaded['unique_connections']) == [2, 7, 2]
+
+def test_universities_left_without_rows_are_replaced(tmp_path):
+    connections = {'Nanjing University': {'san zhang': ['Google', 'MIT']},
+                   'Zhejiang University': {'si li': ['Alibaba']}}
+    storage.save_connections(connections, str(tmp_path))
+    storage.save_counts({'Nanjing University': {'Google': 1, 'MIT': 1}, 'Zhejiang University': {'Alibaba': 1}},
+                        str(tmp_path))
+    # zhang's coauthors are gone, and so are the counts of his university
+    storage.save_connections({'Nanjing University': {'san zhang': []}}, str(tmp_path))
+    storage.save_counts({'Nanjing University': {}}, str(tmp_path))
+    assert storage.load_connections(str(tmp_path)) == {'Nanjing University': {'san zhang': []},
+                                                       'Zhejiang University': {'si li': ['Alibaba']}}
+    assert storage.load_counts(str(tmp_path)) == {'Zhejiang University': {'Alibaba': 1}}
+    storage.save_connections({'Nanjing University': {}}, str(tmp_path))
+    assert storage.load_connections(str(tmp_path)) == {'Zhejiang University': {'si li': ['Alibaba']}}